@@ -0,0 +1,11 @@
+"""Benchmarks of the thermal model and the co-simulation, writing JSON results tagged with the git commit"""
+
+import subprocess
+
+
+def git_commit():
+    """Commit of the working tree the benchmark ran on, None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,253 @@
+"""Wall time per simulated day of the co-simulation under each HELICS core type
+
+The synthetic mode runs the federation of the data center co-simulation without EnergyPlus or the CFD data:
+an EnergyPlus stand-in publishing the sensors and reading the actuators every timestep, the controller, and
+a thermal stand-in evaluating the energy balance. It measures the exchange overhead of each core type.
+Network cores run one process per federate around a broker on its own port, inproc runs the federates as
+threads of one process. The full mode times `helics run` of the real federates for each core type.
+
+Example:
+    python -m mostcool.benchmarks.cosim_cores --days 7 --output cosim_cores.json
+    python -m mostcool.benchmarks.cosim_cores --core-types zmq tcp --full
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from mostcool.benchmarks import git_commit
+from mostcool.core.config import RunConfig
+import mostcool.core.definitions as definitions
+import mostcool.core.federate as federate
+from mostcool.core.controller import PUBS, Controller
+from mostcool.core.runner_config import NETWORK_CORE_TYPES, broker_command, write_runner_config
+import mostcool.thermal.energy_balance as energy_balance
+
+
+ROLES = ["EnergyPlus", "Controller", "Server_1"]
+BASE_PORT = 23600
+SENSORS = [(f'{sensor["variable_key"]}/{sensor["variable_name"]}', sensor["variable_unit"]) for sensor in definitions.SENSORS]
+ACTUATORS = [(pub["Name"], pub["Units"]) for pub in PUBS]
+THERMAL_ACTUATORS = ACTUATORS[1:3]  # supply and return approach temperatures, as in server_federate
+
+
+def configure(core_type, log_level, broker_address, total_seconds, bundled=False):
+    """Set the HELICS options and the simulated period in the definitions of this process, without timing or checkpoints."""
+    definitions.VECTOR_BUNDLES = bundled
+    definitions.HELICS_CORE_TYPE = core_type
+    definitions.HELICS_LOG_LEVEL = log_level
+    definitions.HELICS_BROKER_ADDRESS = broker_address
+    definitions.TOTAL_SECONDS = total_seconds
+    definitions.TIMING_ENABLED = False
+    definitions.CHECKPOINT_INTERVAL_SECONDS = 0
+
+
+def run_energyplus(total_seconds):
+    """EnergyPlus stand-in driving time: publish the sensors, then read the actuators of the next timestep."""
+    subs = [federate.Sub(name=name, unit=unit) for name, unit in ACTUATORS]
+    pubs = [federate.Pub(name=name, unit=unit) for name, unit in SENSORS]
+    ep_federate = federate.mostcool_federate(federate_name="EnergyPlus", subscriptions=subs, publications=pubs,
+                                             bundle_sources=["Controller", "Server_1"])
+    rng = np.random.default_rng(0)
+    # HVAC and facility demand, fan mass flow rate, node temperature and CPU loading in their EnergyPlus ranges
+    sensors = np.column_stack((rng.uniform(1e5, 2e5, 144), rng.uniform(2e5, 4e5, 144), rng.uniform(20, 40, 144),
+                               rng.uniform(15, 25, 144), rng.uniform(0.2, 1.0, 144)))
+    step = 0
+    while ep_federate.granted_time < total_seconds:
+        ep_federate.publish_all(sensors[step % len(sensors)])
+        ep_federate.request_time()
+        ep_federate.read_all()
+        step += 1
+    ep_federate.destroy_federate()
+
+
+def run_controller(total_seconds):
+    controller = Controller()
+    while controller.federate.granted_time < total_seconds:
+        controller.advance()
+    controller.finalize()
+
+
+def run_thermal(total_seconds):
+    """Thermal stand-in: the energy balance of server_federate without the ROM evaluation."""
+    subs = [federate.Sub(name=name, unit=unit) for name, unit in SENSORS]
+    pubs = [federate.Pub(name=name, unit=unit) for name, unit in THERMAL_ACTUATORS]
+    thermal_federate = federate.mostcool_federate(federate_name="Server_1", subscriptions=subs, publications=pubs,
+                                                  wait_for_updates=True, bundle_sources=["EnergyPlus"])
+    while thermal_federate.granted_time < total_seconds:
+        thermal_federate.request_time()
+        thermal_federate.read_all()
+        _, _, _, supply_temperature, cpu_loading = thermal_federate.sub_values
+        supply_approach_temperature, return_approach_temperature, _, _, _ = energy_balance.data_center_temperature_deltas(
+            supply_temperature, 5, cpu_loading, 84)
+        thermal_federate.publish_all([supply_approach_temperature, return_approach_temperature])
+    thermal_federate.destroy_federate()
+
+
+RUNNERS = {"EnergyPlus": run_energyplus, "Controller": run_controller, "Server_1": run_thermal}
+
+
+def run_federate(role, core_type, log_level, broker_address, total_seconds, bundled, results):
+    """Run one federate of the synthetic co-simulation and put its (role, wall time in s) in results."""
+    configure(core_type, log_level, broker_address, total_seconds, bundled)
+    start = time.perf_counter()
+    RUNNERS[role](total_seconds)
+    results.put((role, time.perf_counter() - start))
+
+
+def collect(results, workers, timeout):
+    """Wall times put by the workers, failing as soon as one of them died without one."""
+    federate_times = {}
+    deadline = time.perf_counter() + timeout
+    while len(federate_times) < len(workers):
+        try:
+            role, seconds = results.get(timeout=1)
+            federate_times[role] = seconds
+        except queue.Empty:
+            # Threads have no exit code, a failed thread is only caught by the timeout
+            failed = [worker.name for worker in workers if getattr(worker, "exitcode", None)]
+            if failed:
+                raise RuntimeError(f"Federate processes {failed} failed")
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"Federates did not finish within {timeout} s")
+    for worker in workers:
+        worker.join(timeout)
+    return federate_times
+
+
+def run_synthetic(core_type, days, log_level="helics_log_level_warning", port=BASE_PORT, bundled=False, timeout=600):
+    """
+    Run the synthetic co-simulation with one core type.
+
+    Parameters:
+    - core_type: One of definitions.HELICS_CORE_TYPES.
+    - days: Number of simulated days.
+    - log_level: A key of definitions.LOG_LEVEL_MAP.
+    - port: Broker port of the network core types.
+    - bundled: Exchange one vector publication per federate (see federate.mostcool_federate).
+    - timeout: Seconds to wait for the federates.
+
+    Returns:
+    - The wall time of the whole run and of each federate in seconds, and per simulated day.
+    """
+    total_seconds = 24 * 3600 * days
+    broker_address = f"127.0.0.1:{port}" if core_type in NETWORK_CORE_TYPES else None
+    start = time.perf_counter()
+    if core_type == "inproc":
+        import helics as h
+
+        # The inproc broker and cores only exist inside this process, the federates run as threads
+        broker = h.helicsCreateBroker(core_type, "", f"-f {len(ROLES)}")
+        results = queue.Queue()
+        workers = [threading.Thread(target=run_federate, args=(role, core_type, log_level, None, total_seconds, bundled, results))
+                   for role in ROLES]
+    else:
+        broker = subprocess.Popen(broker_command(core_type, log_level, broker_address, len(ROLES)).split(),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        # spawn starts clean interpreters, as helics run does, instead of forking the benchmark's HELICS state
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        workers = [context.Process(target=run_federate, args=(role, core_type, log_level, broker_address, total_seconds, bundled, results))
+                   for role in ROLES]
+    try:
+        for worker in workers:
+            worker.start()
+        federate_times = collect(results, workers, timeout)
+        wall_time = time.perf_counter() - start
+    finally:
+        if core_type != "inproc":
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+            try:
+                broker.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                broker.kill()
+    del broker
+    return {
+        "core_type": core_type,
+        "mode": "synthetic",
+        "bundled": bundled,
+        "days": days,
+        "wall_time_s": wall_time,
+        "wall_time_per_day_s": wall_time / days,
+        "federate_time_per_day_s": {role: seconds / days for role, seconds in federate_times.items()},
+    }
+
+
+def run_full(core_type, log_level="helics_log_level_warning", port=BASE_PORT, bundled=False):
+    """
+    Time `helics run` of the real federates with one core type (needs EnergyPlus and the CFD data).
+
+    The federates also write their per-step timings to the run's output_dir/timing, see mostcool.core.timing.
+    """
+    if core_type == "inproc":
+        raise ValueError("The inproc core needs all federates in one process, benchmark the direct engine instead")
+    run_config = {**definitions.RUN_CONFIG, "helics_core_type": core_type, "helics_log_level": log_level, "vector_bundles": bundled,
+                  "checkpoint_interval_days": 0, "timing": True,
+                  "helics_broker_address": f"127.0.0.1:{port}" if core_type in NETWORK_CORE_TYPES else None}
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = RunConfig.from_dict(run_config).save(os.path.join(directory, "config.json"))
+        runner_path = write_runner_config(os.path.join(directory, "runner.json"), run_config, config_path)
+        start = time.perf_counter()
+        subprocess.run(["helics", "run", f"--path={runner_path}"], check=True)
+        wall_time = time.perf_counter() - start
+    return {
+        "core_type": core_type,
+        "mode": "full",
+        "bundled": bundled,
+        "days": definitions.NUMBER_OF_DAYS,
+        "wall_time_s": wall_time,
+        "wall_time_per_day_s": wall_time / definitions.NUMBER_OF_DAYS,
+    }
+
+
+def run_benchmarks(core_types=definitions.HELICS_CORE_TYPES, days=7, log_level="helics_log_level_warning", full=False,
+                   bundled=False):
+    results = []
+    for index, core_type in enumerate(core_types):
+        # Every run gets its own port, the previous broker's may still be in TIME_WAIT
+        port = BASE_PORT + 10 * index
+        if full:
+            result = run_full(core_type, log_level, port, bundled)
+        else:
+            result = run_synthetic(core_type, days, log_level, port, bundled)
+        print(f"{core_type:>8}: {result['wall_time_per_day_s']:.3g} s per simulated day "
+              f"({result['wall_time_s']:.3g} s for {result['days']} days)")
+        results.append(result)
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "helics": __import__("helics").helicsGetVersion(),
+        "timestep_seconds": definitions.TIMESTEP_PERIOD_SECONDS,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the co-simulation under each HELICS core type")
+    parser.add_argument("--core-types", nargs="+", default=definitions.HELICS_CORE_TYPES,
+                        choices=definitions.HELICS_CORE_TYPES, help="Core types to benchmark")
+    parser.add_argument("--days", type=int, default=7, help="Simulated days of the synthetic co-simulation")
+    parser.add_argument("--log-level", default="helics_log_level_warning", choices=list(definitions.LOG_LEVEL_MAP),
+                        help="HELICS log level of the broker and the federates")
+    parser.add_argument("--full", action="store_true",
+                        help="Time helics run of the real federates instead (NUMBER_OF_DAYS of the run configuration)")
+    parser.add_argument("--bundled", action="store_true", help="Exchange one vector publication per federate")
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    core_types = [core_type for core_type in args.core_types if not (args.full and core_type == "inproc")]
+    benchmark = run_benchmarks(core_types, args.days, args.log_level, args.full, args.bundled)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(benchmark, f, indent=2)
@@ -0,0 +1,191 @@
+"""Micro-benchmarks of the thermal ROM prediction paths on synthetic POD modes
+
+Example:
+    python -m mostcool.benchmarks.thermal_rom --nodes 10000 1000000 --output rom_benchmark.json
+    python -m mostcool.benchmarks.thermal_rom --nodes 10000 --compare rom_benchmark.json
+    python -m mostcool.benchmarks.thermal_rom --nodes 1000000 --paths rom_hotspot --max-latency-ms 5
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+from scipy.interpolate import Rbf
+from sklearn.preprocessing import MinMaxScaler
+from mostcool.benchmarks import git_commit
+from mostcool.thermal.response_surface import ResponseSurface
+from mostcool.thermal.rom import CPU_LOAD_FRACTION_RANGE, VELOCITY_RANGE, ThermalROM
+
+
+PATHS = ["rbf_per_coefficient", "rom", "rom_hotspot", "response_surface"]
+
+
+def synthetic_training_data(n_nodes, n_samples=20, n_modes=6, seed=0):
+    """Training samples, coefficients and POD modes with the magnitudes of the CFD data, without downloading it."""
+    rng = np.random.default_rng(seed)
+    parameters = np.column_stack((rng.uniform(*VELOCITY_RANGE, n_samples), rng.uniform(*CPU_LOAD_FRACTION_RANGE, n_samples)))
+    velocity, load = parameters[:, 0], parameters[:, 1]
+    coefficients = np.column_stack(
+        [-1.27e6 - 1e4 * load + 2e3 * velocity]
+        + [10 ** (4 - i) * np.sin(i * velocity / 3 + load * i) for i in range(1, n_modes)]
+    )
+    modes = 1e-3 * rng.normal(size=(n_nodes, n_modes))
+    modes[:, 0] = -2.5e-4 * (1 + 0.01 * rng.random(n_nodes))
+    return parameters, coefficients, modes
+
+
+class PerCoefficientRbf:
+    """The original prediction path: one scipy Rbf per POD coefficient and a full-field reconstruction."""
+
+    def __init__(self, parameters, coefficients, modes):
+        self.param_scaler = MinMaxScaler().fit(parameters)
+        self.coeff_scaler = MinMaxScaler().fit(coefficients)
+        scaled_params = self.param_scaler.transform(parameters)
+        scaled_coeffs = self.coeff_scaler.transform(coefficients)
+        self.rbf_models = [Rbf(scaled_params[:, 0], scaled_params[:, 1], scaled_coeffs[:, i], function="multiquadric")
+                           for i in range(scaled_coeffs.shape[1])]
+        self.modes = modes
+
+    def max_temperature(self, velocity, CPU_load_fraction):
+        results = []
+        for point in zip(np.atleast_1d(velocity), np.atleast_1d(CPU_load_fraction)):
+            normalized = self.param_scaler.transform(np.array([point]))
+            predicted = np.array([model(normalized[:, 0], normalized[:, 1]) for model in self.rbf_models]).T
+            results.append(np.max(np.dot(self.modes, self.coeff_scaler.inverse_transform(predicted).T)))
+        return np.array(results)
+
+
+def build(path, parameters, coefficients, modes):
+    if path == "rbf_per_coefficient":
+        return PerCoefficientRbf(parameters, coefficients, modes)
+    rom = ThermalROM(parameters, coefficients, pod_modes=modes)
+    if path == "rom_hotspot":
+        rom.build_hotspot_index()
+    elif path == "response_surface":
+        rom.build_hotspot_index()
+        return ResponseSurface(rom)
+    return rom
+
+
+def measure(path, n_nodes, n_samples=20, batch_size=1000, repeats=20, seed=0):
+    """
+    Fit time, single-point latency, batch throughput and peak traced memory of one prediction path.
+
+    The peak memory includes the POD modes the path holds, their own size is reported as modes_mb.
+    """
+    # Traced from before the modes are built, they are the bulk of a path's memory at large meshes
+    tracemalloc.start()
+    parameters, coefficients, modes = synthetic_training_data(n_nodes, n_samples, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    velocity = rng.uniform(*VELOCITY_RANGE, batch_size)
+    CPU_load_fraction = rng.uniform(*CPU_LOAD_FRACTION_RANGE, batch_size)
+
+    start = time.perf_counter()
+    model = build(path, parameters, coefficients, modes)
+    fit_time = time.perf_counter() - start
+
+    latencies = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        model.max_temperature(velocity[i % batch_size], CPU_load_fraction[i % batch_size])
+        latencies.append(time.perf_counter() - start)
+
+    # The per-coefficient path is a Python loop, a short batch is enough to measure its throughput
+    n_batch = min(batch_size, repeats) if path == "rbf_per_coefficient" else batch_size
+    start = time.perf_counter()
+    model.max_temperature(velocity[:n_batch], CPU_load_fraction[:n_batch])
+    batch_time = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "path": path,
+        "n_nodes": n_nodes,
+        "n_samples": n_samples,
+        "fit_time_s": fit_time,
+        "single_latency_s": float(np.median(latencies)),
+        "batch_size": n_batch,
+        "batch_throughput_per_s": n_batch / batch_time,
+        "peak_memory_mb": peak_memory / 2**20,
+        "modes_mb": modes.nbytes / 2**20,
+    }
+
+
+def run_benchmarks(nodes, paths=PATHS, n_samples=20, batch_size=1000, repeats=20):
+    results = []
+    for n_nodes in nodes:
+        for path in paths:
+            result = measure(path, n_nodes, n_samples=n_samples, batch_size=batch_size, repeats=repeats)
+            print(f"{path:>20} {n_nodes:>9} nodes: fit {result['fit_time_s']:.3g} s, "
+                  f"single {result['single_latency_s'] * 1e3:.3g} ms, "
+                  f"batch {result['batch_throughput_per_s']:.3g} points/s, peak {result['peak_memory_mb']:.1f} MB "
+                  f"(modes {result['modes_mb']:.1f} MB)")
+            results.append(result)
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "results": results,
+    }
+
+
+def compare(current, previous):
+    """Print the ratio of each metric to a previous benchmark file (>1 means slower or bigger)."""
+    previous_results = {(r["path"], r["n_nodes"]): r for r in previous["results"]}
+    print(f"Compared to {previous.get('commit')}:")
+    for result in current["results"]:
+        reference = previous_results.get((result["path"], result["n_nodes"]))
+        if reference is None:
+            continue
+        print(f"{result['path']:>20} {result['n_nodes']:>9} nodes: "
+              f"fit x{result['fit_time_s'] / reference['fit_time_s']:.2f}, "
+              f"single x{result['single_latency_s'] / reference['single_latency_s']:.2f}, "
+              f"throughput x{result['batch_throughput_per_s'] / reference['batch_throughput_per_s']:.2f}, "
+              f"memory x{result['peak_memory_mb'] / max(reference['peak_memory_mb'], 1e-9):.2f}")
+
+
+def check_budgets(benchmark, max_latency_ms=None, min_throughput=None):
+    """Results of the benchmark (legacy path excluded) over the latency or under the throughput budget."""
+    failures = []
+    for result in benchmark["results"]:
+        if result["path"] == "rbf_per_coefficient":
+            continue
+        if max_latency_ms is not None and result["single_latency_s"] * 1e3 > max_latency_ms:
+            failures.append(f"{result['path']} ({result['n_nodes']} nodes): single-point latency "
+                            f"{result['single_latency_s'] * 1e3:.3g} ms over the {max_latency_ms} ms budget")
+        if min_throughput is not None and result["batch_throughput_per_s"] < min_throughput:
+            failures.append(f"{result['path']} ({result['n_nodes']} nodes): batch throughput "
+                            f"{result['batch_throughput_per_s']:.3g} points/s under the {min_throughput} points/s budget")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the thermal ROM prediction paths on synthetic modes")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10000, 100000, 1000000, 5000000],
+                        help="Mesh sizes (number of POD mode rows)")
+    parser.add_argument("--paths", nargs="+", default=PATHS, choices=PATHS, help="Prediction paths to benchmark")
+    parser.add_argument("--samples", type=int, default=20, help="Number of training samples")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Operating points per batch call")
+    parser.add_argument("--repeats", type=int, default=20, help="Single-point calls timed per path")
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="Previous results JSON file to compare against")
+    parser.add_argument("--max-latency-ms", type=float, default=None, help="Single-point latency budget in ms")
+    parser.add_argument("--min-throughput", type=float, default=None, help="Batch throughput budget in points/s")
+    args = parser.parse_args()
+
+    benchmark = run_benchmarks(args.nodes, args.paths, args.samples, args.batch_size, args.repeats)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(benchmark, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(benchmark, json.load(f))
+    failures = check_budgets(benchmark, args.max_latency_ms, args.min_throughput)
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,269 @@
+"""Periodic checkpoints of the federates and the restart of a run from the last complete one
+
+In runs that enable checkpoints (the Simulator's, other runs opt in through checkpoint_interval_days), each
+federate saves its state when its granted time crosses a simulated day boundary (definitions.
+CHECKPOINT_INTERVAL_SECONDS) to <checkpoint_dir>/<time>/<federate>.json. A resumed run starts from the latest
+time every federate saved:
+- the federates start their clocks at that time (definitions.START_SECONDS) and restore their state,
+- the thermal recorders drop the rows recorded after it,
+- EnergyPlus, whose state cannot be saved, re-runs from that day: the RunPeriod of the IDF is moved to begin
+  there, and the outputs of the run segments are stitched together at the end.
+"""
+
+import glob
+import json
+import logging
+import os
+import re
+import shutil
+from datetime import date, timedelta
+import pandas as pd
+import mostcool.core.definitions as definitions
+
+
+logger = logging.getLogger(__name__)
+
+FEDERATES = ["EnergyPlus", "Controller", "Server_1"]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_SECONDS = 24 * 3600
+
+
+def write_json_atomic(path, data):
+    """Write data as JSON to path through a temporary file, so a crash never leaves a partial checkpoint."""
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, path)
+
+
+def run_checkpoint_dir(output_dir=None):
+    """Checkpoint directory of the run writing to output_dir, defaults to definitions.OUTPUT_DIR."""
+    return os.path.join(output_dir or definitions.OUTPUT_DIR, "checkpoints")
+
+
+def run_segments_dir(output_dir=None):
+    """Directory of the resumed run segments of the run writing to output_dir, defaults to definitions.OUTPUT_DIR."""
+    return os.path.join(output_dir or definitions.OUTPUT_DIR, "segments")
+
+
+def restart_idf_path(output_dir=None):
+    """Restart IDF of the run writing to output_dir, defaults to definitions.OUTPUT_DIR."""
+    return os.path.join(output_dir or definitions.OUTPUT_DIR, "run_config", "restart.idf")
+
+
+def checkpoint_times(checkpoint_dir=None):
+    """Times with at least one checkpoint, in increasing order."""
+    checkpoint_dir = checkpoint_dir or run_checkpoint_dir()
+    return sorted(int(os.path.basename(path)) for path in glob.glob(os.path.join(checkpoint_dir, "*"))
+                  if os.path.basename(path).isdigit())
+
+
+def latest_checkpoint(federates=FEDERATES, checkpoint_dir=None):
+    """Latest time at which all the federates saved a checkpoint, None if there is none."""
+    checkpoint_dir = checkpoint_dir or run_checkpoint_dir()
+    complete = [time for time in checkpoint_times(checkpoint_dir)
+                if all(os.path.exists(os.path.join(checkpoint_dir, str(time), f"{federate}.json")) for federate in federates)]
+    return complete[-1] if complete else None
+
+
+def clear_checkpoints(checkpoint_dir=None, segments_dir=None):
+    """Remove the checkpoints and run segments of a previous run."""
+    shutil.rmtree(checkpoint_dir or run_checkpoint_dir(), ignore_errors=True)
+    shutil.rmtree(segments_dir or run_segments_dir(), ignore_errors=True)
+
+
+class Checkpointer:
+    """Saves and restores the state of one federate at the checkpoint times."""
+
+    def __init__(self, federate_name, interval_seconds=None, start_seconds=None, checkpoint_dir=None, keep=2):
+        """
+        Parameters:
+        - federate_name: Name of the federate, used for the file names.
+        - interval_seconds: Time between checkpoints, defaults to definitions.CHECKPOINT_INTERVAL_SECONDS. 0 disables them.
+        - start_seconds: Time the run starts at, defaults to definitions.START_SECONDS.
+        - checkpoint_dir: Directory of the checkpoints, defaults to OUTPUT_DIR/checkpoints.
+        - keep: Number of checkpoints of this federate kept, older ones are removed.
+        """
+        self.federate_name = federate_name
+        self.interval = definitions.CHECKPOINT_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self.start_seconds = definitions.START_SECONDS if start_seconds is None else start_seconds
+        self.checkpoint_dir = checkpoint_dir or run_checkpoint_dir()
+        self.keep = keep
+        self.next_time = (self.start_seconds // self.interval + 1) * self.interval if self.interval else None
+
+    def path(self, time):
+        return os.path.join(self.checkpoint_dir, str(int(time)), f"{self.federate_name}.json")
+
+    def save_if_due(self, granted_time, get_state):
+        """
+        Save the state returned by get_state() if granted_time reached the next checkpoint time. To be called
+        right after a time grant, before the step at granted_time, so the state covers the times before it.
+
+        Returns:
+        - The checkpoint time, None if nothing was saved.
+        """
+        if self.next_time is None or granted_time < self.next_time:
+            return None
+        # A federate waiting for updates may skip boundaries, its state then holds for the last one
+        time = int(granted_time // self.interval * self.interval)
+        self.next_time = time + self.interval
+        if time >= definitions.TOTAL_SECONDS:
+            return None
+        self.save(time, get_state())
+        return time
+
+    def save(self, time, state):
+        path = self.path(time)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_json_atomic(path, {"federate": self.federate_name, "time": int(time), "state": state})
+        logger.info(f"Checkpoint of {self.federate_name} saved at {time} s")
+        own_times = [saved for saved in checkpoint_times(self.checkpoint_dir) if os.path.exists(self.path(saved))]
+        for old_time in own_times[:-self.keep]:
+            os.remove(self.path(old_time))
+            old_dir = os.path.dirname(self.path(old_time))
+            if not os.listdir(old_dir):
+                os.rmdir(old_dir)
+
+    def load(self, time=None):
+        """State saved at time, defaults to the start of the run."""
+        time = self.start_seconds if time is None else time
+        with open(self.path(time)) as f:
+            return json.load(f)["state"]
+
+
+def segment_dir(start_seconds, segments_dir=None):
+    """EnergyPlus output directory of the run segment starting at start_seconds."""
+    return os.path.join(segments_dir or run_segments_dir(), str(int(start_seconds)))
+
+
+def write_restart_idf(idf_path, start_seconds, output_path=None):
+    """
+    Copy an IDF with its RunPeriod moved to begin start_seconds (whole days) after the original begin day.
+
+    Parameters:
+    - idf_path: EnergyPlus model of the run.
+    - start_seconds: Time the resumed run starts at, a multiple of a day.
+    - output_path: Restart IDF to write, defaults to OUTPUT_DIR/run_config/restart.idf.
+
+    Returns:
+    - output_path.
+    """
+    if start_seconds % DAY_SECONDS:
+        raise ValueError(f"EnergyPlus can only restart at the beginning of a day, not at {start_seconds} s")
+    output_path = output_path or restart_idf_path()
+    with open(idf_path, newline="") as f:
+        lines = f.read().splitlines(keepends=True)
+
+    def field(line):
+        match = re.match(r"(\s*)([^,;!]*)([,;].*)", line, re.DOTALL)
+        return match.group(2).strip(), lambda value: f"{match.group(1)}{value}{match.group(3)}"
+
+    start = next(i for i, line in enumerate(lines) if line.strip().lower().startswith("runperiod,"))
+    end = next(i for i in range(start, len(lines)) if ";" in lines[i].split("!")[0])
+    fields = {line.split("!-")[1].strip().lower(): i for i, line in enumerate(lines[start:end + 1], start) if "!-" in line}
+    month_line, day_line = fields["begin month"], fields["begin day of month"]
+    begin_month, set_month = field(lines[month_line])
+    begin_day, set_day = field(lines[day_line])
+    days = int(start_seconds // DAY_SECONDS)
+    # The run periods do not set a year, EnergyPlus then runs a non-leap year
+    restart_day = date(2001, int(begin_month), int(begin_day)) + timedelta(days=days)
+    lines[month_line] = set_month(restart_day.month)
+    lines[day_line] = set_day(restart_day.day)
+    weekday_line = fields.get("day of week for start day")
+    if weekday_line is not None:
+        weekday, set_weekday = field(lines[weekday_line])
+        weekday = WEEKDAYS.index(weekday.capitalize()) if weekday else WEEKDAYS.index("Sunday")
+        lines[weekday_line] = set_weekday(WEEKDAYS[(weekday + days) % 7])
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", newline="") as f:
+        f.writelines(lines)
+    logger.info(f"Restart IDF written to {output_path}, run period begins on {restart_day:%m/%d}")
+    return output_path
+
+
+def read_eso(path):
+    """
+    Rows of an EnergyPlus eplusout.eso as in the eplusout.csv ReadVarsESO makes of it, for the TimeStep and
+    Hourly variables of the last environment (the run period). EnergyPlus writes the ESO as it runs, the rows
+    of a run that died are kept up to the last complete timestep.
+
+    Returns:
+    - A DataFrame with a Date/Time column (" MM/DD  HH:MM:SS") and one "<key>:<variable> [unit](<frequency>)"
+      column per variable, None if the ESO has no complete timestep.
+    """
+    columns, rows = {}, {}
+    time, complete = None, False
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line == "End of Data Dictionary":
+                break
+            code, _, frequency = line.partition(" !")
+            fields = code.split(",", 3)
+            frequency = frequency.split()[0] if frequency else ""
+            if len(fields) == 4 and fields[0].isdigit() and frequency in ("TimeStep", "Hourly"):
+                columns[fields[0]] = f"{fields[2]}:{fields[3]}({frequency})"
+        for line in f:
+            fields = line.strip().split(",")
+            if fields[0] == "End of Data":
+                complete = True
+            elif fields[0] == "1":
+                # A new environment, only the last one (the run period) is kept
+                rows, time = {}, None
+            elif fields[0] == "2":
+                # Day of simulation, month, day, DST, hour, start minute, end minute, day type
+                month, day, hour, end_minute = int(fields[2]), int(fields[3]), int(fields[5]), float(fields[7])
+                hour, minute = (hour, 0) if end_minute == 60 else (hour - 1, int(end_minute))
+                time = f" {month:02d}/{day:02d}  {hour:02d}:{minute:02d}:00"
+                rows.setdefault(time, {})
+            elif time is not None and fields[0] in columns and len(fields) > 1:
+                rows[time][columns[fields[0]]] = float(fields[1])
+    # The last timestep may have been cut off when the run died
+    times = list(rows) if complete else list(rows)[:-1]
+    if not times:
+        return None
+    eso = pd.DataFrame([rows[time] for time in times], columns=list(columns.values()))
+    eso.insert(0, "Date/Time", times)
+    return eso
+
+
+def stitch_energyplus_output(output_dir=None, segments_dir=None, timestep_seconds=definitions.TIMESTEP_PERIOD_SECONDS,
+                             file_name="eplusout.csv"):
+    """
+    Join the EnergyPlus CSV outputs of the run segments into output_dir/file_name.
+
+    The first segment runs in output_dir, every resumed one in segment_dir(start). Each segment contributes
+    its rows (one per timestep) up to the start of the next one. EnergyPlus only writes the CSV when it
+    finishes, the rows of a segment that died are read from the eplusout.eso it wrote as it ran (see read_eso).
+    A segment with neither leaves a gap, which is logged. output_dir defaults to definitions.OUTPUT_DIR and
+    segments_dir to the segments directory of output_dir.
+
+    Returns:
+    - The stitched output as a DataFrame, None if there was only one segment.
+    """
+    output_dir = output_dir or definitions.OUTPUT_DIR
+    segments_dir = segments_dir or run_segments_dir(output_dir)
+    starts = [0] + sorted(int(os.path.basename(path)) for path in glob.glob(os.path.join(segments_dir, "*"))
+                          if os.path.basename(path).isdigit())
+    if len(starts) == 1:
+        return None
+    parts = []
+    for start, end in zip(starts, starts[1:] + [None]):
+        directory = output_dir if start == 0 else segment_dir(start, segments_dir)
+        path, eso_path = os.path.join(directory, file_name), os.path.join(directory, "eplusout.eso")
+        segment = None
+        if os.path.exists(path):
+            segment = pd.read_csv(path)
+        elif os.path.exists(eso_path):
+            segment = read_eso(eso_path)
+            logger.info(f"EnergyPlus output of the segment starting at {start} s read from {eso_path}")
+        if segment is None:
+            logger.warning(f"No EnergyPlus output for the segment starting at {start} s, its rows are missing")
+            continue
+        parts.append(segment if end is None else segment.iloc[:int((end - start) // timestep_seconds)])
+    stitched = pd.concat(parts, ignore_index=True)
+    stitched.to_csv(os.path.join(output_dir, file_name), index=False)
+    return stitched
@@ -0,0 +1,127 @@
+"""Configuration of one co-simulation run
+
+A run is described by one JSON file, written by the Simulator (or a sweep) before the federates start and read
+by every federate of the run. The federates find it through the MOSTCOOL_RUN_CONFIG environment variable, set
+for them by the generated runner file, and the default path otherwise. Several runs can therefore share a
+machine as long as their files, and the output_dir they name, differ.
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass, field, fields
+from typing import Optional
+import mostcool.core.definitions as definitions
+
+
+RUN_CONFIG_ENV = "MOSTCOOL_RUN_CONFIG"
+DEFAULT_RUN_CONFIG_PATH = "/app/Output/run_config/config.json"
+
+
+@dataclass
+class RunConfig:
+    """Options of one run, the keys of its configuration file. Missing keys take the defaults below."""
+
+    control_option: Optional[str] = None  # a CONTROL_OPTIONS name, CHANGE_IT_LOAD when not set
+    datacenter_location: Optional[str] = None  # a LOCATION_MAP key, Chicago when not set
+    idf_path: Optional[str] = None  # model selected in the GUI, the federates run the IDF of the control option
+    epw_path: Optional[str] = None  # weather file selected in the GUI, the federates run the one of the location
+    output_dir: str = "/app/Output"
+    output_variables: Optional[list] = None  # only report these (Key/Variable Name or Variable Name) and the sensors, None reports all
+    pruned_output_frequency: Optional[str] = None  # e.g. "Hourly" to move the other output variables there, None drops them
+
+    # Co-simulation options
+    event_driven: bool = False  # only exchange changed values and let idle federates skip steps
+    publication_change_tolerance: float = 1e-3  # default change needed to republish a value in event-driven mode
+    timing: bool = False  # write per-step federate timings to output_dir/timing, opt-in (the benchmarks enable it)
+    helics_core_type: str = definitions.HELICS_DEFAULTS["helics_core_type"]
+    helics_log_level: str = definitions.HELICS_DEFAULTS["helics_log_level"]
+    helics_broker_address: Optional[str] = definitions.HELICS_DEFAULTS["helics_broker_address"]
+    vector_bundles: bool = False  # send all outputs of a federate as one vector publication per step
+    checkpoint_interval_days: int = 0  # whole days, 0 disables checkpoints, Simulator runs checkpoint daily to be resumable
+    federate_periods: dict = field(default_factory=dict)  # {federate name: seconds}, see federate.validate_periods
+    start_seconds: int = 0  # simulation time a resumed run starts at, a checkpoint time (see checkpoint.py)
+
+    # Thermal model options
+    thermal_rom_mode: str = "rbf"  # "rbf" evaluates the ROM, "table" interpolates a precomputed response surface
+    response_surface_interpolation: str = "bicubic"  # "bilinear" or "bicubic"
+    thermal_cache_size: int = 4096  # cached operating points, 0 disables the prediction cache
+    thermal_cache_velocity_tolerance: float = 0.0  # m/s, 0 for exact keys
+    thermal_cache_load_tolerance: float = 0.0  # CPU load fraction, 0 for exact keys
+
+    path: Optional[str] = field(default=None, compare=False)  # file the configuration was loaded from or saved to
+
+    def __post_init__(self):
+        # EnergyPlus can only restart a run at the beginning of a day (see checkpoint.write_restart_idf)
+        if self.checkpoint_interval_days < 0 or self.checkpoint_interval_days % 1:
+            raise ValueError(f"checkpoint_interval_days must be a whole number of days, got {self.checkpoint_interval_days}")
+
+    @classmethod
+    def from_dict(cls, options, path=None):
+        """RunConfig of the options of a configuration file, unknown keys raise a ValueError."""
+        known = {f.name for f in fields(cls)} - {"path"}
+        unknown = set(options) - known
+        if unknown:
+            raise ValueError(f"Unknown run configuration options {sorted(unknown)}, expected some of {sorted(known)}")
+        return cls(**options, path=path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f), path)
+
+    @classmethod
+    def from_env(cls):
+        """RunConfig of the file named by MOSTCOOL_RUN_CONFIG (or the default path), the defaults if it does not exist."""
+        path = os.environ.get(RUN_CONFIG_ENV, DEFAULT_RUN_CONFIG_PATH)
+        if os.path.exists(path):
+            return cls.load(path)
+        print(f"No config file found at {path}. Using the default options, in Chicago, IL")
+        return cls(path=path)
+
+    def to_dict(self):
+        options = asdict(self)
+        del options["path"]
+        return options
+
+    def save(self, path=None):
+        """Write the configuration file to path (defaults to the path it was loaded from) and return the path."""
+        self.path = path or self.path or DEFAULT_RUN_CONFIG_PATH
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+        return self.path
+
+    @property
+    def control(self):
+        if self.control_option is None:
+            return definitions.CONTROL_OPTIONS.CHANGE_IT_LOAD
+        try:
+            return definitions.CONTROL_OPTIONS[self.control_option]
+        except KeyError:
+            return definitions.CONTROL_OPTIONS.CHANGE_SUPPLY_DELTA_T
+
+    @property
+    def energyplus_idf_path(self):
+        """EnergyPlus model of the control option."""
+        if self.control == definitions.CONTROL_OPTIONS.CHANGE_LIQUID_COOLING:
+            return definitions.LIQUID_COOLING_IDF_PATH
+        return definitions.AIR_COOLING_IDF_PATH
+
+    @property
+    def energyplus_epw_path(self):
+        """Weather file of the data center location."""
+        location = self.datacenter_location or "Chicago, IL"
+        return os.path.join(definitions.ENERGYPLUS_INSTALL_PATH, "WeatherData", definitions.LOCATION_MAP[location])
+
+    @property
+    def graphs_dir(self):
+        return os.path.join(self.output_dir, "graphs")
+
+    @property
+    def checkpoint_interval_seconds(self):
+        return int(self.checkpoint_interval_days * 24 * 3600)
+
+    @property
+    def all_federate_periods(self):
+        """Step period of every federate, the EnergyPlus timestep unless set in federate_periods."""
+        return {**definitions.DEFAULT_FEDERATE_PERIODS, **self.federate_periods}
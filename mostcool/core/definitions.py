@@ -1,7 +1,12 @@
+"""Constants of the co-simulation, and the options of the current run read through RunConfig
+
+Importing this module does no I/O. The run-scoped names (RUN_SCOPED below, e.g. OUTPUT_DIR, CONTROL_OPTION,
+HELICS_CORE_TYPE) are read from the RunConfig of the process (see mostcool.core.config), loaded from its file on
+first use. They can still be assigned, e.g. by tests and benchmarks, which then take precedence.
+"""
+
 import os
-from pathlib import Path
 from enum import IntEnum
-import json
 
 # Available control options
 class CONTROL_OPTIONS(IntEnum):
@@ -9,25 +14,9 @@ class CONTROL_OPTIONS(IntEnum):
     CHANGE_SUPPLY_DELTA_T = 2
     CHANGE_IT_LOAD = 3
     
-# TODO: select a control option
-
-if os.path.exists('/app/Output/run_config/config.json'):
-    with open('/app/Output/run_config/config.json', 'r') as f:
-        data = json.load(f)
-        control_option_name = data["control_option"]
-        try:
-            CONTROL_OPTION = CONTROL_OPTIONS[control_option_name]
-        except KeyError:
-            CONTROL_OPTION = CONTROL_OPTIONS.CHANGE_SUPPLY_DELTA_T
-else:   
-    CONTROL_OPTION = CONTROL_OPTIONS.CHANGE_IT_LOAD
-    
-if CONTROL_OPTION == CONTROL_OPTIONS.CHANGE_LIQUID_COOLING:
-    IDF_PATH = "/app/mostcool/energy/data/2ZoneDataCenterCRAHandplant.idf"
-else:
-    IDF_PATH = "/app/mostcool/energy/data/2ZoneDataCenterCRAHandplant_aircoolingonly.idf"
+LIQUID_COOLING_IDF_PATH = "/app/mostcool/energy/data/2ZoneDataCenterCRAHandplant.idf"
+AIR_COOLING_IDF_PATH = "/app/mostcool/energy/data/2ZoneDataCenterCRAHandplant_aircoolingonly.idf"
 
-OUTPUT_DIR = "/app/Output"
 ENERGYPLUS_INSTALL_PATH = "/EnergyPlus"
 LOCATION_MAP = {
     "Chicago, IL" : "USA_IL_Chicago-OHare.Intl.AP.725300_TMY3.epw",
@@ -36,25 +25,75 @@ LOCATION_MAP = {
     "Tampa, FL": "USA_FL_Tampa.Intl.AP.722110_TMY3.epw"
 }
 
-if os.path.exists('/app/Output/run_config/config.json'):
-    with open('/app/Output/run_config/config.json', 'r') as f:
-        data = json.load(f)
-        datacenter_location_name = data["datacenter_location"]
-        EPW_FILE = LOCATION_MAP[datacenter_location_name]
-        EPW_PATH = os.path.join(ENERGYPLUS_INSTALL_PATH, "WeatherData", EPW_FILE)
-else:   
-    print("No config file found. Using default EPW_PATH value as USA_IL_Chicago-OHare.Intl.AP.725300_TMY3.epw")
-    EPW_PATH = os.path.join(ENERGYPLUS_INSTALL_PATH, "WeatherData/USA_IL_Chicago-OHare.Intl.AP.725300_TMY3.epw")
-
-
 RESOURCES_DIR = "./Resources"
-GRAPHS_DIR = os.path.join(OUTPUT_DIR, "graphs")
-Path(GRAPHS_DIR).mkdir(parents=True, exist_ok=True)
 
 TIMESTEP_PERIOD_SECONDS = 600  # 10 mins
 NUMBER_OF_DAYS = 14   # Two weeks
 TOTAL_SECONDS = 60 * 60 * 24 * NUMBER_OF_DAYS
 
+HELICS_CORE_TYPES = ["zmq", "zmq_ss", "tcp", "tcp_ss", "ipc", "inproc"]  # inproc only works with all federates in one process
+HELICS_DEFAULTS = {
+    "helics_core_type": "zmq",
+    "helics_log_level": "helics_log_level_warning",  # a key of LOG_LEVEL_MAP
+    "helics_broker_address": None,  # e.g. "127.0.0.1:23500", None for the core type default
+}
+DEFAULT_FEDERATE_PERIODS = {"EnergyPlus": TIMESTEP_PERIOD_SECONDS, "Controller": TIMESTEP_PERIOD_SECONDS, "Server_1": TIMESTEP_PERIOD_SECONDS}
+
+# Run-scoped names and the RunConfig attribute they read, see config.RunConfig for the options
+RUN_SCOPED = {
+    "RUN_CONFIG_PATH": "path",
+    "CONTROL_OPTION": "control",
+    "IDF_PATH": "energyplus_idf_path",
+    "EPW_PATH": "energyplus_epw_path",
+    "OUTPUT_DIR": "output_dir",
+    "GRAPHS_DIR": "graphs_dir",
+    "OUTPUT_VARIABLES": "output_variables",
+    "PRUNED_OUTPUT_FREQUENCY": "pruned_output_frequency",
+    # Co-simulation options
+    "EVENT_DRIVEN": "event_driven",
+    "PUBLICATION_CHANGE_TOLERANCE": "publication_change_tolerance",
+    "TIMING_ENABLED": "timing",
+    "HELICS_CORE_TYPE": "helics_core_type",
+    "HELICS_LOG_LEVEL": "helics_log_level",
+    "HELICS_BROKER_ADDRESS": "helics_broker_address",
+    "VECTOR_BUNDLES": "vector_bundles",
+    "CHECKPOINT_INTERVAL_SECONDS": "checkpoint_interval_seconds",
+    "FEDERATE_PERIODS": "all_federate_periods",
+    "START_SECONDS": "start_seconds",
+    # Thermal model options
+    "THERMAL_ROM_MODE": "thermal_rom_mode",
+    "RESPONSE_SURFACE_INTERPOLATION": "response_surface_interpolation",
+    "THERMAL_CACHE_SIZE": "thermal_cache_size",
+    "THERMAL_CACHE_VELOCITY_TOLERANCE": "thermal_cache_velocity_tolerance",
+    "THERMAL_CACHE_LOAD_TOLERANCE": "thermal_cache_load_tolerance",
+}
+_run_config = None
+
+
+def run_config():
+    """RunConfig of this process, loaded from the file named by MOSTCOOL_RUN_CONFIG on first use."""
+    global _run_config
+    if _run_config is None:
+        from mostcool.core.config import RunConfig
+
+        _run_config = RunConfig.from_env()
+    return _run_config
+
+
+def use_run_config(config):
+    """Make config the RunConfig of this process, e.g. once the Simulator saved the one of its run."""
+    global _run_config
+    _run_config = config
+
+
+def __getattr__(name):
+    if name in RUN_SCOPED:
+        return getattr(run_config(), RUN_SCOPED[name])
+    if name == "RUN_CONFIG":
+        return run_config().to_dict()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 ACTUATORS = [
     {
         "component_type": "Schedule:Compact",
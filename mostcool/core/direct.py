@@ -0,0 +1,157 @@
+"""Direct coupling: EnergyPlus, the controller and the thermal model in one process, without a HELICS broker
+
+The federates keep their step logic and exchange values through an in-memory bus with the time semantics
+of the lockstep HELICS co-simulation: every federate is granted the EnergyPlus timesteps, and a value
+published during a step is delivered when the next step is granted.
+
+    python -m mostcool.core.direct
+"""
+
+import functools
+import logging
+import numpy as np
+import mostcool.core.definitions as definitions
+from mostcool.core.controller import Controller
+from mostcool.core.federate import mostcool_federate, validate_periods
+
+
+logger = logging.getLogger(__name__)
+
+
+class DirectBus:
+    """In-memory publication values shared by the federates of one process."""
+
+    def __init__(self):
+        self.values = {}
+        self.versions = {}  # incremented on every delivered publication, to flag updated inputs
+        self._pending = {}
+
+    def publish(self, name, value):
+        self._pending[name] = value
+
+    def read(self, name):
+        """Delivered value (None if never published) and version of a publication."""
+        return self.values.get(name), self.versions.get(name, 0)
+
+    def deliver(self):
+        """Make the values published during the last step visible to the subscribers."""
+        for name, value in self._pending.items():
+            self.values[name] = value
+            self.versions[name] = self.versions.get(name, 0) + 1
+        self._pending.clear()
+
+
+class DirectFederate(mostcool_federate):
+    """
+    Drop-in replacement of mostcool_federate exchanging values through a DirectBus.
+
+    request_time grants the next period immediately. The federate driving time (EnergyPlus) delivers the
+    values of the previous step and calls on_time_granted, which steps the other federates.
+    """
+
+    def __init__(self,
+                 federate_name: str =None,
+                 subscriptions: list =None,
+                 publications: list =None,
+                 event_driven: bool =None,
+                 wait_for_updates: bool =False,
+                 bundled: bool =None,
+                 bundle_sources: list =None,
+                 bus: DirectBus =None,
+                 period: int =None,
+                 on_time_granted=None):
+        """
+        Parameters:
+        - federate_name, subscriptions, publications, event_driven: As for mostcool_federate.
+        - wait_for_updates: Ignored, direct federates are stepped every period.
+        - bundled, bundle_sources: Ignored, the bus has no per-message cost to save.
+        - bus: DirectBus shared by the federates.
+        - period: Time step in seconds, defaults to the period of the federate in definitions.FEDERATE_PERIODS.
+        - on_time_granted: Called with the granted time after each request, only set for the federate driving time.
+        """
+        self.init_signals(federate_name, subscriptions, publications, event_driven, wait_for_updates=False)
+        self.bus = bus
+        self.time_interval_seconds = period or definitions.FEDERATE_PERIODS.get(federate_name, definitions.TIMESTEP_PERIOD_SECONDS)
+        self.on_time_granted = on_time_granted
+        self.seen_versions = np.zeros(len(self.subs), dtype=int)
+        self.logger.info(f"Direct federate for {federate_name} created.")
+
+    def request_time(self):
+        with self.timer.section("request_time", self.granted_time):
+            if self.on_time_granted is not None:
+                self.bus.deliver()
+            self.granted_time = self.granted_time + self.time_interval_seconds
+            if self.on_time_granted is not None:
+                self.on_time_granted(self.granted_time)
+        return self.granted_time
+
+    def receive_inputs(self):
+        for index, sub in enumerate(self.subs):
+            value, version = self.bus.read(sub.name)
+            self.updated[index] = version > self.seen_versions[index]
+            if self.updated[index]:
+                self.sub_values[index] = value
+                self.seen_versions[index] = version
+
+    def send_outputs(self, indices):
+        for index in indices:
+            self.bus.publish(self.pubs[index].name, float(self.pub_values[index]))
+
+    def destroy_federate(self):
+        timing_path = self.timer.write()
+        if timing_path is not None:
+            self.logger.info(f"Step timings written to {timing_path}")
+
+
+def step_due(federate, granted_time, total_time):
+    """Whether the next step of a federate is at granted_time, federates with a longer period skip the times between."""
+    return federate.granted_time < total_time and federate.granted_time + federate.time_interval_seconds <= granted_time
+
+
+class DirectCosimulation:
+    """
+    EnergyPlus, controller and thermal federates coupled in one process.
+
+    At each EnergyPlus timestep the controller and then the thermal model are advanced to the granted time
+    if it is on their period, after which EnergyPlus reads its actuators.
+    """
+
+    def __init__(self, output_dir=None, epw_path=None, idf_path=None):
+        """Outputs go to output_dir, EnergyPlus runs idf_path with epw_path, all default to the run configuration."""
+        output_dir = output_dir or definitions.OUTPUT_DIR
+        validate_periods(definitions.FEDERATE_PERIODS)
+        # EnergyPlus and the thermal data are only needed to run, not to import this module
+        from mostcool.energy.energy import energyplus_runner
+        from mostcool.thermal.server_federate import Server_thermal_federate
+
+        self.bus = DirectBus()
+        federate_factory = functools.partial(DirectFederate, bus=self.bus)
+        self.controller = Controller(federate_factory=federate_factory)
+        self.thermal = Server_thermal_federate(federate_factory=federate_factory, output_dir=output_dir)
+        self.energyplus = energyplus_runner(output_dir, epw_path or definitions.EPW_PATH, idf_path or definitions.IDF_PATH,
+                                            federate_factory=functools.partial(DirectFederate, bus=self.bus,
+                                                                               on_time_granted=self.advance))
+
+    def advance(self, granted_time):
+        """Advance the controller and the thermal model to the time granted to EnergyPlus, when they step at it."""
+        if step_due(self.controller.federate, granted_time, definitions.TOTAL_SECONDS):
+            self.controller.advance()
+        if step_due(self.thermal.server_federate, granted_time, self.thermal.total_time):
+            self.thermal.advance()
+
+    def run(self):
+        self.thermal.open_recorders()
+        # The thermal model evaluates its inputs before its first time request
+        self.thermal.step()
+        try:
+            self.energyplus.run()
+        finally:
+            self.controller.finalize()
+            self.thermal.finalize()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    DirectCosimulation().run()
+    from mostcool.energy.energy import plot_results
+    plot_results()
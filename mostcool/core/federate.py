@@ -1,55 +1,205 @@
-from dataclasses import dataclass
+import json
+import numpy as np
 from mostcool.core import definitions
+from mostcool.core.timing import StepTimer
 import logging
 
 
-@dataclass
-class Pub:
-    name: str
-    id: int = None
-    value: float = None
-    unit: str = None
+class Signal:
+    """
+    A HELICS input or output. Once bound, its value lives in a slot of an array shared by all signals
+    of the federate, so reading or writing it is one array access.
+    """
+    __slots__ = ("name", "id", "unit", "index", "_store", "_value")
 
+    def __init__(self, name: str, id: int = None, value: float = None, unit: str = None):
+        self.name = name
+        self.id = id
+        self.unit = unit
+        self.index = None
+        self._store = None
+        self._value = value
 
-@dataclass
-class Sub:
-    name: str
-    id: int = None
-    value: float = None
-    unit: str = None
+    @property
+    def value(self):
+        return self._value if self._store is None else self._store[self.index]
+
+    @value.setter
+    def value(self, value):
+        if self._store is None:
+            self._value = value
+        else:
+            self._store[self.index] = value
+
+    def bind(self, store, index):
+        """Back the value by store[index], keeping the current value."""
+        store[index] = 0.0 if self._value is None else self._value
+        self._store = store
+        self.index = index
+
+    def __repr__(self):
+        return f"{type(self).__name__}(name={self.name!r}, id={self.id!r}, value={self.value!r}, unit={self.unit!r})"
+
+
+class Pub(Signal):
+    """Output of a federate. In event-driven mode it is only sent when it moved by more than tolerance."""
+    __slots__ = ("tolerance",)
+
+    def __init__(self, name: str, id: int = None, value: float = None, unit: str = None, tolerance: float = None):
+        super().__init__(name, id=id, value=value, unit=unit)
+        self.tolerance = tolerance
+
+
+class Sub(Signal):
+    __slots__ = ()
+
+
+def bind_signals(signals):
+    """
+    Back the values of the signals by one array.
+
+    Returns:
+    - values: Array with the value of signal i at index i.
+    - bindings: {name: signal}, to resolve the signals once instead of matching names every step.
+    """
+    signals = signals or []
+    values = np.zeros(len(signals))
+    for index, signal in enumerate(signals):
+        signal.bind(values, index)
+    return values, {signal.name: signal for signal in signals}
+
+
+def bundle_name(federate_name):
+    """Vector publication carrying all the outputs of a federate."""
+    return f"{federate_name}/bundle"
+
+
+def schema_name(federate_name):
+    """String publication with the JSON list of the output names of a federate's bundle, sent once."""
+    return f"{federate_name}/bundle_schema"
+
+
+class Bundle:
+    """
+    Subscription to the bundle of a source federate. Its schema maps the positions of the vector to the
+    subscriptions of this federate, outputs of the source that nobody here subscribes to are skipped.
+    """
+    __slots__ = ("source", "id", "schema_id", "positions", "indices")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.id = None
+        self.schema_id = None
+        self.positions = np.zeros(0, dtype=int)  # positions in the vector
+        self.indices = np.zeros(0, dtype=int)  # indices of the matching subscriptions
+
+    def map_schema(self, names, sub_bindings):
+        """Match the output names of the source with the subscriptions, return the names matched."""
+        matched = [(position, sub_bindings[name].index) for position, name in enumerate(names) if name in sub_bindings]
+        self.positions = np.array([position for position, _ in matched], dtype=int)
+        self.indices = np.array([index for _, index in matched], dtype=int)
+        return [names[position] for position in self.positions]
+
+
+def validate_periods(periods, timestep=definitions.TIMESTEP_PERIOD_SECONDS):
+    """
+    Check that the federate periods can be coupled.
+
+    Parameters:
+    - periods: {federate name: period in seconds}.
+    - timestep: EnergyPlus timestep in seconds (Timestep object of the IDF).
+
+    Raises:
+    - ValueError: If EnergyPlus does not step at its timestep, or a period is not a multiple of it or does not
+      divide a day (where checkpoints are taken and runs resume).
+    """
+    errors = []
+    if periods.get("EnergyPlus", timestep) != timestep:
+        errors.append(f"EnergyPlus steps at its timestep of {timestep} s, not {periods['EnergyPlus']} s")
+    for name, period in periods.items():
+        if period <= 0 or period % timestep:
+            errors.append(f"The period of {name} ({period} s) is not a multiple of the EnergyPlus timestep ({timestep} s)")
+        elif (24 * 3600) % period:
+            errors.append(f"The period of {name} ({period} s) does not divide a day")
+    if errors:
+        raise ValueError("Incompatible federate periods:\n" + "\n".join(f"- {error}" for error in errors))
 
 
 class mostcool_federate:
     def __init__(self, 
                  federate_name: str =None,
                  subscriptions: list =None,
-                 publications: list =None):
+                 publications: list =None,
+                 event_driven: bool =None,
+                 wait_for_updates: bool =False,
+                 bundled: bool =None,
+                 bundle_sources: list =None,
+                 period: int =None):
+        """
+        Parameters:
+        - federate_name: HELICS name of the federate.
+        - subscriptions: Subs to register.
+        - publications: Pubs to register.
+        - event_driven: Publish only values that changed by more than their tolerance and hold the last value
+          of inputs that were not updated, defaults to definitions.EVENT_DRIVEN.
+        - wait_for_updates: In event-driven mode, request_time waits for the next input update instead of
+          stepping every period, so an idle federate skips steps. Not for the federate driving time (EnergyPlus).
+        - bundled: Exchange one vector publication per federate instead of one publication per signal, so the
+          messages per step do not grow with the number of signals. Defaults to definitions.VECTOR_BUNDLES.
+        - bundle_sources: Names of the federates publishing the subscriptions, whose bundles are subscribed to
+          when bundled.
+        - period: Time step in seconds, defaults to the period of the federate in definitions.FEDERATE_PERIODS.
+        """
         import helics as h
 
-        self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.DEBUG)
-        self.subs = subscriptions
-        self.pubs = publications
-        self.granted_time = 0
-        self.federate = None
-        self.setup_helics_federate(federate_name)
+        self.init_signals(federate_name, subscriptions, publications, event_driven, wait_for_updates,
+                          bundled=definitions.VECTOR_BUNDLES if bundled is None else bundled)
+        self.bundles = [Bundle(source) for source in bundle_sources or []] if self.bundled else []
+        self.setup_helics_federate(federate_name, period or definitions.FEDERATE_PERIODS.get(federate_name, definitions.TIMESTEP_PERIOD_SECONDS))
         self.time_interval_seconds = int(
             h.helicsFederateGetTimeProperty(
                 self.federate, h.HELICS_PROPERTY_TIME_PERIOD
             )
         )
         self.logger.debug(f"Time interval is {self.time_interval_seconds} seconds")
-        
+
+    def init_signals(self, federate_name, subscriptions, publications, event_driven, wait_for_updates, bundled=False):
+        """Value stores, bindings and exchange state shared by every transport of the signals."""
+        self.federate_name = federate_name
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+        self.subs = subscriptions or []
+        self.pubs = publications or []
+        self.sub_values, self.sub_bindings = bind_signals(self.subs)
+        self.pub_values, self.pub_bindings = bind_signals(self.pubs)
+        self.event_driven = definitions.EVENT_DRIVEN if event_driven is None else event_driven
+        self.wait_for_updates = self.event_driven and wait_for_updates
+        # Publishers only send changes in event-driven mode, and nothing between their steps when they step slower
+        self.hold_inputs = self.event_driven or len(set(definitions.FEDERATE_PERIODS.values())) > 1
+        self.bundled = bundled
+        self.updated = np.zeros(len(self.subs), dtype=bool)  # inputs updated at the last read_all
+        self.pub_tolerances = np.array([definitions.PUBLICATION_CHANGE_TOLERANCE if pub.tolerance is None else pub.tolerance 
+                                        for pub in self.pubs])
+        self.published_values = np.full(len(self.pubs), np.nan)  # last values sent, nothing sent yet
+        # HELICS time starts at 0 in every run, a resumed run is shifted to the time it resumes from
+        self.time_offset = definitions.START_SECONDS
+        self.granted_time = self.time_offset
+        self.federate = None
+        self.timer = StepTimer(federate_name, enabled=definitions.TIMING_ENABLED)
+
     def create_value_federate(self, fedinitstring, name, period):
         """Create a value federate with the given name and time period."""
         import helics as h
         
         fedinfo = h.helicsCreateFederateInfo()
-        h.helicsFederateInfoSetCoreTypeFromString(fedinfo, "zmq")  # ZMQ is the default and works well for small co-simulations
+        h.helicsFederateInfoSetCoreTypeFromString(fedinfo, definitions.HELICS_CORE_TYPE)  # ZMQ is the default and works well for small co-simulations
         h.helicsFederateInfoSetCoreInitString(fedinfo, fedinitstring)  # Can be used to set number of federates, etc
-        h.helicsFederateInfoSetIntegerProperty(fedinfo, h.HELICS_PROPERTY_INT_LOG_LEVEL, definitions.LOG_LEVEL_MAP["helics_log_level_trace"])
+        if definitions.HELICS_BROKER_ADDRESS:
+            h.helicsFederateInfoSetBroker(fedinfo, definitions.HELICS_BROKER_ADDRESS)
+        h.helicsFederateInfoSetIntegerProperty(fedinfo, h.HELICS_PROPERTY_INT_LOG_LEVEL, definitions.LOG_LEVEL_MAP[definitions.HELICS_LOG_LEVEL])
         h.helicsFederateInfoSetTimeProperty(fedinfo, h.HELICS_PROPERTY_TIME_PERIOD, period)
-        h.helicsFederateInfoSetFlagOption(fedinfo, h.HELICS_FLAG_UNINTERRUPTIBLE, True)  # Forces the granted time to be the requested time (i.e., EnergyPlus timestep)
+        # Forces the granted time to be the requested time (i.e., EnergyPlus timestep), unless the federate waits for input updates
+        h.helicsFederateInfoSetFlagOption(fedinfo, h.HELICS_FLAG_UNINTERRUPTIBLE, not self.wait_for_updates)
         h.helicsFederateInfoSetFlagOption(fedinfo, h.HELICS_FLAG_TERMINATE_ON_ERROR, True)  # Stop the whole co-simulation if there is an error
         time_controller_federate = True if name == "EnergyPlus_federate" else False
         h.helicsFederateInfoSetFlagOption(
@@ -59,90 +209,186 @@ class mostcool_federate:
         return fed                                          
 
     # Function to create and configure HELICS federate
-    def setup_helics_federate(self, federate_name=None):
+    def setup_helics_federate(self, federate_name=None, period=definitions.TIMESTEP_PERIOD_SECONDS):
         import helics as h
-        self.federate = self.create_value_federate("", federate_name, definitions.TIMESTEP_PERIOD_SECONDS)
+        self.federate = self.create_value_federate("", federate_name, period)
         self.logger.info(f"HELICS federate for {federate_name} created.")
-        self.register_pubs()
-        self.register_subs()
+        if self.bundled:
+            self.register_bundles()
+            h.helicsFederateEnterInitializingMode(self.federate)
+            # The schema is sent once, the subscribers have it before the first bundle
+            h.helicsPublicationPublishString(self.schema_id, json.dumps([pub.name for pub in self.pubs]))
+        else:
+            self.register_pubs()
+            self.register_subs()
         h.helicsFederateEnterExecutingMode(self.federate)
         self.logger.info("Entered HELICS execution mode")
 
+    def subscription(self, name):
+        """Sub registered under name, to be resolved once and read through .value every step."""
+        return self.sub_bindings[name]
+
+    def publication(self, name):
+        """Pub registered under name, to be resolved once and written through .value every step."""
+        return self.pub_bindings[name]
+
     def register_pubs(self):  # Sensors
         import helics as h
 
-        if self.pubs is not None:
-            for pub in self.pubs:
-                self.logger.info(
-                    f'Registering publication: {pub.name}'
-                )
-                pub.id = h.helicsFederateRegisterGlobalTypePublication(
-                    self.federate,
-                    f"{pub.name}",
-                    "double",
-                    f"{pub.unit}",
-                )
-                pub_name = h.helicsPublicationGetName(pub.id)
-                if pub.name != pub_name:
-                    raise Exception(f"Name mismatch: {pub.name} != {pub_name}")
-                # if pub_name not in self.pubs:
-                #     self.pubs.append(Pub(name=pub_name, id=pubid))
-                self.logger.debug(f"\tRegistered publication---> {pub.id} as {pub_name}")
+        for pub in self.pubs:
+            self.logger.info(
+                f'Registering publication: {pub.name}'
+            )
+            pub.id = h.helicsFederateRegisterGlobalTypePublication(
+                self.federate,
+                f"{pub.name}",
+                "double",
+                f"{pub.unit}",
+            )
+            pub_name = h.helicsPublicationGetName(pub.id)
+            if pub.name != pub_name:
+                raise Exception(f"Name mismatch: {pub.name} != {pub_name}")
+            self.logger.debug(f"\tRegistered publication---> {pub.id} as {pub_name}")
 
     def register_subs(self):  # Actuators
         import helics as h
 
-        if self.subs is not None:
-            for sub in self.subs:
-                self.logger.info(
-                    f'Registering subscription: {sub.name}'
-                )
-                sub.id = h.helicsFederateRegisterSubscription(
-                    self.federate,
-                    f'{sub.name}',
-                    sub.unit,
-                )
-                sub_name = h.helicsInputGetTarget(sub.id)
-                if sub.name != sub_name:
-                    raise Exception(f"Name mismatch: {sub.name} != {sub_name}")
-                self.logger.debug(f"\tRegistered subscription---> {sub.id} as {sub_name}")
+        for sub in self.subs:
+            self.logger.info(
+                f'Registering subscription: {sub.name}'
+            )
+            sub.id = h.helicsFederateRegisterSubscription(
+                self.federate,
+                f'{sub.name}',
+                sub.unit,
+            )
+            sub_name = h.helicsInputGetTarget(sub.id)
+            if sub.name != sub_name:
+                raise Exception(f"Name mismatch: {sub.name} != {sub_name}")
+            self.logger.debug(f"\tRegistered subscription---> {sub.id} as {sub_name}")
+
+    def register_bundles(self):
+        """Register the bundle and schema publications of this federate and subscribe to those of bundle_sources."""
+        import helics as h
+
+        self.bundle_id = h.helicsFederateRegisterGlobalTypePublication(self.federate, bundle_name(self.federate_name), "vector", "")
+        self.schema_id = h.helicsFederateRegisterGlobalTypePublication(self.federate, schema_name(self.federate_name), "string", "")
+        self.logger.info(f"Registered the bundle of {len(self.pubs)} publications of {self.federate_name}")
+        for bundle in self.bundles:
+            bundle.id = h.helicsFederateRegisterSubscription(self.federate, bundle_name(bundle.source), "")
+            bundle.schema_id = h.helicsFederateRegisterSubscription(self.federate, schema_name(bundle.source), "")
+            self.logger.info(f"Subscribed to the bundle of {bundle.source}")
 
     def request_time(self):
         import helics as h
 
-        requested_time_seconds = self.granted_time + self.time_interval_seconds
-        self.granted_time = h.helicsFederateRequestTime(
-            self.federate, requested_time_seconds
-        )
+        if self.wait_for_updates:
+            # Granted at the next time (on the period grid) one of the inputs is updated
+            requested_time_seconds = h.HELICS_TIME_MAXTIME
+        else:
+            requested_time_seconds = self.granted_time - self.time_offset + self.time_interval_seconds
+        with self.timer.section("request_time", self.granted_time):
+            self.granted_time = h.helicsFederateRequestTime(
+                self.federate, requested_time_seconds
+            ) + self.time_offset
         self.logger.debug(
             f"Requested time {requested_time_seconds}, granted time {self.granted_time}"
         )
         return self.granted_time
 
-    def update_subs(self):
-        import helics as h
+    def read_all(self):
+        """
+        Read every subscription into sub_values and return it. Inputs that were not updated are set to zero,
+        or keep their last value in event-driven mode (publishers only send changes) and when the federates
+        step at different periods (a slower publisher's value holds until its next step). Which inputs were
+        updated is kept in self.updated.
+        """
+        start = self.timer.now()
+        self.receive_inputs()
+        stale = []
+        if not self.hold_inputs:
+            self.sub_values[~self.updated] = 0
+            stale = [sub.name for sub, updated in zip(self.subs, self.updated) if not updated]
+        if stale:
+            self.logger.warning(f"{len(stale)} of {len(self.subs)} inputs were not updated at {self.granted_time}, set to zero.")
+            self.logger.debug(f"Inputs not updated at {self.granted_time}: {stale}")
+        self.timer.add("read_inputs", start, sim_time=self.granted_time)
+        return self.sub_values
 
-        for sub in self.subs:
-            if h.helicsInputIsUpdated(sub.id):
-                sub.value = h.helicsInputGetDouble(sub.id)
-            else:
-                sub.value = 0
-                self.logger.warning(f"{sub} was not updated at {self.granted_time}, set to zero.")
+    def publish_all(self, values=None):
+        """
+        Publish pub_values, after copying values into it if given (in the order of the publications).
+        In event-driven mode only the values that moved by more than their tolerance since they were last sent
+        are published.
+        """
+        start = self.timer.now()
+        if values is not None:
+            self.pub_values[:] = values
+        if self.event_driven:
+            changed = np.flatnonzero(~(np.abs(self.pub_values - self.published_values) <= self.pub_tolerances))
+        else:
+            changed = range(len(self.pubs))
+        if self.bundled and len(changed):
+            changed = range(len(self.pubs))  # the whole vector is sent
+        self.send_outputs(changed)
+        self.published_values[changed] = self.pub_values[changed]
+        self.timer.add("publish_outputs", start, sim_time=self.granted_time)
 
-        return self.subs
+    def receive_inputs(self):
+        """Store the inputs updated since the last read in sub_values and flag them in self.updated."""
+        import helics as h
 
-    def update_pubs(self):
+        if self.bundled:
+            self.receive_bundles()
+            return
+        for index, sub in enumerate(self.subs):
+            self.updated[index] = h.helicsInputIsUpdated(sub.id)
+            if self.updated[index]:
+                self.sub_values[index] = h.helicsInputGetDouble(sub.id)
+
+    def send_outputs(self, indices):
+        """Send the pub_values at the given indices."""
         import helics as h
-        
-        for pub in self.pubs:
+
+        if self.bundled:
+            if len(indices):
+                h.helicsPublicationPublishVector(self.bundle_id, self.pub_values.tolist())
+            return
+        for index in indices:
             h.helicsPublicationPublishDouble(
-                pub.id, pub.value
+                self.pubs[index].id, float(self.pub_values[index])
             )
 
+    def receive_bundles(self):
+        """Unpack the updated bundles into sub_values, mapping them by name once their schema arrived."""
+        import helics as h
+
+        self.updated[:] = False
+        for bundle in self.bundles:
+            if h.helicsInputIsUpdated(bundle.schema_id):
+                names = json.loads(h.helicsInputGetString(bundle.schema_id))
+                matched = bundle.map_schema(names, self.sub_bindings)
+                self.logger.info(f"Bundle of {bundle.source}: {len(matched)} of its {len(names)} outputs subscribed to")
+            if h.helicsInputIsUpdated(bundle.id):
+                values = np.asarray(h.helicsInputGetVector(bundle.id))
+                self.sub_values[bundle.indices] = values[bundle.positions]
+                self.updated[bundle.indices] = True
+
+    def update_subs(self):
+        self.read_all()
+        return self.subs
+
+    def update_pubs(self):
+        self.publish_all()
+
     # Function to clean up HELICS federate
     def destroy_federate(self):
         import helics as h
 
+        timing_path = self.timer.write()
+        if timing_path is not None:
+            self.logger.info(f"Step timings written to {timing_path}")
         h.helicsFederateDisconnect(self.federate)
         h.helicsFederateFree(self.federate)
-        h.helicsCloseLibrary()
+        if definitions.HELICS_CORE_TYPE != "inproc":  # inproc federates share the library with the others of their process
+            h.helicsCloseLibrary()
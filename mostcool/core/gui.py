@@ -10,7 +10,7 @@ from subprocess import Popen
 import sys
 from threading import Thread
 from time import sleep
-from tkinter import BOTH, HORIZONTAL, LEFT, TOP, VERTICAL, W, X, Button, Canvas, Frame, Label, LabelFrame, Menu, OptionMenu, PhotoImage, Scrollbar, StringVar, Tk, filedialog, messagebox, ttk, font
+from tkinter import BOTH, HORIZONTAL, LEFT, TOP, VERTICAL, W, X, BooleanVar, Button, Canvas, Checkbutton, Frame, Label, LabelFrame, Menu, OptionMenu, PhotoImage, Scrollbar, StringVar, Tk, filedialog, messagebox, ttk, font
 import webbrowser
 from matplotlib import pyplot as plt
 from matplotlib.figure import Figure
@@ -19,12 +19,31 @@ from pubsub import pub
 from typing import Union
 import mostcool.core.definitions as definitions
 import mostcool.core.simulator as simulator
+from mostcool.energy.idf_tools import output_variable_spec
 import mostcool.thermal.paraview as paraview
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from PIL import ImageTk, Image
 
 plt.rcParams.update({'font.size': 16})  # Adjust font size as needed
 
+# Shown in the plot menu until a run has produced results
+PLOT_PLACEHOLDER = "Select variable"
+
+
+def plotted_output_variables(only_plotted: bool, plotted_column: str):
+    """Output variables a run asks EnergyPlus to report, see simulator.Simulator.
+
+    Parameters:
+    - only_plotted: Whether to report only the plotted building energy output.
+    - plotted_column: The column selected in the plot menu.
+
+    Returns None (all outputs) while nothing is plotted yet, so a first run is not pruned to the sensors.
+    """
+    if not only_plotted or plotted_column == PLOT_PLACEHOLDER:
+        return None
+    plotted = output_variable_spec(plotted_column)
+    return [plotted] if plotted else []
+
 
 class PubSubMessageTypes:
     PRINT = '10'
@@ -161,6 +180,7 @@ class MyApp(Frame):
         self.paraview_CPU_load_fraction = StringVar()
         self.control_option = StringVar()
         self.datacenter_location = StringVar()
+        self.only_plotted_outputs = BooleanVar()
         self.label_status = StringVar()
         
         
@@ -263,6 +283,12 @@ class MyApp(Frame):
         self.datacenter_location_menu = OptionMenu(group_run_options, self.datacenter_location,
                                                 *list(definitions.LOCATION_MAP.keys()))
         self.datacenter_location_menu.grid(row=1, column=2, sticky=W)
+
+        # EnergyPlus then only reports the sensors and the plotted variable, which speeds up long runs.
+        # Disabled until a first run has filled the plot menu, there is no plotted variable before that
+        self.only_plotted_outputs_button = Checkbutton(group_run_options, text="Only report the plotted building energy outputs",
+                                                       variable=self.only_plotted_outputs, state='disabled')
+        self.only_plotted_outputs_button.grid(row=2, column=1, columnspan=2, sticky=W)
         
         
         # Label(group_run_options, text="[Placeholder] Datacenter floor area [m2]: ").grid(row=2, column=1, sticky=W)
@@ -293,9 +319,9 @@ class MyApp(Frame):
         Label(row_frame, text="Building energy output to display: ").pack(side='left')
         # Dropdown menu for selecting the y-axis variable
         self.y_axis_variable = StringVar()
-        self.y_axis_variable.set("Select variable")  # default value
+        self.y_axis_variable.set(PLOT_PLACEHOLDER)  # default value
         self.y_axis_variable.trace_add("write", lambda name, index, mode: self.update_plot())
-        self.y_axis_drop_down_menu = OptionMenu(row_frame, self.y_axis_variable, "Select variable") #, command=self.update_plot)
+        self.y_axis_drop_down_menu = OptionMenu(row_frame, self.y_axis_variable, PLOT_PLACEHOLDER) #, command=self.update_plot)
         self.y_axis_drop_down_menu.pack()
         
         # Placeholder for the Matplotlib figure
@@ -457,6 +483,7 @@ class MyApp(Frame):
         for option in new_options:
             menu['menu'].add_command(label=option, command=lambda value=option: self.y_axis_variable.set(value))
         self.y_axis_variable.set(new_options[0])
+        self.only_plotted_outputs_button.configure(state='normal')
 
     def update_plot(self):
         """Update the plot with the selected y-axis variable."""
@@ -541,8 +568,9 @@ class MyApp(Frame):
             messagebox.showerror("Cannot run another thread, wait for the current to finish -- how'd you get here?!?")
             return
         # TODO: Gather data in preparation to start main run
+        output_variables = plotted_output_variables(self.only_plotted_outputs.get(), self.y_axis_variable.get())
         self.background_operator = simulator.Simulator(idf_path=self.idf_path.get(), epw_path=self.epw_path.get(), control_option=self.control_option.get(),
-                                             datacenter_location=self.datacenter_location.get())
+                                             datacenter_location=self.datacenter_location.get(), output_variables=output_variables)
         self.background_operator.add_callbacks(print_callback=MyApp.print_listener,
                                                sim_starting_callback=MyApp.starting_listener,
                                                increment_callback=MyApp.increment_listener,
@@ -0,0 +1,140 @@
+"""Preallocated, chunk-flushed time-series recorders for federate outputs, to CSV or HDF5"""
+
+import os
+import numpy as np
+import pandas as pd
+
+
+class TimeSeriesRecorder:
+    """
+    Record several channels per timestep into a preallocated numpy buffer.
+
+    The buffer holds at most chunk_size rows; when it is full the rows are appended to a CSV file and the
+    buffer is reused, so memory stays bounded for any run length and a crash only loses the current chunk.
+    """
+
+    def __init__(self, path, channels, n_steps, chunk_size=1024, index_name="Time", resume_rows=None):
+        """
+        Parameters:
+        - path: File the series are written to (truncated on creation).
+        - channels: Names of the recorded channels, in the order values are passed to record.
+        - n_steps: Expected number of recorded steps, used to size the buffer for short runs.
+        - chunk_size: Maximum number of rows held in memory between flushes.
+        - index_name: Column name of the time index.
+        - resume_rows: Keep this many rows of an existing file (rows_written of a checkpoint) and append
+          after them, instead of truncating it.
+        """
+        self.path = path
+        self.channels = list(channels)
+        self.index_name = index_name
+        self.buffer = np.full((max(1, min(n_steps, chunk_size)), len(self.channels) + 1), np.nan)
+        self.buffered_rows = 0
+        self.rows_written = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if resume_rows is not None:
+            self.truncate(resume_rows)
+        else:
+            self.create()
+
+    def create(self):
+        """Create the file with no rows."""
+        with open(self.path, "w") as f:
+            f.write(",".join([self.index_name] + self.channels) + "\n")
+
+    def truncate(self, rows):
+        """Drop the rows of the file after the first rows ones, written after the checkpoint resumed from."""
+        with open(self.path, "r+") as f:
+            for _ in range(rows + 1):  # header and kept rows
+                if not f.readline():
+                    raise ValueError(f"{self.path} has fewer than the {rows} rows to resume from")
+            f.truncate(f.tell())
+        self.rows_written = rows
+
+    def append(self, rows):
+        """Append rows (time and channel columns) to the file."""
+        with open(self.path, "a") as f:
+            np.savetxt(f, rows, delimiter=",", fmt="%.10g")
+
+    def record(self, time, *values):
+        """Record the channel values (in the order of channels) at the given time."""
+        row = self.buffer[self.buffered_rows]
+        row[0] = time
+        row[1:] = values
+        self.buffered_rows += 1
+        if self.buffered_rows == self.buffer.shape[0]:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered rows to the file."""
+        if self.buffered_rows == 0:
+            return
+        self.append(self.buffer[:self.buffered_rows])
+        self.rows_written += self.buffered_rows
+        self.buffered_rows = 0
+
+    def checkpoint(self):
+        """Flush and return the number of rows written, to resume from with resume_rows."""
+        self.flush()
+        return self.rows_written
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class HDF5Recorder(TimeSeriesRecorder):
+    """
+    TimeSeriesRecorder writing one resizable, chunked HDF5 dataset per channel (and one for the time index),
+    so a channel is read without parsing the others. The file is only open while a chunk is appended, the
+    rows flushed so far stay readable if the run dies.
+    """
+
+    def create(self):
+        import h5py
+
+        with h5py.File(self.path, "w") as f:
+            f.attrs["channels"] = self.channels
+            f.attrs["index_name"] = self.index_name
+            for name in [self.index_name] + self.channels:
+                f.create_dataset(name, shape=(0,), maxshape=(None,), chunks=(self.buffer.shape[0],), dtype="f8")
+
+    def truncate(self, rows):
+        import h5py
+
+        with h5py.File(self.path, "a") as f:
+            if f[self.index_name].shape[0] < rows:
+                raise ValueError(f"{self.path} has fewer than the {rows} rows to resume from")
+            for name in [self.index_name] + self.channels:
+                f[name].resize((rows,))
+        self.rows_written = rows
+
+    def append(self, rows):
+        import h5py
+
+        with h5py.File(self.path, "a") as f:
+            for column, name in enumerate([self.index_name] + self.channels):
+                dataset = f[name]
+                dataset.resize((self.rows_written + len(rows),))
+                dataset[self.rows_written:] = rows[:, column]
+
+    @staticmethod
+    def read(path, channels=None):
+        """
+        Series of an HDF5 recording as a DataFrame indexed by time.
+
+        Parameters:
+        - path: File written by an HDF5Recorder.
+        - channels: Channels to read, defaults to all of them.
+        """
+        import h5py
+
+        with h5py.File(path, "r") as f:
+            index_name = f.attrs["index_name"]
+            channels = list(f.attrs["channels"]) if channels is None else channels
+            return pd.DataFrame({name: f[name][:] for name in channels},
+                                index=pd.Index(f[index_name][:], name=index_name))
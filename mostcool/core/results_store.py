@@ -0,0 +1,169 @@
+"""Columnar store of the results of a run, loaded column by column
+
+After a run, write_results_store converts eplusout.csv and the thermal time series into one compressed HDF5
+file: a time index, one chunked dataset per column and a JSON schema (column names, units, datasets) in the
+file attributes. The CSV is parsed once, chunk by chunk, instead of every time the results are opened.
+ResultStore then reads the schema only, and each column the first time it is used, e.g. when it is plotted.
+"""
+
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+import mostcool.core.definitions as definitions
+
+
+RESULTS_STORE_NAME = "results.h5"
+CHUNK_ROWS = 4096
+INDEX_NAME = "Date/Time"
+# Thermal federate channels (see server_federate.RECORDED_CHANNELS) and their result columns
+THERMAL_COLUMNS = {
+    "CPU_temp_max": "Maximum CPU Temperature [C]",
+    "T_out_server": "Server Outlet Temperature [C]",
+    "inlet_server_temperature": "Server Inlet Temperature [C]",
+    "supply_approach_temperature": "Server Supply Approach Temperature [C]",
+    "return_approach_temperature": "Server Return Approach Temperature [C]",
+}
+UNIT_PATTERN = re.compile(r"\[([^\]]*)\]")
+
+
+def parse_energyplus_times(values):
+    """Times of the EnergyPlus Date/Time strings (e.g. " 07/01  24:00:00"), the end of a day being midnight of the next one."""
+    values = pd.Series(values).str.strip()
+    midnight = values.str.endswith("24:00:00")
+    times = pd.to_datetime(values.str.replace("24:00:00", "00:00:00", regex=False), format="%m/%d  %H:%M:%S")
+    return pd.DatetimeIndex(times + pd.to_timedelta(midnight.astype(int), unit="D"), name=INDEX_NAME)
+
+
+def column_unit(column):
+    match = UNIT_PATTERN.search(column)
+    return match.group(1) if match else None
+
+
+def write_results_store(csv_path=None, store_path=None, time_series_path=None, chunk_rows=CHUNK_ROWS,
+                        timestep_seconds=definitions.TIMESTEP_PERIOD_SECONDS, skip_rows=1):
+    """
+    Convert the EnergyPlus output of a run, with the thermal time series, into a results store.
+
+    Parameters:
+    - csv_path: EnergyPlus output, defaults to OUTPUT_DIR/eplusout.csv.
+    - store_path: Store to write, defaults to OUTPUT_DIR/results.h5.
+    - time_series_path: Thermal federate output, defaults to OUTPUT_DIR/time_series_data.csv. Row i of the results
+      takes the thermal values of the last thermal step up to the EnergyPlus timestep after thermal row 0 plus
+      i timesteps. It is skipped if the file does not exist.
+    - chunk_rows: Rows parsed and written at a time.
+    - timestep_seconds: EnergyPlus timestep.
+    - skip_rows: First EnergyPlus rows left out (their initial values look strange).
+
+    Returns:
+    - store_path.
+    """
+    import h5py
+
+    csv_path = csv_path or os.path.join(definitions.OUTPUT_DIR, "eplusout.csv")
+    store_path = store_path or os.path.join(definitions.OUTPUT_DIR, RESULTS_STORE_NAME)
+    time_series_path = time_series_path or os.path.join(definitions.OUTPUT_DIR, "time_series_data.csv")
+    time_series = pd.read_csv(time_series_path, index_col="Time") if os.path.exists(time_series_path) else None
+    if time_series is None:
+        print(f"Thermal model CSV output not found at {time_series_path}")
+    thermal_columns = {} if time_series is None else {channel: column for channel, column in THERMAL_COLUMNS.items()
+                                                      if channel in time_series.columns}
+
+    with h5py.File(store_path, "w") as f:
+        datasets = {}
+        rows = 0
+
+        def append(name, values, dtype="f8"):
+            if name not in datasets:
+                datasets[name] = f.create_dataset(name, shape=(0,), maxshape=(None,), chunks=(chunk_rows,), dtype=dtype,
+                                                  compression="gzip", compression_opts=4, shuffle=True)
+            dataset = datasets[name]
+            dataset.resize((rows + len(values),))
+            dataset[rows:] = values
+
+        columns = None
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, skiprows=range(1, skip_rows + 1)):
+            if columns is None:
+                # Replace '(TimeStep)' with an empty string in each column name
+                columns = [re.sub(r"\(TimeStep\)", "", column) for column in chunk.columns[1:]] + list(thermal_columns.values())
+            times = parse_energyplus_times(chunk.iloc[:, 0])
+            append("index", times.to_numpy().astype("datetime64[ns]").astype("i8"), dtype="i8")
+            for position, column in enumerate(chunk.columns[1:]):
+                append(f"columns/c{position:04d}", pd.to_numeric(chunk[column], errors="coerce").to_numpy(dtype="f8"))
+            if thermal_columns:
+                # Row i of the results is the EnergyPlus timestep after thermal row i, the thermal value holds until its next step
+                step_times = time_series.index[0] + timestep_seconds * np.arange(rows + 1, rows + len(chunk) + 1)
+                aligned = time_series.reindex(step_times, method="ffill")
+                for position, channel in enumerate(thermal_columns, start=len(chunk.columns) - 1):
+                    append(f"columns/c{position:04d}", aligned[channel].to_numpy(dtype="f8"))
+            rows += len(chunk)
+
+        schema = {
+            "index": INDEX_NAME,
+            "rows": rows,
+            "columns": [{"name": column, "unit": column_unit(column), "dataset": f"columns/c{position:04d}"}
+                        for position, column in enumerate(columns or [])],
+        }
+        f.attrs["schema"] = json.dumps(schema)
+    return store_path
+
+
+class ResultStore:
+    """
+    Results of a run in a results store, with the interface of the results DataFrame the GUI plots (columns,
+    index and results[column]). Columns are read the first time they are used and kept afterwards.
+    """
+
+    def __init__(self, path):
+        import h5py
+
+        self.path = path
+        with h5py.File(path, "r") as f:
+            self.schema = json.loads(f.attrs["schema"])
+        self.columns = pd.Index([column["name"] for column in self.schema["columns"]])
+        self.units = {column["name"]: column["unit"] for column in self.schema["columns"]}
+        self._datasets = {column["name"]: column["dataset"] for column in self.schema["columns"]}
+        self._index = None
+        self._loaded = {}
+
+    def __len__(self):
+        return self.schema["rows"]
+
+    def __contains__(self, column):
+        return column in self._datasets
+
+    @property
+    def index(self):
+        if self._index is None:
+            import h5py
+
+            with h5py.File(self.path, "r") as f:
+                self._index = pd.DatetimeIndex(f["index"][:].astype("datetime64[ns]"), name=self.schema["index"])
+        return self._index
+
+    def __getitem__(self, columns):
+        """A column as a Series, or a list of columns as a DataFrame, indexed by time."""
+        if isinstance(columns, str):
+            return self.load([columns])[columns]
+        return self.load(columns)
+
+    def load(self, columns=None):
+        """
+        Columns of the store as a DataFrame indexed by time.
+
+        Parameters:
+        - columns: Columns to load, defaults to all of them.
+        """
+        import h5py
+
+        columns = list(self.columns) if columns is None else list(columns)
+        missing = [column for column in columns if column not in self._loaded]
+        if missing:
+            unknown = [column for column in missing if column not in self._datasets]
+            if unknown:
+                raise KeyError(f"Columns {unknown} are not in {self.path}")
+            with h5py.File(self.path, "r") as f:
+                for column in missing:
+                    self._loaded[column] = f[self._datasets[column]][:]
+        return pd.DataFrame({column: self._loaded[column] for column in columns}, index=self.index)
@@ -0,0 +1,96 @@
+"""Generate the `helics run` runner file for the HELICS options of a run"""
+
+import argparse
+import json
+import os
+import mostcool.core.definitions as definitions
+from mostcool.core.config import RUN_CONFIG_ENV
+from mostcool.core.federate import validate_periods
+
+
+RUNNER_TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "runner.json")
+NETWORK_CORE_TYPES = ["zmq", "zmq_ss", "tcp", "tcp_ss"]  # listen on a broker port
+
+
+def runner_path(output_dir=None):
+    """Runner file of the run writing to output_dir, defaults to definitions.OUTPUT_DIR."""
+    return os.path.join(output_dir or definitions.OUTPUT_DIR, "run_config", "runner.json")
+
+
+def broker_command(core_type, log_level, broker_address, num_federates):
+    """helics_broker command line for the given options."""
+    command = f"helics_broker -f {num_federates} --coretype={core_type} --loglevel={log_level.replace('helics_log_level_', '')}"
+    if broker_address:
+        host, _, port = broker_address.rpartition(":")
+        command += f" --local_interface={host} --port={port}" if host else f" --local_interface={port}"
+    return command
+
+
+def build_runner_config(run_config=None, template_path=RUNNER_TEMPLATE_PATH, config_path=None):
+    """
+    Runner configuration with an explicit broker for the HELICS options of a run configuration.
+
+    Parameters:
+    - run_config: Run configuration dict (helics_core_type, helics_log_level, helics_broker_address), missing
+      options take the values of definitions.HELICS_DEFAULTS. Its federate_periods are validated too.
+    - template_path: Runner file listing the federates.
+    - config_path: Run configuration file of the federates, passed to them in MOSTCOOL_RUN_CONFIG. If None,
+      they read the default one.
+
+    Returns:
+    - The runner configuration as a dict.
+    """
+    options = {**definitions.HELICS_DEFAULTS, **{key: value for key, value in (run_config or {}).items()
+                                                 if key in definitions.HELICS_DEFAULTS}}
+    core_type = options["helics_core_type"]
+    if core_type not in definitions.HELICS_CORE_TYPES:
+        raise ValueError(f"Unknown HELICS core type {core_type}, expected one of {definitions.HELICS_CORE_TYPES}")
+    if core_type == "inproc":
+        raise ValueError("The inproc core only works with all federates in one process, `helics run` starts one "
+                         "process per federate. Use the direct coupling engine (mostcool.core.direct) instead.")
+    if options["helics_log_level"] not in definitions.LOG_LEVEL_MAP:
+        raise ValueError(f"Unknown HELICS log level {options['helics_log_level']}, "
+                         f"expected one of {list(definitions.LOG_LEVEL_MAP)}")
+
+    validate_periods({**definitions.DEFAULT_FEDERATE_PERIODS, **(run_config or {}).get("federate_periods", {})})
+
+    with open(template_path) as f:
+        runner = json.load(f)
+    # helics run resolves directories relative to the runner file, which is written elsewhere
+    template_dir = os.path.dirname(os.path.abspath(template_path))
+    federates = [{**federate, "directory": os.path.normpath(os.path.join(template_dir, federate["directory"]))}
+                 for federate in runner["federates"] if federate["name"] != "broker"]
+    if config_path:
+        for federate in federates:
+            federate["env"] = {**federate.get("env", {}), RUN_CONFIG_ENV: os.path.abspath(config_path)}
+    runner["broker"] = False
+    runner["federates"] = [{
+        "directory": template_dir,
+        "exec": broker_command(core_type, options["helics_log_level"], options["helics_broker_address"], len(federates)),
+        "host": "localhost",
+        "name": "broker",
+    }] + federates
+    return runner
+
+
+def write_runner_config(path=None, run_config=None, config_path=None):
+    """
+    Write the runner configuration of build_runner_config to path (defaults to OUTPUT_DIR/run_config/runner.json)
+    and return path. Without run_config, the one of this process is used and config_path defaults to its file.
+    """
+    if run_config is None:
+        run_config, config_path = definitions.RUN_CONFIG, config_path or definitions.RUN_CONFIG_PATH
+    path = path or runner_path(run_config.get("output_dir"))
+    runner = build_runner_config(run_config, config_path=config_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(runner, f, indent=4)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write the helics runner file for the run configuration")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Runner file to write, defaults to the one of the run configuration")
+    args = parser.parse_args()
+    print(write_runner_config(args.output))
@@ -3,15 +3,25 @@ from time import sleep
 from typing import Optional, Callable
 import subprocess
 from pathlib import Path
-import pandas as pd
+import mostcool.core.checkpoint as checkpoint
+import mostcool.core.definitions as definitions
+from mostcool.core.config import DEFAULT_RUN_CONFIG_PATH, RunConfig
+from mostcool.core.federate import validate_periods
+from mostcool.core.results_store import ResultStore, write_results_store
+from mostcool.core.runner_config import runner_path, write_runner_config
 
 
-# Add commands that should be run to this list
+# Add commands that should be run to this list, {runner_path} is the runner file of the run
 commands = [
-    ["helics", "run", "--path=/app/mostcool/core/runner.json"],
+    ["helics", "run", "--path={runner_path}"],  # generated for the HELICS options of the run
     # ["python", "cost_model.py"], # Future work: The postprocessing stuff can be here
     # Add more as needed
 ]
+# Runs the same federates in one process, without a HELICS broker (see mostcool.core.direct)
+direct_commands = [
+    ["python", "-u", "-m", "mostcool.core.direct"],
+]
+ENGINE_COMMANDS = {"helics": commands, "direct": direct_commands}
 
 def run_command(command):
     process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
@@ -25,46 +35,21 @@ def run_command(command):
     if process.returncode != 0:
         raise Exception(f"Error code: {process.returncode}\nError:{last_line}")
 
-# Function to fix the datetime string and convert it to the correct format
-def fix_datetime(dt_str):
-    date_part, time_part = dt_str.split()
-    # Split the date and time
-    # Only adjust if time is '24:00:00', else return the original datetime string
-    if time_part == '24:00:00':
-        # Convert to datetime object to easily add a day
-        dt = pd.to_datetime(date_part, format='%m/%d') + pd.Timedelta(days=1)
-        
-        # Replace '24:00:00' with '00:00:00' and format the datetime back to string
-        # Adjust the format if your date includes the year or other components
-        return dt.strftime(' %m/%d') + '  00:00:00'
-    else:
-        return dt_str
-
-# Prep data: 
-# Get X-axis to date time and set it as index
-# results = self.results.copy()
-def fix_results(results):
-    results['Date/Time']= results['Date/Time'].apply(fix_datetime)
-    results['Date/Time'] = pd.to_datetime(results['Date/Time'], format='  %m/%d  %H:%M:%S')
-    results.set_index('Date/Time', inplace=True)
-    # Replace '(TimeStep)' with an empty string in each column name
-    results.columns = results.columns.str.replace(r'\(TimeStep\)', '', regex=True)
-    if Path("/app/Output/time_series_data.csv").exists():
-        time_series = pd.read_csv("/app/Output/time_series_data.csv")#.drop(index=0)
-        time_series = time_series.drop(time_series.index[:1])
-
-        results["Maximum CPU Temperature [C]"] = time_series["Value"].values #(.values) to ignore index
-    else:
-        print(f"Thermal model CSV output not found at /Output/time_series_data.csv")
-    return results
-
 
 class Simulator:
-    def __init__(self, idf_path, epw_path, control_option, datacenter_location):
+    def __init__(self, idf_path, epw_path, control_option, datacenter_location, engine="helics", helics_options=None,
+                 resume=False, federate_periods=None, output_variables=None, checkpoint_interval_days=1):
         self.idf = idf_path
         self.epw = epw_path
         self.control_option = control_option
         self.datacenter_location = datacenter_location
+        self.engine = engine  # "helics" or "direct"
+        self.helics_options = helics_options or {}  # helics_core_type, helics_log_level, helics_broker_address, vector_bundles
+        self.resume = resume  # restart from the last complete checkpoint of the previous run
+        self.checkpoint_interval_days = checkpoint_interval_days  # days between checkpoints, 0 makes the run not resumable
+        self.federate_periods = federate_periods or {}  # {federate name: period in seconds}, EnergyPlus timestep by default
+        self.output_variables = output_variables  # EnergyPlus outputs reported on top of the sensors, None for all (see idf_tools)
+        self.start_seconds = 0
         self.print_callback: Optional[Callable] = None
         self.sim_starting_callback: Optional[Callable] = None
         self.increment_callback: Optional[Callable] = None
@@ -86,24 +71,55 @@ class Simulator:
         self.error_callback = error_callback
         
     def write_options_to_file(self):
-        config_dir = "Output/run_config/"
-        Path(config_dir).mkdir(parents=True, exist_ok=True)
-        with open(f"{config_dir}/config.json", "w") as f:
-            f.write(f'{{"idf_path": "{self.idf}", "epw_path": "{self.epw}", "control_option": "{self.control_option}", "datacenter_location": "{self.datacenter_location}"}}')
+        """
+        Make the RunConfig of this run the one of this process, set its start time from the checkpoints in its
+        output directory (see resume_time) and save it to the run configuration file.
+        """
+        run_config = RunConfig.from_dict({"idf_path": self.idf, "epw_path": self.epw, "control_option": self.control_option,
+                                          "datacenter_location": self.datacenter_location, **self.helics_options,
+                                          "federate_periods": self.federate_periods,
+                                          "output_variables": self.output_variables,
+                                          "checkpoint_interval_days": self.checkpoint_interval_days})
+        definitions.use_run_config(run_config)
+        self.start_seconds = run_config.start_seconds = self.resume_time(run_config.output_dir)
+        run_config.save(DEFAULT_RUN_CONFIG_PATH)
+        return run_config
+
+    def resume_time(self, output_dir):
+        """Time of the last complete checkpoint in output_dir to resume from, 0 (and the previous checkpoints cleared) otherwise."""
+        checkpoint_dir, segments_dir = checkpoint.run_checkpoint_dir(output_dir), checkpoint.run_segments_dir(output_dir)
+        if self.resume:
+            start_seconds = checkpoint.latest_checkpoint(checkpoint_dir=checkpoint_dir)
+            if start_seconds is not None:
+                self.print_callback(f"Resuming from the checkpoint at day {start_seconds / checkpoint.DAY_SECONDS:g}")
+                return start_seconds
+            self.print_callback("No complete checkpoint to resume from, starting from the beginning")
+        checkpoint.clear_checkpoints(checkpoint_dir, segments_dir)
+        # The output of an earlier run would be stitched with the segments of this one
+        for file_name in ["eplusout.csv", "eplusout.eso"]:
+            Path(output_dir, file_name).unlink(missing_ok=True)
+        return 0
 
     def run(self) -> None:
         self.print_callback("Hey I am starting")
         sleep(0.5)
+        commands = ENGINE_COMMANDS[self.engine]
         try:
             self.sim_starting_callback(len(commands))
-            self.write_options_to_file()
+            validate_periods({**definitions.DEFAULT_FEDERATE_PERIODS, **self.federate_periods})
+            run_config = self.write_options_to_file()
+            path = None
+            if self.engine == "helics":
+                path = write_runner_config(runner_path(run_config.output_dir), run_config.to_dict(), run_config.path)
+            commands = [[argument.format(runner_path=path) for argument in cmd] for cmd in commands]
             for cmd in commands:
                 print(f"Running command: {' '.join(cmd)}")
                 run_command(cmd)
                 print("-" * 50)  # Separator between command outputs
                 self.increment_callback(f"Finished with iteration {commands.index(cmd)}")
-                ep_results = pd.read_csv("/app/Output/eplusout.csv")
-                ep_results = ep_results.drop(ep_results.index[:1]) # initial values look strange
-                self.all_done_callback(fix_results(ep_results))
+                if self.start_seconds:
+                    checkpoint.stitch_energyplus_output(run_config.output_dir, checkpoint.run_segments_dir(run_config.output_dir))
+                # Parse the outputs once into a columnar store, the GUI then only loads the columns it plots
+                self.all_done_callback(ResultStore(write_results_store()))
         except Exception as e:
                 self.error_callback(e)
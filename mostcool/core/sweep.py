@@ -0,0 +1,202 @@
+"""Parametric sweeps of the co-simulation over locations, control options and run configuration options
+
+Every case of the grid is a run configuration of its own:
+- its outputs (EnergyPlus, thermal recorders, checkpoints, logs) go to <sweep_dir>/case_<index>,
+- its federates read it through the MOSTCOOL_RUN_CONFIG environment variable (see config.RunConfig),
+- with the helics engine, it gets its own runner file, whose broker listens on a port of its own.
+The cases run concurrently, as many at a time as the cores can keep busy, and their EnergyPlus results are
+merged into one table indexed by the case parameters and the time.
+
+Example:
+    python -m mostcool.core.sweep --output-dir /app/Output/sweep
+    python -m mostcool.core.sweep --locations "Chicago, IL" "Tampa, FL" --set thermal_rom_mode=rbf,table --workers 2
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import mostcool.core.definitions as definitions
+from mostcool.core.config import RUN_CONFIG_ENV, RunConfig
+from mostcool.core.definitions import CONTROL_OPTIONS
+from mostcool.core.runner_config import NETWORK_CORE_TYPES, runner_path, write_runner_config
+from mostcool.core.results_store import RESULTS_STORE_NAME, ResultStore, write_results_store
+from mostcool.core.simulator import ENGINE_COMMANDS
+
+
+logger = logging.getLogger(__name__)
+
+BASE_PORT = 24000
+PORT_STRIDE = 10  # ports per case, the broker hands the ports above its own to its cores
+PROCESSES_PER_CASE = 3  # busy federate processes of a case, the broker mostly waits
+DEFAULT_CASE = {"datacenter_location": "Chicago, IL", "control_option": CONTROL_OPTIONS.CHANGE_IT_LOAD.name}
+
+
+def default_sweep_dir():
+    """Sweep directory in the output directory of the run configuration."""
+    return os.path.join(definitions.OUTPUT_DIR, "sweep")
+
+
+def expand_grid(grid):
+    """
+    Cases of a parameter grid, the cartesian product of its values.
+
+    Parameters:
+    - grid: {run configuration key: list of values}, e.g. {"datacenter_location": [...], "control_option": [...]}.
+
+    Returns:
+    - A list of {key: value} dicts, one per case, the last key varying fastest.
+    """
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def case_config(parameters, index, sweep_dir=None, base_config=None):
+    """
+    Run configuration of one case.
+
+    Parameters:
+    - parameters: Run configuration options of the case, from expand_grid.
+    - index: Index of the case, sets its output directory and broker port.
+    - sweep_dir: Directory of the case output directories, defaults to OUTPUT_DIR/sweep.
+    - base_config: Run configuration options shared by all cases.
+
+    Returns:
+    - The run configuration as a dict.
+    """
+    run_config = {**DEFAULT_CASE, **(base_config or {}), **parameters}
+    if run_config["datacenter_location"] not in definitions.LOCATION_MAP:
+        raise ValueError(f"Unknown location {run_config['datacenter_location']}, expected one of {list(definitions.LOCATION_MAP)}")
+    if run_config["control_option"] not in CONTROL_OPTIONS.__members__:
+        raise ValueError(f"Unknown control option {run_config['control_option']}, expected one of {list(CONTROL_OPTIONS.__members__)}")
+    run_config["output_dir"] = os.path.join(sweep_dir or default_sweep_dir(), f"case_{index:03d}")
+    run_config["epw_path"] = os.path.join(definitions.ENERGYPLUS_INSTALL_PATH, "WeatherData",
+                                          definitions.LOCATION_MAP[run_config["datacenter_location"]])
+    if run_config.get("helics_core_type", definitions.HELICS_DEFAULTS["helics_core_type"]) in NETWORK_CORE_TYPES:
+        run_config["helics_broker_address"] = f"127.0.0.1:{BASE_PORT + PORT_STRIDE * index}"
+    RunConfig.from_dict(run_config)  # unknown options fail before any case runs
+    return run_config
+
+
+def run_case(run_config, engine="helics"):
+    """
+    Run the co-simulation of one case, its console output goes to output_dir/sweep.log.
+
+    Returns:
+    - The results of the case (EnergyPlus and thermal), also kept in output_dir/results.h5.
+    """
+    output_dir = run_config["output_dir"]
+    config_path = RunConfig.from_dict(run_config).save(os.path.join(output_dir, "run_config", "config.json"))
+    path = write_runner_config(runner_path(output_dir), run_config, config_path) if engine == "helics" else None
+    command = [argument.format(runner_path=path) for argument in ENGINE_COMMANDS[engine][0]]
+    with open(os.path.join(output_dir, "sweep.log"), "w") as log:
+        process = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT,
+                                 env={**os.environ, RUN_CONFIG_ENV: config_path})
+    if process.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} exited with code {process.returncode}, see {log.name}")
+    store_path = write_results_store(os.path.join(output_dir, "eplusout.csv"), os.path.join(output_dir, RESULTS_STORE_NAME),
+                                     os.path.join(output_dir, "time_series_data.csv"))
+    return ResultStore(store_path).load()
+
+
+def merge_results(results, cases):
+    """
+    One table of the results of all cases, indexed by the case parameters and the time.
+
+    Parameters:
+    - results: {case index: results DataFrame indexed by Date/Time} of the cases that finished.
+    - cases: Parameters of every case, as returned by expand_grid.
+
+    Returns:
+    - The results of the cases one after the other, with one index level per parameter before Date/Time.
+    """
+    frames = []
+    for index in sorted(results):
+        # Index levels need hashable values, e.g. federate_periods dicts are kept as their JSON
+        levels = {key: value if np.isscalar(value) else json.dumps(value) for key, value in cases[index].items()}
+        frames.append(results[index].assign(**levels).set_index(list(levels), append=True))
+    if not frames:
+        return pd.DataFrame()
+    merged = pd.concat(frames)
+    return merged.reorder_levels(list(cases[0]) + [merged.index.names[0]])
+
+
+def run_sweep(grid, sweep_dir=None, base_config=None, engine="helics", max_workers=None):
+    """
+    Run every case of a parameter grid, several at a time.
+
+    Parameters:
+    - grid: {run configuration key: list of values}, see expand_grid.
+    - sweep_dir: Directory of the case output directories and of the merged tables, defaults to OUTPUT_DIR/sweep.
+    - base_config: Run configuration options shared by all cases.
+    - engine: "helics" or "direct", see simulator.ENGINE_COMMANDS.
+    - max_workers: Cases run at a time, defaults to the CPU count over PROCESSES_PER_CASE.
+
+    Returns:
+    - The merged results (see merge_results) and a table of the cases with their output directory and error,
+      both also written to sweep_dir as sweep_results.csv and sweep_cases.csv. A failed case does not stop the others.
+    """
+    sweep_dir = sweep_dir or default_sweep_dir()
+    cases = expand_grid(grid)
+    run_configs = [case_config(parameters, index, sweep_dir, base_config) for index, parameters in enumerate(cases)]
+    max_workers = max_workers or max(1, (os.cpu_count() or 1) // PROCESSES_PER_CASE)
+    results, errors = {}, {}
+    # The workers only wait on the co-simulation processes of their case, threads are enough to run them
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_case, run_config, engine): index for index, run_config in enumerate(run_configs)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+                logger.info(f"Case {index} {cases[index]} finished")
+            except Exception as e:
+                errors[index] = str(e)
+                logger.error(f"Case {index} {cases[index]} failed: {e}")
+
+    case_table = pd.DataFrame(cases, index=pd.RangeIndex(len(cases), name="case"))
+    case_table["output_dir"] = [run_config["output_dir"] for run_config in run_configs]
+    case_table["error"] = [errors.get(index) for index in range(len(cases))]
+    merged = merge_results(results, cases)
+    os.makedirs(sweep_dir, exist_ok=True)
+    case_table.to_csv(os.path.join(sweep_dir, "sweep_cases.csv"))
+    merged.to_csv(os.path.join(sweep_dir, "sweep_results.csv"))
+    return merged, case_table
+
+
+def parse_values(values):
+    """Values of a --set option, JSON when they parse as such and strings otherwise."""
+    parsed = []
+    for value in values.split(","):
+        try:
+            parsed.append(json.loads(value))
+        except json.JSONDecodeError:
+            parsed.append(value)
+    return parsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the co-simulation for every combination of the given options")
+    parser.add_argument("--locations", nargs="+", default=list(definitions.LOCATION_MAP), choices=list(definitions.LOCATION_MAP),
+                        help="Data center locations")
+    parser.add_argument("--control-options", nargs="+", default=list(CONTROL_OPTIONS.__members__),
+                        choices=list(CONTROL_OPTIONS.__members__), help="Control options")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE[,VALUE...]",
+                        help="Run configuration option and its values, e.g. thermal_rom_mode=rbf,table")
+    parser.add_argument("--engine", default="helics", choices=list(ENGINE_COMMANDS), help="Co-simulation engine")
+    parser.add_argument("--workers", type=int, default=None, help="Cases run at a time")
+    parser.add_argument("--output-dir", default=None,
+                        help="Directory of the case outputs and merged results, defaults to OUTPUT_DIR/sweep")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    grid = {"datacenter_location": args.locations, "control_option": args.control_options}
+    for option in args.set:
+        key, _, values = option.partition("=")
+        grid[key] = parse_values(values)
+    _, case_table = run_sweep(grid, args.output_dir, engine=args.engine, max_workers=args.workers)
+    print(case_table.to_string())
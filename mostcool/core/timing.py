@@ -0,0 +1,140 @@
+"""Per-federate step timing and its export as a Chrome trace (Perfetto) timeline
+
+Each federate records how long every step spends in its named sections (HELICS time requests, input and
+output exchange, model computation) and writes <federate>_timing.csv when it is destroyed. Starts are kept
+as wall-clock times anchored once per process, so the files of federates running in different processes
+can be merged on one timeline:
+
+    python -m mostcool.core.timing /app/Output/timing -o /app/Output/timing/trace.json
+
+The trace opens in https://ui.perfetto.dev or chrome://tracing, with one row per federate. Timing is opt-in, it is
+enabled by the timing option of the run configuration.
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from contextlib import contextmanager
+import pandas as pd
+import mostcool.core.definitions as definitions
+
+
+TIMING_COLUMNS = ["section", "sim_time", "start", "duration"]
+
+
+def run_timing_dir(output_dir=None):
+    """Timing directory of the run writing to output_dir, defaults to definitions.OUTPUT_DIR."""
+    return os.path.join(output_dir or definitions.OUTPUT_DIR, "timing")
+
+
+class StepTimer:
+    """Monotonic timer of the named sections of a federate's steps."""
+
+    def __init__(self, federate_name, enabled=True):
+        """
+        Parameters:
+        - federate_name: Name of the federate, used for the file name and the trace row.
+        - enabled: If False, nothing is recorded or written.
+        """
+        self.federate_name = federate_name
+        self.enabled = enabled
+        # perf_counter is monotonic but has an arbitrary origin, the wall clock is read once to place it
+        self._wall_anchor = time.time()
+        self._anchor = time.perf_counter()
+        self.records = []
+
+    @staticmethod
+    def now():
+        return time.perf_counter()
+
+    def add(self, section, start, end=None, sim_time=None):
+        """Record a section that started at start (a now() value) and ended at end (defaults to now)."""
+        if self.enabled:
+            end = time.perf_counter() if end is None else end
+            self.records.append((section, sim_time, self._wall_anchor + (start - self._anchor), end - start))
+
+    @contextmanager
+    def section(self, name, sim_time=None):
+        """Time the body of a with statement as one section of the step at sim_time."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, sim_time=sim_time)
+
+    def summary(self):
+        return section_summary(self.to_frame())
+
+    def to_frame(self):
+        return pd.DataFrame(self.records, columns=TIMING_COLUMNS)
+
+    def write(self, timing_dir=None):
+        """
+        Write the records to <timing_dir>/<federate>_timing.csv (timing_dir defaults to OUTPUT_DIR/timing) and
+        return the path (None if disabled).
+        """
+        if not self.enabled:
+            return None
+        timing_dir = timing_dir or run_timing_dir()
+        os.makedirs(timing_dir, exist_ok=True)
+        path = os.path.join(timing_dir, f"{self.federate_name}_timing.csv")
+        self.to_frame().to_csv(path, index=False)
+        return path
+
+
+def section_summary(timing):
+    """Total, mean and count of the duration of each section in seconds."""
+    return timing.groupby("section")["duration"].agg(["sum", "mean", "count"])
+
+
+def merge_traces(timing_dir=None, output_path=None):
+    """
+    Merge the timing files of all federates into one Chrome trace.
+
+    Parameters:
+    - timing_dir: Directory with the <federate>_timing.csv files, defaults to OUTPUT_DIR/timing.
+    - output_path: Where to write the trace JSON, defaults to <timing_dir>/trace.json.
+
+    Returns:
+    - The trace as a dict in the Chrome trace event format.
+    """
+    timing_dir = timing_dir or run_timing_dir()
+    paths = sorted(glob.glob(os.path.join(timing_dir, "*_timing.csv")))
+    if not paths:
+        raise FileNotFoundError(f"No timing files found in {timing_dir}")
+    timings = {os.path.basename(path)[:-len("_timing.csv")]: pd.read_csv(path) for path in paths}
+    origin = min(timing["start"].min() for timing in timings.values() if len(timing))
+
+    events = []
+    for tid, (federate_name, timing) in enumerate(timings.items()):
+        events.append({"name": "thread_name", "ph": "M", "pid": 0, "tid": tid, "args": {"name": federate_name}})
+        starts = ((timing["start"] - origin) * 1e6).tolist()
+        durations = (timing["duration"] * 1e6).tolist()
+        for section, sim_time, start, duration in zip(timing["section"], timing["sim_time"], starts, durations):
+            events.append({"name": section, "cat": federate_name, "ph": "X", "pid": 0, "tid": tid,
+                           "ts": start, "dur": duration,
+                           "args": {} if pd.isna(sim_time) else {"sim_time": sim_time}})
+
+    trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+    output_path = output_path or os.path.join(timing_dir, "trace.json")
+    with open(output_path, "w") as f:
+        json.dump(trace, f)
+    return trace
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge federate timing files into a Chrome trace JSON")
+    parser.add_argument("timing_dir", nargs="?", default=None,
+                        help="Directory with the *_timing.csv files, defaults to the one of the run configuration")
+    parser.add_argument("-o", "--output", default=None, help="Trace JSON, defaults to <timing_dir>/trace.json")
+    args = parser.parse_args()
+    timing_dir = args.timing_dir or run_timing_dir()
+    merge_traces(timing_dir, args.output)
+    for path in sorted(glob.glob(os.path.join(timing_dir, "*_timing.csv"))):
+        print(os.path.basename(path))
+        print(section_summary(pd.read_csv(path)).to_string())
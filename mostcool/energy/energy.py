@@ -2,8 +2,13 @@
 from dataclasses import dataclass
 import os
 from pathlib import Path
+import numpy as np
 import mostcool.core.federate as federate
 import mostcool.core.definitions as definitions
+from mostcool.core.checkpoint import Checkpointer, restart_idf_path, run_segments_dir, segment_dir, write_restart_idf
+from mostcool.core.recorder import HDF5Recorder
+from mostcool.energy.exchange import ExchangeBindings
+from mostcool.energy.idf_tools import prune_output_variables, required_output_variables
 import sys
 
 
@@ -32,12 +37,49 @@ class Sensor:
     sensor_handle: str = None
 
 
-# Define a dictionary to store the results - unnecessary if you don't need it. 
-results = {"HVAC Energy": [], "Total Energy": [], "Time": [], "Liquid Cooling Load": [], "Supply Approach Temperature": [], "CPU load": []}
+# Results recorded every timestep, flushed to output_dir/RESULTS_NAME once per simulated day so memory stays bounded
+RESULTS_NAME = "energyplus_results.h5"
+RESULTS_CHANNELS = ["HVAC Energy", "Total Energy", "Liquid Cooling Load", "Supply Approach Temperature", "CPU load"]
+RESULTS_CHUNK_SIZE = 144  # one simulated day at 10 min timesteps
+
+# (results channel, subscription name, scale) of the actuator values stored in results
+RECORDED_SUBS = [
+    ("Liquid Cooling Load", "Schedule:Compact/Schedule Value/Load Profile 1 Load Schedule", -1),
+    ("Supply Approach Temperature", "Schedule:Constant/Schedule Value/Supply Temperature Difference Schedule Mod", 1),
+    ("CPU load", "Schedule:Compact/Schedule Value/Data Center CPU Loading Schedule", 1),
+]
+# (results channel, publication name) of the sensor values stored in results
+RECORDED_PUBS = [
+    ("HVAC Energy", "Whole Building/Facility Total HVAC Electricity Demand Rate"),
+    ("Total Energy", "Whole Building/Facility Total Electricity Demand Rate"),
+    ("CPU load", "Data Center CPU Loading Schedule/Schedule Value"),
+]
 
 
 class energyplus_runner:
-    def __init__(self, output_dir, epw_path, idf_path):
+    def __init__(self, output_dir, epw_path, idf_path, federate_factory=federate.mostcool_federate):
+        """
+        Parameters:
+        - output_dir: EnergyPlus output directory.
+        - epw_path: Weather file.
+        - idf_path: EnergyPlus model.
+        - federate_factory: Creates the federate, called like federate.mostcool_federate (e.g. a direct coupling federate).
+
+        A resumed run (definitions.START_SECONDS) runs a copy of the IDF beginning on the day it resumes from,
+        with its outputs in the directory of that run segment. With definitions.OUTPUT_VARIABLES set, it runs a
+        copy of the IDF that only reports those variables and the sensors (see idf_tools).
+        """
+        self.checkpointer = Checkpointer("EnergyPlus")
+        # The results of all run segments go to one file in the output directory of the run
+        self.results_path = os.path.join(output_dir, RESULTS_NAME)
+        resume_rows = None
+        if definitions.START_SECONDS:
+            idf_path = write_restart_idf(idf_path, definitions.START_SECONDS, restart_idf_path(output_dir))
+            output_dir = segment_dir(definitions.START_SECONDS, run_segments_dir(output_dir))
+            resume_rows = self.checkpointer.load()["results_rows"]
+        if definitions.OUTPUT_VARIABLES is not None:
+            idf_path = prune_output_variables(idf_path, required_output_variables(definitions.OUTPUT_VARIABLES),
+                                              other_frequency=definitions.PRUNED_OUTPUT_FREQUENCY)
         self.output_dir = output_dir
         Path(output_dir).mkdir(parents=True, exist_ok=True)
         self.epw_path = epw_path
@@ -64,31 +106,33 @@ class energyplus_runner:
             for sensor in definitions.SENSORS
         ]
         
-        self.ep_federate = federate.mostcool_federate(federate_name="EnergyPlus", 
+        self.ep_federate = federate_factory(federate_name="EnergyPlus", 
                                                       subscriptions=[Actuator.sub_instance for Actuator in self.actuators], 
-                                                      publications=[Sensor.pub_instance for Sensor in self.sensors])
+                                                      publications=[Sensor.pub_instance for Sensor in self.sensors],
+                                                      bundle_sources=["Controller", "Server_1"])
+        # Bindings of the recorded values, resolved once instead of matching names every timestep
+        self.recorded_subs = [(RESULTS_CHANNELS.index(key), self.ep_federate.subscription(name), scale) 
+                              for key, name, scale in RECORDED_SUBS if name in self.ep_federate.sub_bindings]
+        self.recorded_pubs = [(RESULTS_CHANNELS.index(key), self.ep_federate.publication(name)) 
+                              for key, name in RECORDED_PUBS if name in self.ep_federate.pub_bindings]
+        # Values of the current timestep, channels without a recorded signal stay NaN
+        self.result_row = np.full(len(RESULTS_CHANNELS), np.nan)
+        self.results = HDF5Recorder(self.results_path, 
+                                    channels=RESULTS_CHANNELS, 
+                                    n_steps=(definitions.TOTAL_SECONDS - definitions.START_SECONDS) // definitions.TIMESTEP_PERIOD_SECONDS, 
+                                    chunk_size=RESULTS_CHUNK_SIZE, 
+                                    resume_rows=resume_rows)
+        # EnergyPlus handles are looked up once the API data is ready
+        self.exchange = ExchangeBindings(self.api, self.actuators, self.sensors)
+        # EnergyPlus physics runs between two timestep callbacks, timed from the end of the previous one
+        self.physics_start = None
         
 
     def set_actuators(self, state):
-        for actuator in self.actuators:
-            handle = self.api.exchange.get_actuator_handle(
-                state,
-                actuator.component_type,
-                actuator.control_type,
-                actuator.actuator_key,
-            )
-            self.api.exchange.set_actuator_value(
-                state, handle, actuator.sub_instance.value
-            )
+        self.exchange.set_actuators(state)
 
     def get_sensors(self, state):
-        for sensor in self.sensors:
-            handle = self.api.exchange.get_variable_handle(
-                state, sensor.variable_name, sensor.variable_key
-            )
-            sensor.pub_instance.value = self.api.exchange.get_variable_value(
-                state, handle
-            )
+        self.exchange.get_sensors(state)
 
 
     def _warmup_complete_callback(self, state):
@@ -100,36 +144,33 @@ class energyplus_runner:
 
 
     def _timestep_callback(self, state):
+        if not self.exchange.resolved and not self.exchange.resolve(state):
+            return
         if self.warmup_done:
+            timer = self.ep_federate.timer
+            if self.physics_start is not None:
+                timer.add("energyplus", self.physics_start, sim_time=self.ep_federate.granted_time)
 
             # Request next time
             self.ep_federate.request_time()
+            self.checkpointer.save_if_due(self.ep_federate.granted_time, lambda: {"results_rows": self.results.checkpoint()})
 
             # Get subbed actuator values and set them in EnergyPlus
-            subs = self.ep_federate.update_subs()
-            for sub in subs:
-                if sub.name == "Schedule:Compact/Schedule Value/Load Profile 1 Load Schedule":
-                    results["Liquid Cooling Load"].append(sub.value*(-1))
-                elif sub.name == "Schedule:Constant/Schedule Value/Supply Temperature Difference Schedule Mod":
-                    results["Supply Approach Temperature"].append(sub.value)
-                elif sub.name == "Schedule:Compact/Schedule Value/Data Center CPU Loading Schedule":
-                    results["CPU load"].append(sub.value)
+            self.ep_federate.read_all()
+            for channel, sub, scale in self.recorded_subs:
+                self.result_row[channel] = sub.value*scale
             
-            self.set_actuators(state)
+            with timer.section("set_actuators", self.ep_federate.granted_time):
+                self.set_actuators(state)
 
             # Get sensor values from EnergyPlus and publish them
-            self.get_sensors(state)
-            self.ep_federate.update_pubs()
-            for pub in self.ep_federate.pubs:
-                sensor_name = pub.name
-                sensor_value = pub.value
-                if sensor_name == "Whole Building/Facility Total HVAC Electricity Demand Rate":
-                    results["HVAC Energy"].append(sensor_value)
-                elif sensor_name == "Whole Building/Facility Total Electricity Demand Rate":
-                    results["Total Energy"].append(sensor_value)
-                elif sensor_name == "Data Center CPU Loading Schedule/Schedule Value":
-                    results["CPU load"].append(sensor_value)
-            results["Time"].append(self.ep_federate.granted_time)
+            with timer.section("get_sensors", self.ep_federate.granted_time):
+                self.get_sensors(state)
+            self.ep_federate.publish_all()
+            for channel, pub in self.recorded_pubs:
+                self.result_row[channel] = pub.value
+            self.results.record(self.ep_federate.granted_time, *self.result_row)
+            self.physics_start = timer.now()
 
     def run(self):
         state = self.api.state_manager.new_state()
@@ -145,6 +186,9 @@ class energyplus_runner:
         self.api.runtime.callback_end_zone_timestep_after_zone_reporting(
             state, self._timestep_callback
         )
+        # The sensors are read through the API whether or not the IDF reports them
+        for sensor in self.sensors:
+            self.api.exchange.request_variable(state, sensor.variable_name, sensor.variable_key)
         # Run EnergyPlus
         exit_code = self.api.runtime.run_energyplus(
             state,
@@ -157,47 +201,59 @@ class energyplus_runner:
                 self.idf_path,
             ],
         )
+        # Write the rows still buffered since the last daily flush
+        self.results.close()
         print(f"EnergyPlus exited with code: {exit_code}, at HELICS time {self.ep_federate.granted_time}. Outputs at {self.output_dir}")
         self.ep_federate.destroy_federate()
+        if self.exchange.error is not None:
+            raise self.exchange.error
+
+
+def plot_results(results_path=None):
+    # plot the recorded "HVAC Energy" and the controlled value against time
+    import matplotlib.pyplot as plt
+
+    results_path = results_path or os.path.join(definitions.OUTPUT_DIR, RESULTS_NAME)
+    results = HDF5Recorder.read(results_path)
+
+    # time_slice = slice(31392, 32400)  # this is August 1-7 in annual simulation
+    if definitions.CONTROL_OPTION == definitions.CONTROL_OPTIONS.CHANGE_LIQUID_COOLING:
+        time_slice = slice(4464, 5472)  # this is August 1-7 in Jul-Aug runperiod
+        y2 = results["Liquid Cooling Load"].iloc[time_slice]
+        y2_label = "Liquid Cooling Load (W)"
+    elif definitions.CONTROL_OPTION == definitions.CONTROL_OPTIONS.CHANGE_SUPPLY_DELTA_T:
+        time_slice = slice(None)  # this is whole Jul to Aug
+        y2 = results["Supply Approach Temperature"].iloc[time_slice]
+        y2_label = "Supply Approach Temperature (C)"
+    elif definitions.CONTROL_OPTION == definitions.CONTROL_OPTIONS.CHANGE_IT_LOAD:
+        time_slice = slice(None)  # this is whole Jul to Aug
+        y2 = results["CPU load"].iloc[time_slice]
+        y2_label = "CPU load fraction"
+    else:
+        print("CONTROL_OPTION not defined correctly in definitions.py")
+    x = results.index[time_slice]
+    y1 = results["HVAC Energy"].iloc[time_slice]
+
+    fig, ax1 = plt.subplots()
+    ax1.plot(x, y1, 'g-')
+    ax1.set_xlabel('Time (s)')
+    ax1.set_ylabel('HVAC Energy (W)', color='g')
+    # Plot the second data set on the secondary axis
+    ax2 = ax1.twinx()
+    ax2.plot(x, y2, 'b--')  # Blue solid line
+    ax2.set_ylabel(y2_label, color='b')
+    if definitions.CONTROL_OPTION == definitions.CONTROL_OPTIONS.CHANGE_LIQUID_COOLING:
+        ax2.set_ylim([0, 2000000])  # for CHANGE_LIQUID_COOLING only
+
+
+    # plt.show()
+    os.makedirs(definitions.GRAPHS_DIR, exist_ok=True)
+    plt.savefig((os.path.join(definitions.GRAPHS_DIR, f"OutputImage_{definitions.CONTROL_OPTION}.pdf")), format="pdf", bbox_inches="tight")
 
 
-energyplus_runner = energyplus_runner(
-    definitions.OUTPUT_DIR, definitions.EPW_PATH, definitions.IDF_PATH
-)
-energyplus_runner.run()
-
-# plot ep_fed.results["Time"] vs ep_fed.results["Energy"]
-import matplotlib.pyplot as plt
-
-# time_slice = slice(31392, 32400)  # this is August 1-7 in annual simulation
-if definitions.CONTROL_OPTION == definitions.CONTROL_OPTIONS.CHANGE_LIQUID_COOLING:
-    time_slice = slice(4464, 5472)  # this is August 1-7 in Jul-Aug runperiod
-    y2 = results["Liquid Cooling Load"][time_slice]
-    y2_label = "Liquid Cooling Load (W)"
-elif definitions.CONTROL_OPTION == definitions.CONTROL_OPTIONS.CHANGE_SUPPLY_DELTA_T:
-    time_slice = slice(None)  # this is whole Jul to Aug
-    y2 = results["Supply Approach Temperature"][time_slice]
-    y2_label = "Supply Approach Temperature (C)"
-elif definitions.CONTROL_OPTION == definitions.CONTROL_OPTIONS.CHANGE_IT_LOAD:
-    time_slice = slice(None)  # this is whole Jul to Aug
-    y2 = results["CPU load"][time_slice]
-    y2_label = "CPU load fraction"
-else:
-    print("CONTROL_OPTION not defined correctly in definitions.py")
-x = results["Time"][time_slice]
-y1 = results["HVAC Energy"][time_slice]
-
-fig, ax1 = plt.subplots()
-ax1.plot(x, y1, 'g-')
-ax1.set_xlabel('Time (s)')
-ax1.set_ylabel('HVAC Energy (W)', color='g')
-# Plot the second data set on the secondary axis
-ax2 = ax1.twinx()
-ax2.plot(x, y2, 'b--')  # Blue solid line
-ax2.set_ylabel(y2_label, color='b')
-if definitions.CONTROL_OPTION == definitions.CONTROL_OPTIONS.CHANGE_LIQUID_COOLING:
-    ax2.set_ylim([0, 2000000])  # for CHANGE_LIQUID_COOLING only
-
-
-# plt.show()
-plt.savefig((os.path.join(definitions.OUTPUT_DIR, "graphs", f"OutputImage_{definitions.CONTROL_OPTION}.pdf")), format="pdf", bbox_inches="tight")
+if __name__ == "__main__":
+    energyplus_runner = energyplus_runner(
+        definitions.OUTPUT_DIR, definitions.EPW_PATH, definitions.IDF_PATH
+    )
+    energyplus_runner.run()
+    plot_results()
@@ -0,0 +1,95 @@
+"""Cached EnergyPlus data exchange handles of the actuators and sensors"""
+
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class MissingHandlesError(RuntimeError):
+    """Raised when actuators or sensors exchanged with HELICS do not exist in the EnergyPlus model."""
+
+
+class ExchangeBindings:
+    """
+    Actuator and sensor handles resolved once, as soon as the EnergyPlus API data is fully ready.
+
+    EnergyPlus returns -1 for unknown handles. All of them are checked in one pass so that every missing
+    actuator or sensor is reported at once, and the simulation is stopped instead of running with them.
+    After that, set_actuators and get_sensors only do raw get/set calls with the cached integer handles.
+    """
+
+    def __init__(self, api, actuators, sensors):
+        """
+        Parameters:
+        - api: EnergyPlusAPI instance.
+        - actuators: Actuators with component_type, control_type, actuator_key and sub_instance (value to set).
+        - sensors: Sensors with variable_name, variable_key and pub_instance (where the value is stored).
+        """
+        self.api = api
+        self.actuators = actuators
+        self.sensors = sensors
+        self.actuator_handles = None
+        self.sensor_handles = None
+        self.error = None
+
+    @property
+    def resolved(self):
+        return self.actuator_handles is not None
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+    def resolve(self, state):
+        """
+        Look up and validate all handles once the API data is ready.
+
+        Returns:
+        - True once the handles are resolved, False while the API data is not ready yet or after handles were
+          found missing (the error is then in self.error).
+        """
+        if self.resolved:
+            return True
+        if self.failed:
+            return False
+        exchange = self.api.exchange
+        if not exchange.api_data_fully_ready(state):
+            return False
+        actuator_handles = [
+            exchange.get_actuator_handle(state, actuator.component_type, actuator.control_type, actuator.actuator_key)
+            for actuator in self.actuators
+        ]
+        sensor_handles = [
+            exchange.get_variable_handle(state, sensor.variable_name, sensor.variable_key)
+            for sensor in self.sensors
+        ]
+        missing = [
+            f"Actuator {actuator.component_type}/{actuator.control_type}/{actuator.actuator_key}"
+            for actuator, handle in zip(self.actuators, actuator_handles) if handle < 0
+        ] + [
+            f"Output variable {sensor.variable_key}/{sensor.variable_name}"
+            for sensor, handle in zip(self.sensors, sensor_handles) if handle < 0
+        ]
+        if missing:
+            # Exceptions do not propagate through the EnergyPlus callbacks, so the simulation is stopped here
+            # and the error is kept for the runner to raise once EnergyPlus returns
+            self.error = MissingHandlesError(f"{len(missing)} exchange handles not found in the EnergyPlus model:\n"
+                                             + "\n".join(f"- {name}" for name in missing))
+            logger.error(str(self.error))
+            self.api.runtime.stop_simulation(state)
+            return False
+        self.actuator_handles = actuator_handles
+        self.sensor_handles = sensor_handles
+        logger.info(f"Resolved {len(actuator_handles)} actuator and {len(sensor_handles)} sensor handles")
+        return True
+
+    def set_actuators(self, state):
+        set_actuator_value = self.api.exchange.set_actuator_value
+        for actuator, handle in zip(self.actuators, self.actuator_handles):
+            set_actuator_value(state, handle, actuator.sub_instance.value)
+
+    def get_sensors(self, state):
+        get_variable_value = self.api.exchange.get_variable_value
+        for sensor, handle in zip(self.sensors, self.sensor_handles):
+            sensor.pub_instance.value = get_variable_value(state, handle)
@@ -0,0 +1,116 @@
+"""Rewrites of the EnergyPlus model of a run: only report the output variables the run consumes
+
+The models declare over a hundred Output:Variable objects at Timestep frequency, which EnergyPlus computes and
+writes to eplusout.eso/csv every timestep. A run only reads the SENSORS through the API (which needs their
+Output:Variable objects) and the variables plotted from eplusout.csv. prune_output_variables copies the IDF
+keeping those at their frequency, and drops the other Output:Variable objects or moves them to a coarser one.
+"""
+
+import logging
+import os
+import re
+import mostcool.core.definitions as definitions
+
+
+logger = logging.getLogger(__name__)
+
+PRUNED_IDF_NAME = "pruned.idf"
+# eplusout.csv column of a variable, e.g. "EAST ZONE:Zone Air Temperature [C](TimeStep)"
+COLUMN_PATTERN = re.compile(r"^\s*(?P<key>[^:]*):(?P<name>.*?)\s*\[[^\]]*\](\(.*\))?\s*$")
+
+
+def idf_objects(lines):
+    """(first line, last line, fields) of each object of the IDF lines, comments excluded from the fields."""
+    start, code = None, []
+    for i, line in enumerate(lines):
+        text = line.split("!")[0]
+        if start is None:
+            if not text.strip():
+                continue
+            start = i
+        code.append(text)
+        if ";" in text:
+            fields = [field.strip() for field in re.split(r"[,;]", "".join(code).split(";")[0])]
+            yield start, i, fields
+            start, code = None, []
+
+
+def output_variable_spec(column):
+    """Key/Variable Name of an eplusout.csv column, None if the column is not an output variable."""
+    match = COLUMN_PATTERN.match(column)
+    return f"{match.group('key')}/{match.group('name')}" if match else None
+
+
+def required_output_variables(output_variables=()):
+    """
+    Output variables a run needs, as Key/Variable Name or Variable Name (any key) strings.
+
+    Parameters:
+    - output_variables: Variables to report on top of the SENSORS, e.g. the plotted ones (see output_variable_spec).
+    """
+    return [f'{sensor["variable_key"]}/{sensor["variable_name"]}' for sensor in definitions.SENSORS] + list(output_variables)
+
+
+def is_kept(key, name, keep):
+    """Whether the Output:Variable of key and name reports one of the keep specs."""
+    for spec in keep:
+        spec_key, _, spec_name = spec.rpartition("/")
+        # A "*" object reports the variable of every key, it covers any key of the spec
+        if spec_name.lower() == name.lower() and (not spec_key or key == "*" or spec_key.lower() == key.lower()):
+            return True
+    return False
+
+
+def prune_output_variables(idf_path, keep, output_path=None, other_frequency=None):
+    """
+    Copy an IDF keeping only the Output:Variable objects of the keep specs at their frequency.
+
+    Parameters:
+    - idf_path: EnergyPlus model of the run.
+    - keep: Variables to keep, as returned by required_output_variables.
+    - output_path: Pruned IDF to write, defaults to OUTPUT_DIR/run_config/pruned.idf.
+    - other_frequency: Reporting frequency (e.g. "Hourly") the other variables are moved to, None drops them.
+
+    Returns:
+    - output_path.
+    """
+    output_path = output_path or os.path.join(definitions.OUTPUT_DIR, "run_config", PRUNED_IDF_NAME)
+    with open(idf_path, newline="") as f:
+        lines = f.read().splitlines(keepends=True)
+    newline = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+
+    kept, moved, dropped = 0, 0, 0
+    replacements = {}  # first line: (last line, new lines)
+    for start, end, fields in idf_objects(lines):
+        if fields[0].lower() != "output:variable":
+            continue
+        key, name = fields[1], fields[2]
+        if is_kept(key, name, keep):
+            kept += 1
+        elif other_frequency:
+            moved += 1
+            schedule = [f"    {fields[4]};  !- Schedule Name{newline}"] if len(fields) > 4 and fields[4] else []
+            replacements[start] = (end, [f"Output:Variable,{newline}",
+                                         f"    {key},  !- Key Value{newline}",
+                                         f"    {name},  !- Variable Name{newline}",
+                                         f"    {other_frequency}{',' if schedule else ';'}  !- Reporting Frequency{newline}"] + schedule)
+        else:
+            dropped += 1
+            replacements[start] = (end, [])
+
+    pruned, i = [], 0
+    while i < len(lines):
+        if i in replacements:
+            end, new_lines = replacements[i]
+            pruned.extend(new_lines)
+            i = end + 1
+        else:
+            pruned.append(lines[i])
+            i += 1
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", newline="") as f:
+        f.writelines(pruned)
+    logger.info(f"Pruned IDF written to {output_path}: {kept} output variables kept, {moved} moved to "
+                f"{other_frequency}, {dropped} dropped")
+    return output_path
@@ -0,0 +1,18 @@
+import json
+from mostcool.benchmarks.thermal_rom import PATHS, check_budgets, run_benchmarks
+
+
+def test_benchmark_reports_every_path(tmp_path):
+    benchmark = run_benchmarks([2000], n_samples=10, batch_size=20, repeats=3)
+    assert [result["path"] for result in benchmark["results"]] == PATHS
+    for result in benchmark["results"]:
+        assert result["fit_time_s"] > 0 and result["single_latency_s"] > 0
+        assert result["batch_throughput_per_s"] > 0 and result["peak_memory_mb"] > 0
+        # The traced peak covers the modes, which are allocated after tracing starts
+        assert result["peak_memory_mb"] >= result["modes_mb"] == 2000 * 6 * 8 / 2**20
+    path = tmp_path / "benchmark.json"
+    path.write_text(json.dumps(benchmark))
+    assert json.loads(path.read_text())["results"] == benchmark["results"]
+
+    assert check_budgets(benchmark) == []
+    assert len(check_budgets(benchmark, max_latency_ms=0)) == len(PATHS) - 1
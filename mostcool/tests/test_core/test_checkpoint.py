@@ -0,0 +1,106 @@
+from pathlib import Path
+import pandas as pd
+import pytest
+from mostcool.core import definitions
+from mostcool.core.checkpoint import (FEDERATES, Checkpointer, latest_checkpoint, run_checkpoint_dir, run_segments_dir,
+                                      read_eso, segment_dir, stitch_energyplus_output, write_restart_idf)
+
+
+IDF_PATH = Path(__file__).parents[2] / "energy" / "data" / "2ZoneDataCenterCRAHandplant.idf"
+DAY = 24 * 3600
+
+
+def test_checkpoints_at_day_boundaries(tmp_path, monkeypatch):
+    monkeypatch.setattr(definitions, "TOTAL_SECONDS", 4 * DAY)
+    energyplus = Checkpointer("EnergyPlus", interval_seconds=DAY, start_seconds=0, checkpoint_dir=tmp_path)
+    thermal = Checkpointer("Server_1", interval_seconds=DAY, start_seconds=0, checkpoint_dir=tmp_path)
+    saved = [energyplus.save_if_due(time, lambda: {"step": time}) for time in range(600, 4 * DAY + 1, 600)]
+    assert [time for time in saved if time is not None] == [DAY, 2 * DAY, 3 * DAY]
+    # Only the last two checkpoints of a federate are kept
+    assert sorted(path.name for path in tmp_path.iterdir()) == [str(2 * DAY), str(3 * DAY)]
+    assert energyplus.load(3 * DAY) == {"step": 3 * DAY}
+    assert latest_checkpoint(["EnergyPlus", "Server_1"], tmp_path) is None
+
+    # A federate waiting for updates may be granted past a boundary, its checkpoint is kept at the boundary
+    assert thermal.save_if_due(2 * DAY + 1200, lambda: {"rows": 7}) == 2 * DAY
+    assert latest_checkpoint(["EnergyPlus", "Server_1"], tmp_path) == 2 * DAY
+    resumed = Checkpointer("Server_1", interval_seconds=DAY, start_seconds=2 * DAY, checkpoint_dir=tmp_path)
+    assert resumed.load() == {"rows": 7} and resumed.next_time == 3 * DAY
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_simulator_resumes_from_the_checkpoints_of_its_output_dir(tmp_path):
+    from mostcool.core.simulator import Simulator
+
+    for federate_name in FEDERATES:
+        Checkpointer(federate_name, interval_seconds=DAY, start_seconds=0, checkpoint_dir=run_checkpoint_dir(tmp_path)).save(DAY, {})
+    Path(segment_dir(DAY, run_segments_dir(tmp_path))).mkdir(parents=True)
+    simulator = Simulator("model.idf", "weather.epw", "CHANGE_IT_LOAD", "Chicago, IL", resume=True)
+    messages = []
+    simulator.print_callback = messages.append
+    assert simulator.resume_time(tmp_path) == DAY
+    # A new run clears the checkpoints and segments of the previous one
+    simulator.resume = False
+    assert simulator.resume_time(tmp_path) == 0
+    assert not (tmp_path / "checkpoints").exists() and not (tmp_path / "segments").exists()
+
+
+def test_restart_idf_begins_later(tmp_path):
+    path = write_restart_idf(IDF_PATH, 31 * DAY, tmp_path / "restart.idf")
+    original, restarted = IDF_PATH.read_bytes().split(b"\r\n"), Path(path).read_bytes().split(b"\r\n")
+    changed = [(a.decode(), b.decode()) for a, b in zip(original, restarted) if a != b]
+    assert [(a.split(",")[0].strip(), b.split(",")[0].strip()) for a, b in changed] == [
+        ("7", "8"),  # Begin Month
+        ("Tuesday", "Friday"),  # Day of Week for Start Day
+    ]
+    with pytest.raises(ValueError, match="beginning of a day"):
+        write_restart_idf(IDF_PATH, DAY + 600, tmp_path / "restart.idf")
+
+
+def write_eso(path, ends, power):
+    """Partial eplusout.eso of a run that died, with one TimeStep and one Hourly variable."""
+    lines = ["Program Version,EnergyPlus, Version 23.2.0",
+             "1,5,Environment Title[],Latitude[deg],Longitude[deg],Time Zone[],Elevation[m]",
+             "2,8,Day of Simulation[],Month[],Day of Month[],DST Indicator[1=yes 0=no],Hour[],StartMinute[],EndMinute[],DayType",
+             "7,1,Whole Building,Power [W] !TimeStep",
+             "8,1,EAST ZONE,Zone Air Temperature [C] !Hourly",
+             "End of Data Dictionary",
+             "1,CHICAGO RUN PERIOD,  41.98, -87.92,  -6.00, 201.00"]
+    for end in ends:
+        # EnergyPlus numbers the hours from 1, the timestep ending at midnight is in hour 24 of the day before
+        start = end - pd.Timedelta(minutes=10)
+        day = f"{start:%m}, {start:%d}, 0,{start.hour + 1:2d}"
+        lines += [f"2,1, {day},{start.minute:6.2f},{start.minute + 10:6.2f},Tuesday", f"7,{power}"]
+        if start.minute == 50:
+            lines += [f"2,1, {day},  0.00, 60.00,Tuesday", "8,21.5"]
+    path.write_text("\n".join(lines[:-1]) + "\n")  # cut off in the middle of the last timestep
+
+
+def test_eso_rows_match_the_csv_times(tmp_path):
+    ends = pd.date_range("2001-07-01 00:10", periods=12, freq="10min")
+    write_eso(tmp_path / "eplusout.eso", ends, 1.0)
+    eso = read_eso(tmp_path / "eplusout.eso")
+    assert list(eso.columns) == ["Date/Time", "Whole Building:Power [W](TimeStep)", "EAST ZONE:Zone Air Temperature [C](Hourly)"]
+    # Times are those of the CSV, the last timestep was cut off and the Hourly values fall on the hour
+    assert eso["Date/Time"].tolist()[4:7] == [" 07/01  00:50:00", " 07/01  01:00:00", " 07/01  01:10:00"]
+    assert len(eso) == 11
+    assert eso["EAST ZONE:Zone Air Temperature [C](Hourly)"].notna().tolist() == [False] * 5 + [True] + [False] * 5
+
+
+def test_stitch_segments(tmp_path):
+    segments = tmp_path / "segments"
+    ends = pd.date_range("2001-07-01 00:10", periods=3 * 144, freq="10min")
+    times = [(end - pd.Timedelta(days=1)).strftime(" %m/%d  24:00:00") if end.hour == end.minute == 0
+             else end.strftime(" %m/%d  %H:%M:00") for end in ends]
+    # The first run died after two days without writing eplusout.csv, only its ESO,
+    # the resumed run started at the checkpoint of day one and finished
+    write_eso(tmp_path / "eplusout.eso", ends[:288], 1.0)
+    assert not (tmp_path / "eplusout.csv").exists()
+    Path(segment_dir(DAY, segments)).mkdir(parents=True)
+    pd.DataFrame({"Date/Time": times[144:], "Whole Building:Power [W](TimeStep)": 2.0}).to_csv(
+        Path(segment_dir(DAY, segments)) / "eplusout.csv", index=False)
+
+    stitched = stitch_energyplus_output(tmp_path, segments, timestep_seconds=600)
+    assert stitched["Date/Time"].tolist() == times
+    assert stitched["Whole Building:Power [W](TimeStep)"].tolist() == [1.0] * 144 + [2.0] * 288
+    assert pd.read_csv(tmp_path / "eplusout.csv").shape == (3 * 144, 3)
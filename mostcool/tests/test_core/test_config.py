@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+import mostcool.core.definitions as definitions
+from mostcool.core.config import RUN_CONFIG_ENV, RunConfig
+from mostcool.core.runner_config import build_runner_config
+
+
+def test_run_config_round_trip(tmp_path):
+    path = RunConfig(control_option="CHANGE_LIQUID_COOLING", datacenter_location="Tampa, FL",
+                     output_dir=str(tmp_path), federate_periods={"Server_1": 3600}).save(str(tmp_path / "config.json"))
+    config = RunConfig.load(path)
+    assert config == RunConfig.from_dict(json.loads(open(path).read()))
+    assert config.energyplus_idf_path == definitions.LIQUID_COOLING_IDF_PATH
+    assert config.energyplus_epw_path.endswith("USA_FL_Tampa.Intl.AP.722110_TMY3.epw")
+    assert config.all_federate_periods == {"EnergyPlus": 600, "Controller": 600, "Server_1": 3600}
+    # Only runs that opt in (the Simulator) write checkpoints
+    assert config.checkpoint_interval_seconds == 0
+    # Federate timings are opt-in as well
+    assert not config.timing
+    with pytest.raises(ValueError, match="thermal_rom_mod"):
+        RunConfig.from_dict({"thermal_rom_mod": "table"})
+    # A resumed EnergyPlus run restarts at the beginning of a day
+    with pytest.raises(ValueError, match="whole number of days"):
+        RunConfig.from_dict({"checkpoint_interval_days": 0.5})
+    assert RunConfig.from_dict({"checkpoint_interval_days": 2.0}).checkpoint_interval_seconds == 2 * 24 * 3600
+
+
+def test_definitions_read_the_run_config_of_the_process(tmp_path, monkeypatch):
+    path = RunConfig(output_dir=str(tmp_path / "run"), helics_core_type="tcp").save(str(tmp_path / "config.json"))
+    monkeypatch.setenv(RUN_CONFIG_ENV, path)
+    monkeypatch.setattr(definitions, "_run_config", None)
+    assert definitions.OUTPUT_DIR == str(tmp_path / "run")
+    assert definitions.HELICS_CORE_TYPE == "tcp"
+    assert definitions.CONTROL_OPTION == definitions.CONTROL_OPTIONS.CHANGE_IT_LOAD
+    # Nothing is created on load, the output directory is made by the run
+    assert not (tmp_path / "run").exists()
+    # The federates of a generated runner read the same file
+    runner = build_runner_config(definitions.RUN_CONFIG, config_path=path)
+    assert all(federate["env"][RUN_CONFIG_ENV] == path for federate in runner["federates"][1:])
+
+
+def test_importing_the_federates_does_not_load_the_run_config(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"unknown_option": 1}))
+    modules = ["mostcool.core.federate", "mostcool.core.simulator", "mostcool.core.sweep", "mostcool.thermal.server_federate"]
+    process = subprocess.run([sys.executable, "-c", f"import {', '.join(modules)}"], capture_output=True, text=True,
+                             env={**os.environ, RUN_CONFIG_ENV: str(path)})
+    assert process.returncode == 0, process.stderr
+    assert process.stdout == ""
@@ -0,0 +1,102 @@
+import functools
+from pathlib import Path
+import numpy as np
+import pytest
+from mostcool.core import definitions
+from mostcool.core.controller import CONTROLLER_PUBS, Controller
+from mostcool.core.direct import DirectBus, DirectFederate, step_due
+from mostcool.core.federate import Pub, Sub
+
+
+@pytest.fixture(autouse=True)
+def no_timing_files(monkeypatch):
+    monkeypatch.setattr(definitions, "TIMING_ENABLED", False)
+
+
+def test_values_are_delivered_at_the_next_step():
+    bus = DirectBus()
+    followers = []
+    driver = DirectFederate("Driver", subscriptions=[Sub(name="follower/out")], publications=[Pub(name="driver/out")],
+                            bus=bus, on_time_granted=lambda granted_time: [follower() for follower in followers])
+    follower = DirectFederate("Follower", subscriptions=[Sub(name="driver/out")], publications=[Pub(name="follower/out")],
+                              bus=bus)
+    seen = []
+
+    def step_follower():
+        follower.request_time()
+        follower.read_all()
+        seen.append((follower.granted_time, follower.sub_values[0]))
+        follower.publish_all([follower.granted_time])
+
+    followers.append(step_follower)
+    for _ in range(3):
+        driver.request_time()
+        driver.read_all()
+        driver.publish_all([driver.granted_time * 10])
+
+    # Like lockstep HELICS, each federate sees the value published at the previous step
+    assert seen == [(600, 0.0), (1200, 6000.0), (1800, 12000.0)]
+    assert driver.granted_time == 1800 and driver.sub_values[0] == 1200
+
+
+def test_controller_on_direct_bus(monkeypatch):
+    monkeypatch.setattr(definitions, "CONTROL_OPTION", definitions.CONTROL_OPTIONS.CHANGE_LIQUID_COOLING)
+    bus = DirectBus()
+    controller = Controller(federate_factory=functools.partial(DirectFederate, bus=bus))
+    controller.advance()
+    bus.deliver()
+    names = [f'{pub["Name"]}' for pub in CONTROLLER_PUBS]
+    assert [bus.read(name)[0] for name in names] == [-200000.0, 0.0]
+
+
+def test_thermal_federate_steps_on_direct_bus(monkeypatch, tmp_path):
+    import mostcool.thermal.server_federate as server_federate
+    from mostcool.thermal.rom import ThermalROM
+
+    DATA_DIR = Path(__file__).parents[2] / "thermal" / "data"
+    coefficients = np.loadtxt(DATA_DIR / "coeff.csv", delimiter=",")
+    parameter_array = np.loadtxt(DATA_DIR / "parameter_array.csv", delimiter=",")
+    modes = np.full((50, coefficients.shape[1]), 1e-4)
+    modes[:, 0] = -2.5e-4
+    monkeypatch.setattr(server_federate.ThermalROM, "from_files",
+                        classmethod(lambda cls, **kwargs: ThermalROM(parameter_array, coefficients, pod_modes=modes)))
+
+    bus = DirectBus()
+    # No server layout in tmp_path, the uniform layout is used
+    thermal = server_federate.Server_thermal_federate(federate_factory=functools.partial(DirectFederate, bus=bus),
+                                                      output_dir=str(tmp_path))
+    thermal.open_recorders()
+    thermal.step()
+    bus.publish("Data Center CPU Loading Schedule/Schedule Value", 0.5)
+    bus.publish("East Air Loop Outlet Node/System Node Temperature", 18.0)
+    bus.deliver()
+    thermal.advance()
+    bus.deliver()
+    thermal.finalize()
+
+    assert thermal.server_federate.granted_time == 600
+    supply_name = thermal.supply_approach_temperature.name
+    assert bus.read(supply_name)[0] == pytest.approx(thermal.supply_approach_temperature.value)
+    assert (tmp_path / "time_series_data.csv").read_text().count("\n") == 3
+
+
+def test_slower_federate_values_hold(monkeypatch):
+    monkeypatch.setattr(definitions, "FEDERATE_PERIODS", {"Driver": 600, "Follower": 1800})
+    bus = DirectBus()
+    driver = DirectFederate("Driver", subscriptions=[Sub(name="follower/out")], bus=bus,
+                            on_time_granted=lambda granted_time: step_due(follower, granted_time, 7200) and step_follower())
+    follower = DirectFederate("Follower", publications=[Pub(name="follower/out")], bus=bus)
+    follower_times, received = [], []
+
+    def step_follower():
+        follower.request_time()
+        follower_times.append(follower.granted_time)
+        follower.publish_all([follower.granted_time])
+
+    for _ in range(6):
+        driver.request_time()
+        received.append(driver.read_all()[0])
+
+    assert follower.time_interval_seconds == 1800 and follower_times == [1800, 3600]
+    # The follower's value is delivered at the next driver step and holds until its next update
+    assert received == [0.0, 0.0, 0.0, 1800.0, 1800.0, 1800.0]
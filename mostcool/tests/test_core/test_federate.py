@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+from mostcool.core.federate import Pub, Sub, bind_signals, validate_periods
+
+
+def test_bound_signals_share_one_array():
+    subs = [Sub(name="a"), Sub(name="b", value=2.0)]
+    values, bindings = bind_signals(subs)
+    np.testing.assert_array_equal(values, [0.0, 2.0])
+    assert bindings["b"] is subs[1] and subs[1].index == 1
+
+    values[:] = [3.0, 4.0]
+    assert (subs[0].value, subs[1].value) == (3.0, 4.0)
+    bindings["a"].value = 5.0
+    assert values[0] == 5.0
+
+
+def test_unbound_signal_and_slots():
+    pub = Pub(name="p", unit="C")
+    assert pub.value is None
+    pub.value = 1.5
+    assert pub.value == 1.5
+    with pytest.raises(AttributeError):
+        pub.extra = 1
+
+
+def test_validate_periods():
+    validate_periods({"EnergyPlus": 600, "Server_1": 1800, "Controller": 3600})
+    with pytest.raises(ValueError) as error:
+        validate_periods({"EnergyPlus": 1200, "Server_1": 900, "Controller": 4200})
+    message = str(error.value)
+    assert "EnergyPlus steps at its timestep" in message
+    assert "Server_1 (900 s) is not a multiple" in message
+    assert "Controller (4200 s) does not divide a day" in message
+
+
+@pytest.fixture
+def inproc_broker(request, monkeypatch):
+    """A broker of its own for the two federates of a test, run as threads on inproc cores."""
+    h = pytest.importorskip("helics")
+    from mostcool.core import definitions
+
+    name = f"broker_{request.node.name}"
+    monkeypatch.setattr(definitions, "TIMING_ENABLED", False)
+    monkeypatch.setattr(definitions, "HELICS_CORE_TYPE", "inproc")
+    monkeypatch.setattr(definitions, "HELICS_BROKER_ADDRESS", name)
+    broker = h.helicsCreateBroker("inproc", name, "-f 2 --loglevel=error")
+    yield broker
+    h.helicsBrokerWaitForDisconnect(broker, 10000)
+    h.helicsBrokerDisconnect(broker)
+    h.helicsBrokerFree(broker)
+
+
+def test_event_driven_federates_exchange_changes_only(inproc_broker):
+    import threading
+    from mostcool.core.federate import mostcool_federate
+
+    published, received = [], []
+
+    def publisher():
+        fed = mostcool_federate("Publisher", publications=[Pub(name="test/a", unit="C", tolerance=0.1)], event_driven=True)
+        pub = fed.publication("test/a")
+        while fed.granted_time < 6000:
+            pub.value = 1.0 if fed.granted_time < 3000 else 1.05 if fed.granted_time < 4200 else 2.0
+            fed.publish_all()
+            published.append(fed.published_values[0])
+            fed.request_time()
+        fed.destroy_federate()
+
+    def subscriber():
+        fed = mostcool_federate("Subscriber", subscriptions=[Sub(name="test/a", unit="C")], event_driven=True,
+                                wait_for_updates=True)
+        while fed.granted_time < 6000:
+            fed.read_all()
+            received.append((fed.granted_time, fed.updated[0], fed.sub_values[0]))
+            fed.request_time()
+        fed.destroy_federate()
+
+    threads = [threading.Thread(target=publisher), threading.Thread(target=subscriber)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    # The change below the tolerance is not sent, and the subscriber is only granted times with an update
+    assert set(published) == {1.0, 2.0}
+    assert received == [(0, False, 0.0), (600, True, 1.0), (4200, True, 2.0)]
+
+
+def test_bundled_federates_unpack_by_name(inproc_broker):
+    import threading
+    from mostcool.core.federate import mostcool_federate
+
+    received = []
+    done = threading.Event()
+
+    def publisher():
+        pubs = [Pub(name=f"test/{name}") for name in "abc"]
+        fed = mostcool_federate("Bundler", publications=pubs, bundled=True)
+        for step in range(3):
+            fed.publish_all([step, 10 * step, 100 * step])
+            fed.request_time()
+        # Stay connected until the subscriber read every step
+        done.wait(timeout=60)
+        fed.destroy_federate()
+
+    def subscriber():
+        subs = [Sub(name=name) for name in ["test/c", "test/missing", "test/a"]]
+        fed = mostcool_federate("Unbundler", subscriptions=subs, bundled=True, bundle_sources=["Bundler"])
+        for step in range(3):
+            fed.request_time()
+            received.append((fed.read_all().tolist(), fed.updated.tolist()))
+        done.set()
+        fed.destroy_federate()
+
+    threads = [threading.Thread(target=publisher), threading.Thread(target=subscriber)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    # One vector per step, unpacked in the order of the subscriptions, names missing from the schema stay stale
+    assert received == [([100.0 * step, 0.0, 1.0 * step], [True, False, True]) for step in range(3)]
@@ -1,7 +1,7 @@
 import pytest
 from unittest import mock
 from tkinter import Tk, Canvas, Button
-from mostcool.core.gui import MyApp, ImageViewer  
+from mostcool.core.gui import PLOT_PLACEHOLDER, MyApp, ImageViewer, plotted_output_variables
 
 @pytest.fixture
 def app():
@@ -82,3 +82,18 @@ def test_open_paraview(app):
         app.paraview_server_temp_in.set("25")
         app.open_paraview()
         mock_predict.assert_called_once_with(velocity=5, CPU_load_fraction=0.8, inlet_server_temperature=25)
+
+def test_plotted_output_variables():
+    """Only a real plotted variable prunes the outputs, the placeholder of a first run reports all of them."""
+    column = "DataCenter ZN:Zone Air Temperature [C](TimeStep)"
+    assert plotted_output_variables(True, PLOT_PLACEHOLDER) is None
+    assert plotted_output_variables(False, column) is None
+    assert plotted_output_variables(True, column) == ["DataCenter ZN/Zone Air Temperature"]
+
+def test_only_plotted_outputs_enabled_after_first_run(app):
+    """The option stays disabled until the plot menu holds real variables."""
+    assert str(app.only_plotted_outputs_button["state"]) == "disabled"
+    app.results = {"A:B [C](TimeStep)": [1.0]}
+    with mock.patch.object(app, "update_plot"):
+        app.update_option_menu(app.y_axis_drop_down_menu, list(app.results), True)
+    assert str(app.only_plotted_outputs_button["state"]) == "normal"
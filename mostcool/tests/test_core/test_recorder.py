@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from mostcool.core.recorder import HDF5Recorder, TimeSeriesRecorder
+
+
+def test_recorder_flushes_in_chunks(tmp_path):
+    path = tmp_path / "series.csv"
+    recorder = TimeSeriesRecorder(str(path), channels=["a", "b"], n_steps=10, chunk_size=4)
+    assert recorder.buffer.shape == (4, 3)
+    for step in range(6):
+        recorder.record(step * 600, step, step * 0.5)
+    # One full chunk is on disk while the remaining rows are still buffered
+    assert recorder.rows_written == 4
+    assert len(pd.read_csv(path)) == 4
+    recorder.close()
+    series = pd.read_csv(path, index_col="Time")
+    assert list(series.columns) == ["a", "b"]
+    np.testing.assert_allclose(series["b"].values, np.arange(6) * 0.5)
+    np.testing.assert_array_equal(series.index, np.arange(6) * 600)
+
+
+def test_recorder_buffer_sized_from_short_run(tmp_path):
+    with TimeSeriesRecorder(str(tmp_path / "series.csv"), channels=["a"], n_steps=3) as recorder:
+        assert recorder.buffer.shape == (3, 2)
+        recorder.record(0, 1.0)
+    assert len(pd.read_csv(tmp_path / "series.csv")) == 1
+
+
+def test_recorder_resumes_from_checkpoint(tmp_path):
+    path = str(tmp_path / "series.csv")
+    recorder = TimeSeriesRecorder(path, channels=["a"], n_steps=10, chunk_size=4)
+    for step in range(3):
+        recorder.record(step * 600, step)
+    rows = recorder.checkpoint()
+    # Rows recorded after the checkpoint are lost with the failed run
+    for step in range(3, 6):
+        recorder.record(step * 600, -1.0)
+    recorder.close()
+
+    with TimeSeriesRecorder(path, channels=["a"], n_steps=10, chunk_size=4, resume_rows=rows) as resumed:
+        for step in range(3, 5):
+            resumed.record(step * 600, step)
+    series = pd.read_csv(path, index_col="Time")
+    np.testing.assert_array_equal(series.index, np.arange(5) * 600)
+    np.testing.assert_allclose(series["a"].values, np.arange(5))
+
+
+def test_hdf5_recorder_streams_columns(tmp_path):
+    pytest.importorskip("h5py")
+    path = str(tmp_path / "results.h5")
+    recorder = HDF5Recorder(path, channels=["HVAC Energy", "CPU load"], n_steps=1000, chunk_size=4)
+    assert recorder.buffer.shape == (4, 3)
+    for step in range(6):
+        recorder.record(step * 600, step * 10.0, 0.5)
+    # The flushed chunk is readable while the run is still going
+    assert HDF5Recorder.read(path).shape == (4, 2)
+    rows = recorder.checkpoint()
+    recorder.record(3600, -1.0, -1.0)
+    recorder.close()
+
+    with HDF5Recorder(path, channels=["HVAC Energy", "CPU load"], n_steps=1000, chunk_size=4, resume_rows=rows) as resumed:
+        resumed.record(3600, 60.0, 0.5)
+    results = HDF5Recorder.read(path)
+    np.testing.assert_array_equal(results.index, np.arange(7) * 600)
+    np.testing.assert_allclose(results["HVAC Energy"], np.arange(7) * 10.0)
+    assert list(HDF5Recorder.read(path, channels=["CPU load"]).columns) == ["CPU load"]
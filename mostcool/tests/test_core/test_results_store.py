@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from mostcool.core.results_store import ResultStore, parse_energyplus_times, write_results_store
+
+
+HVAC = "Whole Building:Facility Total HVAC Electricity Demand Rate [W]"
+FLOW = "EAST ZONE SUPPLY FAN:Fan Air Mass Flow Rate [kg/s]"
+
+
+def write_outputs(directory):
+    # EnergyPlus writes the end of a day as 24:00:00 of that day, the first row is left out of the store
+    pd.DataFrame({"Date/Time": [" 06/30  23:50:00", " 06/30  24:00:00", " 07/01  00:10:00", " 07/01  00:20:00", " 07/01  00:30:00"],
+                  f"{HVAC}(TimeStep)": [1.0, 2.0, 3.0, 4.0, 5.0],
+                  f"{FLOW}(TimeStep)": [2.0, 3.0, 4.0, 5.0, 6.0]}).to_csv(directory / "eplusout.csv", index=False)
+    # The thermal model steps every 20 minutes
+    pd.DataFrame({"Time": [0, 1200], "CPU_temp_max": [50.0, 60.0], "T_out_server": [30.0, 31.0]}).to_csv(
+        directory / "time_series_data.csv", index=False)
+
+
+def test_energyplus_times_roll_midnight_to_the_next_day():
+    times = parse_energyplus_times([" 06/30  23:50:00", " 06/30  24:00:00", " 12/31  24:00:00"])
+    assert list(times) == [pd.Timestamp("1900-06-30 23:50"), pd.Timestamp("1900-07-01 00:00"), pd.Timestamp("1901-01-01 00:00")]
+
+
+def test_store_of_the_csv_results(tmp_path):
+    write_outputs(tmp_path)
+    path = write_results_store(str(tmp_path / "eplusout.csv"), str(tmp_path / "results.h5"),
+                               str(tmp_path / "time_series_data.csv"), chunk_rows=3)
+
+    store = ResultStore(path)
+    assert len(store) == 4
+    assert list(store.columns) == [HVAC, FLOW, "Maximum CPU Temperature [C]", "Server Outlet Temperature [C]"]
+    assert store.units[FLOW] == "kg/s"
+    # Nothing but the schema is read until a column is used
+    assert store._loaded == {}
+    assert list(store.index) == list(pd.date_range("1900-07-01 00:00", periods=4, freq="10min"))
+    # Row i is the EnergyPlus timestep after thermal row i, the 20 minute thermal values hold for two timesteps
+    np.testing.assert_allclose(store["Maximum CPU Temperature [C]"], [50.0, 60.0, 60.0, 60.0])
+    np.testing.assert_allclose(store[[HVAC, FLOW]], [[2.0, 3.0], [3.0, 4.0], [4.0, 5.0], [5.0, 6.0]])
+    assert set(store._loaded) == {"Maximum CPU Temperature [C]", HVAC, FLOW}
+    assert "Server Outlet Temperature [C]" in store
@@ -0,0 +1,31 @@
+import json
+import os
+import pytest
+from mostcool.core.runner_config import build_runner_config, write_runner_config
+
+
+def test_runner_starts_a_broker_for_the_core_type(tmp_path):
+    path = write_runner_config(str(tmp_path / "runner.json"), run_config={
+        "helics_core_type": "tcp",
+        "helics_log_level": "helics_log_level_summary",
+        "helics_broker_address": "127.0.0.1:23700",
+    })
+    runner = json.loads(open(path).read())
+    assert runner["broker"] is False
+    broker, *federates = runner["federates"]
+    assert broker["exec"] == ("helics_broker -f 3 --coretype=tcp --loglevel=summary "
+                              "--local_interface=127.0.0.1 --port=23700")
+    assert [federate["name"] for federate in federates] == ["EnergyPlus_federate", "Controller_federate", "Server_federate"]
+    # The generated file lives elsewhere than the template, the federate directories stay where they were
+    assert all(os.path.isabs(federate["directory"]) for federate in federates)
+
+
+def test_runner_defaults_and_validation():
+    broker = build_runner_config({})["federates"][0]
+    assert broker["exec"] == "helics_broker -f 3 --coretype=zmq --loglevel=warning"
+    with pytest.raises(ValueError, match="direct coupling"):
+        build_runner_config({"helics_core_type": "inproc"})
+    with pytest.raises(ValueError, match="core type"):
+        build_runner_config({"helics_core_type": "mpi"})
+    with pytest.raises(ValueError, match="log level"):
+        build_runner_config({"helics_log_level": "verbose"})
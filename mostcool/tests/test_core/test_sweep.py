@@ -0,0 +1,36 @@
+import os
+import pandas as pd
+import pytest
+import mostcool.core.sweep as sweep
+
+
+def test_case_configs_are_isolated(tmp_path):
+    cases = sweep.expand_grid({"datacenter_location": ["Chicago, IL", "Tampa, FL"],
+                               "control_option": ["CHANGE_IT_LOAD", "CHANGE_SUPPLY_DELTA_T", "CHANGE_LIQUID_COOLING"]})
+    assert len(cases) == 6
+    assert cases[1] == {"datacenter_location": "Chicago, IL", "control_option": "CHANGE_SUPPLY_DELTA_T"}
+    run_configs = [sweep.case_config(parameters, index, str(tmp_path)) for index, parameters in enumerate(cases)]
+    assert len({run_config["output_dir"] for run_config in run_configs}) == 6
+    assert len({run_config["helics_broker_address"] for run_config in run_configs}) == 6
+    assert run_configs[3]["epw_path"].endswith("USA_FL_Tampa.Intl.AP.722110_TMY3.epw")
+    # No broker port is needed without a network core
+    assert "helics_broker_address" not in sweep.case_config({}, 0, str(tmp_path), {"helics_core_type": "ipc"})
+    with pytest.raises(ValueError, match="location"):
+        sweep.case_config({"datacenter_location": "Denver, CO"}, 0, str(tmp_path))
+
+
+def test_sweep_merges_the_finished_cases(tmp_path, monkeypatch):
+    def run_case(run_config, engine):
+        if run_config["datacenter_location"] == "Tampa, FL":
+            raise RuntimeError("EnergyPlus failed")
+        times = pd.date_range("1900-01-01 00:10", periods=3, freq="10min", name="Date/Time")
+        return pd.DataFrame({"HVAC Energy": [1.0, 2.0, 3.0]}, index=times)
+
+    monkeypatch.setattr(sweep, "run_case", run_case)
+    merged, case_table = sweep.run_sweep({"datacenter_location": ["Chicago, IL", "Tampa, FL"], "thermal_rom_mode": ["rbf", "table"]},
+                                         str(tmp_path), max_workers=2)
+    assert list(merged.index.names) == ["datacenter_location", "thermal_rom_mode", "Date/Time"]
+    assert len(merged) == 6
+    assert merged.xs(("Chicago, IL", "table"))["HVAC Energy"].tolist() == [1.0, 2.0, 3.0]
+    assert case_table["error"].notna().tolist() == [False, False, True, True]
+    assert os.path.exists(tmp_path / "sweep_results.csv") and os.path.exists(tmp_path / "sweep_cases.csv")
@@ -0,0 +1,27 @@
+import json
+import time
+from mostcool.core.timing import StepTimer, merge_traces
+
+
+def test_timers_merge_into_one_trace(tmp_path):
+    energy, thermal = StepTimer("EnergyPlus"), StepTimer("Server_1")
+    for step in range(3):
+        with energy.section("request_time", step * 600):
+            time.sleep(0.001)
+        with thermal.section("thermal_model", step * 600):
+            time.sleep(0.002)
+    energy.write(tmp_path)
+    thermal.write(tmp_path)
+    StepTimer("Disabled", enabled=False).write(tmp_path)
+    assert thermal.summary().loc["thermal_model", "count"] == 3
+
+    merge_traces(tmp_path)
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    names = {event["tid"]: event["args"]["name"] for event in events if event["ph"] == "M"}
+    assert sorted(names.values()) == ["EnergyPlus", "Server_1"]
+    spans = [event for event in events if event["ph"] == "X"]
+    assert len(spans) == 6 and min(event["ts"] for event in spans) == 0
+    # Both federates are placed on the same wall-clock timeline
+    thermal_spans = [event for event in spans if names[event["tid"]] == "Server_1"]
+    assert all(event["dur"] >= 2000 for event in thermal_spans)
+    assert [event["args"]["sim_time"] for event in thermal_spans] == [0, 600, 1200]
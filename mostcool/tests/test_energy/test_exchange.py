@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+from mostcool.core.federate import Pub, Sub
+from mostcool.energy.exchange import ExchangeBindings, MissingHandlesError
+
+
+class FakeExchange:
+    """Stands in for api.exchange, with a handle per known name and counters of the lookups."""
+
+    def __init__(self, actuators, variables):
+        self.actuators = actuators
+        self.variables = variables
+        self.ready = False
+        self.lookups = 0
+        self.actuator_values = {}
+
+    def api_data_fully_ready(self, state):
+        return self.ready
+
+    def get_actuator_handle(self, state, component_type, control_type, actuator_key):
+        self.lookups += 1
+        return self.actuators.get((component_type, control_type, actuator_key), -1)
+
+    def get_variable_handle(self, state, variable_name, variable_key):
+        self.lookups += 1
+        return self.variables.get((variable_name, variable_key), -1)
+
+    def set_actuator_value(self, state, handle, value):
+        self.actuator_values[handle] = value
+
+    def get_variable_value(self, state, handle):
+        return handle * 10.0
+
+
+def make_bindings(actuator_key="Supply"):
+    exchange = FakeExchange({("Schedule:Constant", "Schedule Value", "Supply"): 1}, {("Temperature", "Node"): 2})
+    api = SimpleNamespace(exchange=exchange, runtime=SimpleNamespace(stopped=False))
+    api.runtime.stop_simulation = lambda state: setattr(api.runtime, "stopped", True)
+    actuators = [SimpleNamespace(component_type="Schedule:Constant", control_type="Schedule Value",
+                                 actuator_key=actuator_key, sub_instance=Sub(name="a", value=4.0))]
+    sensors = [SimpleNamespace(variable_name="Temperature", variable_key="Node", pub_instance=Pub(name="s"))]
+    return api, ExchangeBindings(api, actuators, sensors)
+
+
+def test_handles_resolved_once():
+    api, bindings = make_bindings()
+    assert not bindings.resolve(None)
+    api.exchange.ready = True
+    assert bindings.resolve(None) and bindings.resolved
+    for _ in range(3):
+        bindings.set_actuators(None)
+        bindings.get_sensors(None)
+    assert api.exchange.lookups == 2
+    assert api.exchange.actuator_values == {1: 4.0}
+    assert bindings.sensors[0].pub_instance.value == 20.0
+
+
+def test_missing_handles_stop_the_simulation():
+    api, bindings = make_bindings(actuator_key="Unknown")
+    api.exchange.ready = True
+    assert not bindings.resolve(None)
+    assert isinstance(bindings.error, MissingHandlesError)
+    assert "Schedule:Constant/Schedule Value/Unknown" in str(bindings.error)
+    assert api.runtime.stopped and bindings.failed and not bindings.resolved
+    # Later timesteps neither look the handles up again nor stop the simulation again
+    lookups = api.exchange.lookups
+    api.runtime.stopped = False
+    assert not bindings.resolve(None)
+    assert api.exchange.lookups == lookups and not api.runtime.stopped
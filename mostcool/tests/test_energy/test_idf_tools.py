@@ -0,0 +1,33 @@
+import os
+from mostcool.energy.idf_tools import idf_objects, output_variable_spec, prune_output_variables, required_output_variables
+
+
+IDF_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "energy", "data", "2ZoneDataCenterCRAHandplant.idf")
+
+
+def output_variables(path):
+    with open(path, newline="") as f:
+        lines = f.read().splitlines(keepends=True)
+    return [fields[1:4] for _, _, fields in idf_objects(lines) if fields[0].lower() == "output:variable"]
+
+
+def test_prune_output_variables(tmp_path):
+    plotted = output_variable_spec("EAST ZONE:Zone Air Temperature [C](TimeStep)")
+    assert plotted == "EAST ZONE/Zone Air Temperature"
+    assert output_variable_spec("Maximum CPU Temperature [C]") is None
+
+    original = output_variables(IDF_PATH)
+    keep = required_output_variables([plotted])
+    pruned = output_variables(prune_output_variables(IDF_PATH, keep, str(tmp_path / "pruned.idf")))
+    assert 0 < len(pruned) < len(original)
+    assert all(name.lower() in {spec.rpartition("/")[2].lower() for spec in keep} for _, name, _ in pruned)
+    assert ["East Zone", "Zone Air Temperature", "Timestep"] in pruned  # keys match case-insensitively
+
+    hourly = output_variables(prune_output_variables(IDF_PATH, keep, str(tmp_path / "hourly.idf"), other_frequency="Hourly"))
+    assert len(hourly) == len(original)
+    assert sum(frequency == "Timestep" for _, _, frequency in hourly) == len(pruned)
+    # The rest of the model is left as it was, line endings included
+    with open(IDF_PATH, newline="") as f, open(tmp_path / "hourly.idf", newline="") as g:
+        original_lines, hourly_lines = f.read().splitlines(keepends=True), g.read().splitlines(keepends=True)
+    assert hourly_lines[:100] == original_lines[:100]
+    assert all(line.endswith("\r\n") for line in hourly_lines) == all(line.endswith("\r\n") for line in original_lines)
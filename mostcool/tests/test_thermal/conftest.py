@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parents[2] / "thermal" / "data"
+
+
+@pytest.fixture
+def training_data():
+    """Training samples shipped with the repo and synthetic POD modes (modes.csv is downloaded separately)."""
+    coefficients = np.loadtxt(DATA_DIR / "coeff.csv", delimiter=",")
+    parameter_array = np.loadtxt(DATA_DIR / "parameter_array.csv", delimiter=",")
+    rng = np.random.default_rng(0)
+    # First mode carries the ~300 K mean field, the others a few K of variation
+    modes = 1e-3 * rng.normal(size=(500, coefficients.shape[1]))
+    modes[:, 0] = -2.5e-4 * (1 + 0.01 * rng.random(500))
+    return parameter_array, coefficients, modes
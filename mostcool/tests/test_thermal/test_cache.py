@@ -0,0 +1,36 @@
+import numpy as np
+from mostcool.thermal.cache import PredictionCache
+from mostcool.thermal.rom import ThermalROM
+
+
+def test_cache_matches_rom_and_counts(training_data):
+    parameter_array, coefficients, modes = training_data
+    rom = ThermalROM(parameter_array, coefficients, pod_modes=modes)
+    cache = PredictionCache(rom)
+    velocity = np.array([6.0, 8.0, 8.0, 12.0])
+    CPU_load_fraction = np.array([0.6, 0.7, 0.7, 0.9])
+
+    expected = rom.predict(velocity, CPU_load_fraction, 27)
+    for actual, reference in zip(cache.predict(velocity, CPU_load_fraction, 27), expected):
+        np.testing.assert_allclose(actual, reference)
+    assert (cache.hits, cache.misses, len(cache)) == (0, 3, 3)
+
+    # The inlet temperature is applied exactly to cached values
+    np.testing.assert_allclose(cache.max_temperature(velocity, CPU_load_fraction, 22),
+                               rom.max_temperature(velocity, CPU_load_fraction, 22))
+    assert (cache.hits, cache.misses) == (3, 3)
+
+
+def test_quantization_and_eviction(training_data):
+    parameter_array, coefficients, modes = training_data
+    rom = ThermalROM(parameter_array, coefficients, pod_modes=modes)
+    cache = PredictionCache(rom, max_size=2, velocity_tolerance=0.1, CPU_load_fraction_tolerance=0.01)
+    first = cache.max_temperature(10.01, 0.801)
+    np.testing.assert_allclose(first, rom.max_temperature(10.0, 0.8))
+    np.testing.assert_allclose(cache.max_temperature(9.99, 0.799), first)
+    assert cache.stats()["hit_rate"] == 0.5
+
+    cache.max_temperature([7.0, 8.0], [0.6, 0.6])
+    assert len(cache) == 2
+    cache.max_temperature(10.0, 0.8)
+    assert cache.misses == 4
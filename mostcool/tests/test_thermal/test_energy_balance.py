@@ -0,0 +1,24 @@
+import numpy as np
+from mostcool.thermal import energy_balance
+
+
+def test_deltas_broadcast_over_arrays():
+    supply_temperature = np.array([18.0, 20.0])[:, np.newaxis]
+    velocity = np.array([5.0, 8.0, 12.0])
+    ite_load = np.array([0.6, 0.8])[:, np.newaxis]
+    outputs = energy_balance.data_center_temperature_deltas(supply_temperature, velocity, ite_load, 84)
+    assert [np.shape(output) for output in outputs] == [(2, 1), (2, 1), (2, 1), (2, 3), (3,)]
+    # Each element equals the scalar evaluation
+    scalar = energy_balance.data_center_temperature_deltas(20.0, 8.0, 0.8, 84)
+    np.testing.assert_allclose([output[1] for output in outputs[:3]], np.array(scalar[:3])[:, np.newaxis])
+    np.testing.assert_allclose(outputs[3][1, 1], scalar[3])
+    np.testing.assert_allclose(outputs[4][1], scalar[4])
+    np.testing.assert_allclose(scalar[4], energy_balance.server_fan_power(8.0) * 84)
+
+
+def test_zero_velocity_outlet_temperature():
+    T_out_server = energy_balance.server_outlet_temperature(30.0, np.array([0.0, 5.0]), np.array([1.0, 1.0]))
+    mass_flowrate = energy_balance.DENSITY * energy_balance.SERVER_INLET_AREA * 5.0
+    np.testing.assert_allclose(T_out_server[1], 30 + 1000 / (mass_flowrate * energy_balance.CP))
+    assert np.isfinite(T_out_server[0]) and T_out_server[0] > T_out_server[1]
+    assert energy_balance.server_fan_power(0.0) == 0
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from mostcool.thermal.layout import ServerLayout
+from mostcool.thermal.rom import ThermalROM
+from mostcool.thermal.server_federate import Server_thermal_federate
+
+
+def test_layout_from_csv(tmp_path):
+    path = tmp_path / "server_layout.csv"
+    path.write_text("zone,rack,inlet_velocity,load_share,inlet_temperature_offset\n"
+                    "East,E1,8,2,0\nEast,E1,9,1,-1\nWest,W1,10,1,-2\nWest,W2,12,0,0\n")
+    layout = ServerLayout.from_csv(path)
+    assert layout.num_servers == 4
+    np.testing.assert_allclose(layout.load_share, [2, 1, 1, 0])
+    np.testing.assert_allclose(layout.supply_temperature({"East": 18, "West": 20}), [18, 18, 20, 20])
+    np.testing.assert_allclose(layout.rack_maximum(np.array([50, 60, 55, 40])), [60, 55, 40])
+
+
+def test_layout_rejects_unknown_zone():
+    with pytest.raises(ValueError, match="Unknown zones"):
+        ServerLayout(zone=["North"], rack=["N1"], inlet_velocity=[8], load_share=[1], inlet_temperature_offset=[0])
+
+
+def test_uniform_layout_matches_single_server(training_data):
+    parameter_array, coefficients, modes = training_data
+    thermal_model = Server_thermal_federate.__new__(Server_thermal_federate)
+    thermal_model.rom = ThermalROM(parameter_array, coefficients, pod_modes=modes)
+    thermal_model.layout = ServerLayout.uniform(num_servers=84, inlet_velocity=8)
+    _, _, inlet_server_temperature, CPU_temp_max, T_out_server = thermal_model.evaluate_layout({"East": 18, "West": 18}, 0.8)
+    assert CPU_temp_max.shape == (84,)
+    _, _, expected_inlet, CPU_Load_fraction, _ = thermal_model.data_center_temperature_deltas(18, 8, 0.8, 84)
+    expected_max, expected_out = thermal_model.online_prediction(8, CPU_Load_fraction, expected_inlet)
+    np.testing.assert_allclose(CPU_temp_max, expected_max)
+    np.testing.assert_allclose(T_out_server, expected_out)
+    np.testing.assert_allclose(thermal_model.layout.rack_maximum(CPU_temp_max), [expected_max, expected_max])
+
+
+@pytest.mark.parametrize("load_share", [[0, 0], [2, -1], [1, float("nan")]])
+def test_layout_rejects_invalid_load_shares(load_share):
+    with pytest.raises(ValueError, match="load shares"):
+        ServerLayout(zone=["East"] * 2, rack=["E1"] * 2, inlet_velocity=[8, 8], load_share=load_share,
+                     inlet_temperature_offset=[0, 0])
@@ -0,0 +1,27 @@
+import numpy as np
+from mostcool.thermal.mode_store import convert_modes, find_modes, load_modes
+
+
+def test_convert_and_memory_map(tmp_path):
+    modes = np.random.default_rng(0).normal(size=(1234, 6))
+    csv_path = str(tmp_path / "modes.csv")
+    np.savetxt(csv_path, modes, delimiter=",")
+    assert find_modes(str(tmp_path)) == csv_path
+
+    npy_path = convert_modes(csv_path, chunk_rows=100)
+    assert find_modes(str(tmp_path)) == npy_path
+    loaded = load_modes(npy_path)
+    assert isinstance(loaded, np.memmap)
+    assert not loaded.flags.writeable
+    np.testing.assert_allclose(loaded, modes)
+
+
+def test_float32_store(tmp_path):
+    modes = np.random.default_rng(0).normal(size=(50, 6))
+    csv_path = str(tmp_path / "modes.csv")
+    np.savetxt(csv_path, modes, delimiter=",")
+    npy_path = convert_modes(csv_path, dtype="float32")
+    loaded = load_modes(npy_path, dtype="float32")
+    assert isinstance(loaded, np.memmap) and loaded.dtype == np.float32
+    assert load_modes(npy_path, dtype="float64").dtype == np.float64
+    np.testing.assert_allclose(loaded, modes, rtol=1e-6)
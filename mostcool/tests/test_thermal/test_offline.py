@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from mostcool.thermal.layout import ServerLayout
+from mostcool.thermal.offline import run_offline
+from mostcool.thermal.rom import ThermalROM
+from mostcool.thermal.server_federate import RACK_TIME_SERIES_NAME, Server_thermal_federate
+
+
+def test_offline_matches_federate_steps(tmp_path, training_data):
+    parameter_array, coefficients, modes = training_data
+    rom = ThermalROM(parameter_array, coefficients, pod_modes=modes)
+    layout = ServerLayout(zone=["East", "East", "West"], rack=["E1", "E2", "W1"], inlet_velocity=[6, 8, 10],
+                          load_share=[1, 1.5, 0.5], inlet_temperature_offset=[0, -1, -2])
+    eplusout = pd.DataFrame({
+        "Date/Time": [" 07/01  00:10:00", " 07/01  00:20:00", " 07/01  00:30:00"],
+        "EAST AIR LOOP OUTLET NODE:System Node Temperature [C](TimeStep)": [18.0, 19.5, 21.0],
+        "EAST ZONE SUPPLY FAN:Fan Air Mass Flow Rate [kg/s](TimeStep)": [5.0, 5.0, 5.0],
+        "DATA CENTER CPU LOADING SCHEDULE:Schedule Value [](TimeStep)": [0.6, 0.8, 1.0],
+    })
+    sensor_path = tmp_path / "eplusout.csv"
+    eplusout.to_csv(sensor_path, index=False)
+
+    time_series, rack_temperatures = run_offline(str(sensor_path), str(tmp_path / "time_series_data.csv"),
+                                                 layout=layout, rom=rom)
+    # The federate evaluates each step with the values published at the previous one
+    assert list(time_series.index) == [600, 1200, 1800]
+    assert (tmp_path / RACK_TIME_SERIES_NAME).exists()
+
+    thermal_model = Server_thermal_federate.__new__(Server_thermal_federate)
+    thermal_model.rom = rom
+    thermal_model.layout = layout
+    for step, (Ts, cpu_loading) in enumerate([(18.0, 0.6), (19.5, 0.8), (21.0, 1.0)]):
+        supply_approach_temp, _, _, CPU_temp_max, _ = thermal_model.evaluate_layout({"East": Ts, "West": Ts}, cpu_loading)
+        np.testing.assert_allclose(time_series["CPU_temp_max"].iloc[step], CPU_temp_max.max())
+        np.testing.assert_allclose(time_series["supply_approach_temperature"].iloc[step], supply_approach_temp)
+        np.testing.assert_allclose(rack_temperatures.iloc[step], layout.rack_maximum(CPU_temp_max))
+
+
+def test_recorded_trace_columns(tmp_path, training_data):
+    parameter_array, coefficients, modes = training_data
+    trace = pd.DataFrame({
+        "East Air Loop Outlet Node/System Node Temperature": [18.0, 20.0],
+        "Data Center CPU Loading Schedule/Schedule Value": [0.7, 0.9],
+    })
+    trace.to_csv(tmp_path / "trace.csv", index=False)
+    time_series, _ = run_offline(str(tmp_path / "trace.csv"), layout=ServerLayout.uniform(inlet_velocity=8),
+                                 rom=ThermalROM(parameter_array, coefficients, pod_modes=modes), timestep_seconds=60,
+                                 lag_steps=0)
+    assert list(time_series.index) == [0, 60]
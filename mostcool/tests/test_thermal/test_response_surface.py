@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from mostcool.thermal.response_surface import ResponseSurface
+from mostcool.thermal.rom import ThermalROM
+
+
+@pytest.mark.parametrize("interpolation", ["bilinear", "bicubic"])
+def test_table_within_reported_error(training_data, interpolation):
+    parameter_array, coefficients, modes = training_data
+    rom = ThermalROM(parameter_array, coefficients, pod_modes=modes)
+    surface = ResponseSurface(rom, interpolation=interpolation)
+    assert 0 < surface.max_error < 5.0
+
+    rng = np.random.default_rng(2)
+    velocity = rng.uniform(6, 15, 100)
+    CPU_load_fraction = rng.uniform(0.5, 1, 100)
+    CPU_temp_max, T_out_server = surface.predict(velocity, CPU_load_fraction, 25)
+    expected_max, expected_out = rom.predict(velocity, CPU_load_fraction, 25)
+    # Random points are not the worst case, so allow a small margin over the error measured at cell centers
+    assert np.max(np.abs(CPU_temp_max - expected_max)) <= 2 * surface.max_error
+    np.testing.assert_allclose(T_out_server, expected_out)
+
+
+def test_outside_envelope_uses_rom(training_data):
+    parameter_array, coefficients, modes = training_data
+    rom = ThermalROM(parameter_array, coefficients, pod_modes=modes)
+    surface = ResponseSurface(rom, shape=(11, 6))
+    np.testing.assert_allclose(surface.max_temperature([5, 10], [0.8, 1.2]), rom.max_temperature([5, 10], [0.8, 1.2]))
+    np.testing.assert_allclose(surface.predict_coefficients(5, 0.4), rom.predict_coefficients(5, 0.4))
+    assert surface.predict_state(10, 0.7).shape == (modes.shape[0], 1)
+
+
+def test_table_cached_with_the_surrogate(tmp_path, training_data, monkeypatch, caplog):
+    parameter_array, coefficients, modes = training_data
+    np.savetxt(tmp_path / "coeff.csv", coefficients, delimiter=",")
+    np.savetxt(tmp_path / "parameter_array.csv", parameter_array, delimiter=",")
+    np.save(tmp_path / "modes.npy", modes)
+    # Tabulated down to the 5 m/s of the default layout, whose lookups then use the table
+    surface = ResponseSurface(ThermalROM.from_files(str(tmp_path)), velocity_range=(5, 15), shape=(21, 11))
+    rom = ThermalROM.from_files(str(tmp_path))
+    monkeypatch.setattr(ThermalROM, "max_temperature", lambda *args, **kwargs: pytest.fail("the table was rebuilt"))
+    monkeypatch.setattr(ThermalROM, "predict_coefficients", lambda *args, **kwargs: pytest.fail("the table was rebuilt"))
+    reloaded = ResponseSurface(rom, velocity_range=(5, 15), shape=(21, 11))
+    assert reloaded.max_error == surface.max_error
+    with caplog.at_level("WARNING"):
+        np.testing.assert_allclose(reloaded.max_temperature(5, 0.8), surface.max_temperature(5, 0.8))
+    assert "outside" not in caplog.text
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from scipy.interpolate import Rbf
+from sklearn.preprocessing import MinMaxScaler
+from mostcool.thermal.rom import ThermalROM, covering_range
+
+
+def reference_prediction(parameter_array, coefficients, modes, velocity, CPU_load_fraction, inlet_server_temperature):
+    """The original one-RBF-per-coefficient implementation."""
+    param_scaler = MinMaxScaler().fit(parameter_array)
+    coeff_scaler = MinMaxScaler().fit(coefficients)
+    scaled_params = param_scaler.transform(parameter_array)
+    scaled_coeffs = coeff_scaler.transform(coefficients)
+    rbf_models = [Rbf(scaled_params[:, 0], scaled_params[:, 1], scaled_coeffs[:, i], function="multiquadric")
+                  for i in range(scaled_coeffs.shape[1])]
+    normalized = param_scaler.transform(np.array([[velocity, CPU_load_fraction]]))
+    predicted = np.array([model(normalized[:, 0], normalized[:, 1]) for model in rbf_models]).T
+    predicted_state = np.dot(modes, coeff_scaler.inverse_transform(predicted).T) - 273.15
+    return np.max(predicted_state - (30 - inlet_server_temperature))
+
+
+def test_batch_matches_per_coefficient_rbf(training_data):
+    """The multi-output RBF gives the same maximum temperature as six separate scipy Rbf models."""
+    parameter_array, coefficients, modes = training_data
+    rom = ThermalROM(parameter_array, coefficients, pod_modes=modes)
+    velocity = np.array([6.0, 8.5, 10.0, 14.0])
+    CPU_load_fraction = np.array([0.5, 0.73, 0.9, 1.0])
+    inlet_server_temperature = np.array([30.0, 25.0, 32.5, 28.0])
+    CPU_temp_max, T_out_server = rom.predict(velocity, CPU_load_fraction, inlet_server_temperature)
+    expected = [reference_prediction(parameter_array, coefficients, modes, *point)
+                for point in zip(velocity, CPU_load_fraction, inlet_server_temperature)]
+    np.testing.assert_allclose(CPU_temp_max, expected, rtol=1e-9)
+    assert T_out_server.shape == (4,)
+    assert np.all(T_out_server > inlet_server_temperature)
+
+
+def test_scalar_inputs_broadcast(training_data):
+    parameter_array, coefficients, modes = training_data
+    rom = ThermalROM(parameter_array, coefficients, pod_modes=modes)
+    CPU_temp_max, T_out_server = rom.predict(10, 0.73, 30)
+    assert CPU_temp_max.shape == (1,)
+    assert rom.predict_state(10, [0.5, 0.73, 1.0]).shape == (modes.shape[0], 3)
+
+
+def test_max_temperature_blocks(training_data):
+    """Reconstructing in small blocks of operating points gives the same result."""
+    parameter_array, coefficients, modes = training_data
+    rom = ThermalROM(parameter_array, coefficients, pod_modes=modes)
+    velocity = np.linspace(6, 15, 37)
+    unblocked = rom.max_temperature(velocity, 0.8)
+    np.testing.assert_allclose(rom.max_temperature(velocity, 0.8, block_size=1000), unblocked)
+    np.testing.assert_allclose(unblocked, rom.predict_state(velocity, 0.8).max(axis=0))
+
+
+def test_hotspot_index_matches_full_reconstruction(training_data, caplog):
+    parameter_array, coefficients, modes = training_data
+    rom = ThermalROM(parameter_array, coefficients, pod_modes=modes)
+    rng = np.random.default_rng(1)
+    velocity = rng.uniform(6, 15, 200)
+    CPU_load_fraction = rng.uniform(0.5, 1, 200)
+    full = rom.max_temperature(velocity, CPU_load_fraction, 27)
+    hotspot_nodes = rom.build_hotspot_index()
+    assert 0 < hotspot_nodes.size < modes.shape[0]
+    np.testing.assert_allclose(rom.max_temperature(velocity, CPU_load_fraction, 27, verify=True), full)
+    # Operating points outside the indexed envelope use the full reconstruction, which is logged once
+    with caplog.at_level("WARNING"):
+        np.testing.assert_allclose(rom.max_temperature([5, 20], [0.3, 1.2]), rom.predict_state([5, 20], [0.3, 1.2]).max(axis=0))
+        rom.max_temperature(5, 0.3)
+    assert caplog.text.count("outside the (velocity, CPU load fraction) envelope") == 1
+
+
+def test_hotspot_verify_falls_back_to_full_field(training_data, caplog):
+    parameter_array, coefficients, modes = training_data
+    rom = ThermalROM(parameter_array, coefficients, pod_modes=modes)
+    rom.build_hotspot_index()
+    full = rom.predict_state(10, 0.8).max(axis=0)
+    # Drop the true hotspot from the index to force a miss
+    rom.hotspot_modes = np.delete(modes, np.argmax(rom.predict_state(10, 0.8)), axis=0)
+    np.testing.assert_allclose(rom.max_temperature(10, 0.8, verify=True), full)
+    assert "Hotspot index missed" in caplog.text
+
+
+def test_surrogate_cache_reused_until_training_data_changes(tmp_path, training_data):
+    parameter_array, coefficients, modes = training_data
+    np.savetxt(tmp_path / "coeff.csv", coefficients, delimiter=",")
+    np.savetxt(tmp_path / "parameter_array.csv", parameter_array, delimiter=",")
+    np.save(tmp_path / "modes.npy", modes)
+
+    rom = ThermalROM.from_files(str(tmp_path))
+    cached = list(tmp_path.glob("thermal_rom_*.npz"))
+    assert len(cached) == 1
+    reloaded = ThermalROM.from_files(str(tmp_path))
+    np.testing.assert_array_equal(reloaded.weights, rom.weights)
+    np.testing.assert_allclose(reloaded.predict(9, 0.7, 28)[0], rom.predict(9, 0.7, 28)[0])
+
+    # A different kernel or changed training data is refitted under a new key
+    ThermalROM.from_files(str(tmp_path), kernel_function="gaussian")
+    np.savetxt(tmp_path / "coeff.csv", coefficients * 1.01, delimiter=",")
+    refitted = ThermalROM.from_files(str(tmp_path))
+    assert len(list(tmp_path.glob("thermal_rom_*.npz"))) == 3
+    assert not np.allclose(refitted.predict(9, 0.7)[0], rom.predict(9, 0.7)[0])
+
+
+def test_hotspot_index_cached_with_the_surrogate(tmp_path, training_data, monkeypatch):
+    parameter_array, coefficients, modes = training_data
+    np.savetxt(tmp_path / "coeff.csv", coefficients, delimiter=",")
+    np.savetxt(tmp_path / "parameter_array.csv", parameter_array, delimiter=",")
+    np.save(tmp_path / "modes.npy", modes)
+    # The default layout runs at 5 m/s, below the trained velocities
+    velocity_range = covering_range((6, 15), [5.0, 5.0])
+    assert velocity_range == (5.0, 15.0)
+
+    hotspot_nodes = ThermalROM.from_files(str(tmp_path)).build_hotspot_index(velocity_range=velocity_range)
+    reloaded = ThermalROM.from_files(str(tmp_path))
+    monkeypatch.setattr(ThermalROM, "_project", lambda *args: pytest.fail("the index was rebuilt"))
+    np.testing.assert_array_equal(reloaded.build_hotspot_index(velocity_range=velocity_range), hotspot_nodes)
+    assert len(list(tmp_path.glob("thermal_rom_*.npz"))) == 1
@@ -0,0 +1,102 @@
+"""Memoizing cache of thermal ROM predictions"""
+
+from collections import OrderedDict
+import numpy as np
+from mostcool.thermal.energy_balance import server_outlet_temperature
+from mostcool.thermal.rom import TRAINING_INLET_TEMPERATURE
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of maximum CPU temperatures in front of a ThermalROM or ResponseSurface.
+
+    Operating points are keyed on (velocity, CPU load fraction) rounded to the given tolerances, and a miss is
+    evaluated at the rounded point so a cached value does not depend on which point filled it. The inlet
+    temperature is not part of the key: the ROM applies it as an exact shift of the field, so it is applied to
+    the cached value instead. A zero tolerance keys on the exact value, which already hits whenever the CPU
+    loading schedule repeats. It is a drop-in replacement for the wrapped model (same predict methods).
+    """
+
+    def __init__(self, rom, max_size=4096, velocity_tolerance=0.0, CPU_load_fraction_tolerance=0.0):
+        """
+        Parameters:
+        - rom: ThermalROM or ResponseSurface whose predictions are cached.
+        - max_size: Maximum number of cached operating points, the least recently used are evicted first.
+        - velocity_tolerance: Quantization step of the velocity in m/s (0 for exact keys).
+        - CPU_load_fraction_tolerance: Quantization step of the CPU load fraction (0 for exact keys).
+        """
+        if max_size < 1:
+            raise ValueError(f"Cache size must be at least 1, got {max_size}")
+        self.rom = rom
+        self.pod_modes = rom.pod_modes
+        self.max_size = max_size
+        self.velocity_tolerance = velocity_tolerance
+        self.CPU_load_fraction_tolerance = CPU_load_fraction_tolerance
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _quantize(values, tolerance):
+        return np.round(values / tolerance) * tolerance if tolerance else values
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Hit/miss counters and current size, for tuning the tolerances and size."""
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate, "size": len(self._entries),
+                "max_size": self.max_size}
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def predict_coefficients(self, velocity, CPU_load_fraction):
+        """POD coefficients from the wrapped model (not cached)."""
+        return self.rom.predict_coefficients(velocity, CPU_load_fraction)
+
+    def predict_state(self, velocity, CPU_load_fraction, inlet_server_temperature=TRAINING_INLET_TEMPERATURE):
+        """Full temperature field from the wrapped model (not cached)."""
+        return self.rom.predict_state(velocity, CPU_load_fraction, inlet_server_temperature)
+
+    def max_temperature(self, velocity, CPU_load_fraction, inlet_server_temperature=TRAINING_INLET_TEMPERATURE,
+                        verify=False):
+        """Maximum CPU temperature in °C for N operating points, evaluating only the uncached ones."""
+        velocity, CPU_load_fraction = np.broadcast_arrays(np.atleast_1d(velocity), np.atleast_1d(CPU_load_fraction))
+        points = np.column_stack((self._quantize(velocity.ravel().astype(float), self.velocity_tolerance),
+                                  self._quantize(CPU_load_fraction.ravel().astype(float),
+                                                 self.CPU_load_fraction_tolerance)))
+        # Servers sharing an operating point are looked up once
+        keys, inverse = np.unique(points, axis=0, return_inverse=True)
+        values = np.empty(len(keys))
+        missing = []
+        for i, key in enumerate(map(tuple, keys)):
+            value = self._entries.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                self._entries.move_to_end(key)
+                values[i] = value
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            values[missing] = self.rom.max_temperature(keys[missing, 0], keys[missing, 1], verify=verify)
+            for i in missing:
+                self._entries[tuple(keys[i])] = values[i]
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        max_temperature = values[inverse.ravel()]
+        return max_temperature - (TRAINING_INLET_TEMPERATURE - np.asarray(inlet_server_temperature))
+
+    def predict(self, velocity, CPU_load_fraction, inlet_server_temperature=TRAINING_INLET_TEMPERATURE, verify=False):
+        """Maximum CPU temperature and server outlet temperature in °C for N operating points."""
+        CPU_temp_max = self.max_temperature(velocity, CPU_load_fraction, inlet_server_temperature, verify=verify)
+        T_out_server = server_outlet_temperature(inlet_server_temperature, velocity, CPU_load_fraction)
+        return CPU_temp_max, np.broadcast_to(T_out_server, CPU_temp_max.shape)
@@ -0,0 +1,74 @@
+"""Energy balance of the data center and its air cooled servers
+
+Every function accepts Python scalars or numpy arrays (broadcast against each other) and returns arrays, so
+sweeps, batch post-processing and per-server evaluation need no Python loops.
+"""
+
+import numpy as np
+
+
+# Air properties and server geometry
+DENSITY = 1.225  # kg/m^3
+CP = 1006.43  # J/kgK
+SERVER_INLET_AREA = 0.017560001  # in m^2
+MIN_MASS_FLOWRATE = 0.00001  # kg/s, used in place of a zero flow rate
+
+# Load per CPU = 300 W and 2 CPU's are present in the server making total CPU laod to be 600W at 100% capcity
+# All other components RAM, power supply and HDD etc amount to 400W making the total server load to be 1000 W
+SERVER_CPU_LOAD = 600  # in Watts
+SERVER_OTHER_LOAD = 400  # in Watts
+TOTAL_ITE_LOAD = 80  # in kW
+
+
+def server_mass_flowrate(velocity):
+    """Air mass flow rate through a server in kg/s for the given inlet velocity in m/s."""
+    mass_flowrate = DENSITY * SERVER_INLET_AREA * np.asarray(velocity, dtype=float)
+    return np.where(mass_flowrate == 0, MIN_MASS_FLOWRATE, mass_flowrate)
+
+
+def server_fan_power(velocity):
+    """Energy consumption in Watts by the fans of one server to cool the CPU at the given inlet velocity."""
+    mass_flowrate = DENSITY * SERVER_INLET_AREA * np.asarray(velocity, dtype=float)
+    # Calculation of pressure drop across the air cooled server
+    pressure_drop = 7.4066e+03 * mass_flowrate ** 1.8384  # Pa
+    return pressure_drop * mass_flowrate / DENSITY
+
+
+def server_outlet_temperature(inlet_server_temperature, velocity, CPU_load_fraction):
+    """Server outlet air temperature in °C from an energy balance over the server."""
+    server_load = np.asarray(CPU_load_fraction, dtype=float) * SERVER_CPU_LOAD + SERVER_OTHER_LOAD
+    return inlet_server_temperature + server_load / (server_mass_flowrate(velocity) * CP)
+
+
+def data_center_temperature_deltas(supply_temperature,
+                                   server_inlet_velocity,
+                                   total_ite_load_percentage,
+                                   num_servers):
+    """
+    Calculate various temperature deltas based on the total ITE load.
+
+    Parameters:
+    - supply_temperature: Supply air temperature in °C.
+    - server_inlet_velocity: Server inlet velocity in m/s, the same for all servers of the data center.
+    - total_ite_load_percentage: The total ITE load %
+    - num_servers: Number of servers in the data center.
+
+    Returns:
+    - calculated temperature deltas and other values.
+    The average supply and return delta_T's should be used as inputs for data_center
+    The max supply delta_T can should be used as input to server model
+    - total_energy_consumption_by_fans: Fan power of all servers in Watts.
+    """
+    ite_load = TOTAL_ITE_LOAD * np.asarray(total_ite_load_percentage, dtype=float)
+    avg_supply_delta_T = 0.1169 * ite_load**0.9505
+    avg_return_delta_T = 7.6459e-04 * ite_load**1.8956
+    max_supply_del_T = 0.0173 * ite_load**1.5363 + 6.9092
+
+    inlet_server_temperature = supply_temperature + max_supply_del_T  # Worst case scenario for the server, i.e., hihgest inlet temperature at the server inlet
+    total_energy_consumption_by_fans = server_fan_power(server_inlet_velocity) * num_servers  # in Watts
+    Total_server_Load = ite_load * 1000 - total_energy_consumption_by_fans
+    heat_load_per_server = Total_server_Load / num_servers
+    CPU_Load = heat_load_per_server - SERVER_OTHER_LOAD  # in Watts
+    CPU_Load_fraction = CPU_Load / SERVER_CPU_LOAD  # is a fraction of the total CPU load of 600W
+
+    return avg_supply_delta_T, avg_return_delta_T, inlet_server_temperature, CPU_Load_fraction, total_energy_consumption_by_fans
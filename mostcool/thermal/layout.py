@@ -0,0 +1,79 @@
+"""Rack/server layout of the data center for the thermal model"""
+
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+
+# Supply air sensor (subscription name) feeding the servers of each zone. The shipped IDFs only have an air loop
+# for the East zone, so West servers are fed by the East supply node until a West sensor is added to SENSORS.
+ZONE_SUPPLY_SENSORS = {
+    "East": "East Air Loop Outlet Node/System Node Temperature",
+    "West": "East Air Loop Outlet Node/System Node Temperature",
+}
+
+LAYOUT_COLUMNS = ["zone", "rack", "inlet_velocity", "load_share", "inlet_temperature_offset"]
+
+
+@dataclass
+class ServerLayout:
+    """
+    Per-server description of the data center, one entry per server.
+
+    - zone: Zone name of each server (a key of ZONE_SUPPLY_SENSORS).
+    - rack: Rack name of each server.
+    - inlet_velocity: Server inlet velocity in m/s.
+    - load_share: Share of the average per-server CPU load carried by the server (normalized to a mean of 1).
+    - inlet_temperature_offset: Inlet temperature offset in °C from the worst-case server inlet temperature.
+    """
+    zone: np.ndarray
+    rack: np.ndarray
+    inlet_velocity: np.ndarray
+    load_share: np.ndarray
+    inlet_temperature_offset: np.ndarray
+
+    def __post_init__(self):
+        self.zone = np.asarray(self.zone, dtype=str)
+        self.rack = np.asarray(self.rack, dtype=str)
+        self.inlet_velocity = np.asarray(self.inlet_velocity, dtype=float)
+        self.load_share = np.asarray(self.load_share, dtype=float)
+        if not np.all(self.load_share >= 0) or not self.load_share.mean() > 0:
+            raise ValueError("Server load shares must be non-negative with a positive mean, "
+                             f"got {self.load_share.tolist()}")
+        self.load_share = self.load_share / self.load_share.mean()  # total ITE load is conserved
+        self.inlet_temperature_offset = np.asarray(self.inlet_temperature_offset, dtype=float)
+        unknown_zones = set(self.zone) - set(ZONE_SUPPLY_SENSORS)
+        if unknown_zones:
+            raise ValueError(f"Unknown zones {unknown_zones} in server layout, expected {list(ZONE_SUPPLY_SENSORS)}")
+        self.zones, self.zone_index = np.unique(self.zone, return_inverse=True)
+        self.racks, self.rack_index = np.unique(self.rack, return_inverse=True)
+
+    @property
+    def num_servers(self):
+        return self.zone.size
+
+    @classmethod
+    def uniform(cls, num_servers=84, inlet_velocity=5, zone="East", servers_per_rack=42):
+        """Identical servers in one zone, i.e. every server is the worst-case server."""
+        rack = [f"{zone}-R{i // servers_per_rack + 1:02d}" for i in range(num_servers)]
+        return cls(zone=[zone] * num_servers, rack=rack, inlet_velocity=np.full(num_servers, inlet_velocity),
+                   load_share=np.ones(num_servers), inlet_temperature_offset=np.zeros(num_servers))
+
+    @classmethod
+    def from_csv(cls, path):
+        """Read a layout CSV with one row per server and the columns in LAYOUT_COLUMNS."""
+        layout = pd.read_csv(path)
+        missing = set(LAYOUT_COLUMNS) - set(layout.columns)
+        if missing:
+            raise ValueError(f"Server layout {path} is missing columns {missing}")
+        return cls(**{column: layout[column].to_numpy() for column in LAYOUT_COLUMNS})
+
+    def supply_temperature(self, zone_supply_temperatures):
+        """Per-server supply temperature from a {zone: supply temperature} mapping."""
+        return np.array([zone_supply_temperatures[zone] for zone in self.zones])[self.zone_index]
+
+    def rack_maximum(self, values):
+        """Maximum of a per-server array over each rack, in the order of self.racks."""
+        rack_max = np.full(self.racks.size, -np.inf)
+        np.maximum.at(rack_max, self.rack_index, values)
+        return rack_max
@@ -0,0 +1,79 @@
+"""Binary, memory-mapped storage of the POD modes"""
+
+import argparse
+import logging
+import os
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+
+logger = logging.getLogger(__name__)
+
+
+def convert_modes(csv_path, npy_path=None, dtype="float64", chunk_rows=100000):
+    """
+    Convert the POD modes text matrix (modes.csv) to a .npy file once.
+
+    The CSV is streamed in chunks of chunk_rows rows, so the conversion never holds the whole text matrix
+    in memory. The .npy file is written next to a temporary name and moved in place when complete.
+
+    Parameters:
+    - csv_path: Path to the comma separated modes matrix.
+    - npy_path: Output path, defaults to csv_path with a .npy extension.
+    - dtype: dtype of the stored modes (e.g. float32 halves the file size and page cache footprint).
+
+    Returns:
+    - npy_path: Path to the written .npy file.
+    """
+    npy_path = npy_path or os.path.splitext(csv_path)[0] + ".npy"
+    with open(csv_path) as f:
+        n_rows = sum(1 for line in f if line.strip())
+    n_columns = pd.read_csv(csv_path, header=None, nrows=1).shape[1]
+
+    tmp_path = npy_path + ".tmp"
+    modes = open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(n_rows, n_columns))
+    row = 0
+    for chunk in pd.read_csv(csv_path, header=None, chunksize=chunk_rows, dtype=np.float64):
+        modes[row:row + len(chunk)] = chunk.to_numpy()
+        row += len(chunk)
+    modes.flush()
+    del modes
+    os.replace(tmp_path, npy_path)
+    logger.info(f"Converted {csv_path} ({n_rows}x{n_columns}) to {npy_path} as {dtype}")
+    return npy_path
+
+
+def load_modes(path, dtype=None):
+    """
+    Load the POD modes, memory-mapped read-only when stored as .npy.
+
+    Every process that maps the same file shares its pages through the OS page cache. A dtype different from
+    the stored one needs an in-memory copy; store the modes with the wanted dtype to keep them mapped.
+    A .csv path is parsed with np.loadtxt as a fallback.
+    """
+    if path.endswith(".npy"):
+        modes = np.load(path, mmap_mode="r")
+    else:
+        logger.warning(f"Parsing POD modes from text file {path}, run mostcool.thermal.mode_store to convert it")
+        modes = np.loadtxt(path, delimiter=",")
+    if dtype is not None and modes.dtype != np.dtype(dtype):
+        logger.info(f"Copying POD modes from {modes.dtype} to {np.dtype(dtype)}")
+        modes = modes.astype(dtype)
+    return modes
+
+
+def find_modes(data_dir):
+    """Path of the POD modes in data_dir, preferring the binary store over modes.csv."""
+    npy_path = os.path.join(data_dir, "modes.npy")
+    return npy_path if os.path.exists(npy_path) else os.path.join(data_dir, "modes.csv")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the POD modes CSV to a memory-mappable .npy file")
+    parser.add_argument("csv_path", help="Path to modes.csv")
+    parser.add_argument("-o", "--output", default=None, help="Output .npy path (default: next to the CSV)")
+    parser.add_argument("--dtype", default="float64", choices=["float32", "float64"], help="Stored dtype")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    convert_modes(args.csv_path, args.output, dtype=args.dtype)
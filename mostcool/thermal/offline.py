@@ -0,0 +1,121 @@
+"""Offline one-way thermal post-processing of EnergyPlus outputs, without HELICS"""
+
+import argparse
+import logging
+import os
+import re
+import numpy as np
+import pandas as pd
+import mostcool.core.definitions as definitions
+import mostcool.thermal.energy_balance as energy_balance
+from mostcool.thermal.layout import ServerLayout, ZONE_SUPPLY_SENSORS
+from mostcool.thermal.rom import ThermalROM
+from mostcool.thermal.server_federate import (RACK_TIME_SERIES_NAME, RECORDED_CHANNELS, layout_velocity_range,
+                                              num_servers, server_layout_path, server_inlet_velocity)
+
+
+logger = logging.getLogger(__name__)
+
+CPU_LOADING_SENSOR = "Data Center CPU Loading Schedule/Schedule Value"
+# EnergyPlus csv headers look like "EAST AIR LOOP OUTLET NODE:System Node Temperature [C](TimeStep)"
+EPLUSOUT_COLUMN = re.compile(r"^\s*(?P<key>[^:]+):(?P<variable>.+?)\s*\[.*$")
+
+
+def sensor_columns(columns):
+    """
+    Map sensor names ("key/variable", as published by the EnergyPlus federate) to columns of a trace.
+
+    Both eplusout.csv headers and recorded traces whose columns are the sensor names are recognized.
+    Names are matched case-insensitively since EnergyPlus upper-cases the keys.
+    """
+    mapping = {}
+    for column in columns:
+        match = EPLUSOUT_COLUMN.match(column)
+        name = f'{match["key"]}/{match["variable"]}' if match else column
+        mapping[name.strip().lower()] = column
+    return mapping
+
+
+def run_offline(sensor_path, output_path=None, layout=None, rom=None, timestep_seconds=None, lag_steps=1):
+    """
+    Run the thermal model over a whole EnergyPlus output series in one vectorized pass.
+
+    This is equivalent to the Server_1 federate for runs where its published deltas are not used by
+    EnergyPlus (one-way coupling), without stepping a co-simulation. The federate evaluates step t with
+    the sensor values EnergyPlus published at the previous step, so by default each row is recorded one
+    step after its own time, which lines the output up with the federate's time series.
+
+    Parameters:
+    - sensor_path: eplusout.csv, or a recorded sensor trace with one column per sensor name.
+    - output_path: Where to write the time series (same columns as the federate), skipped if None.
+    - layout: ServerLayout to evaluate, defaults to the run's server layout or the uniform layout.
+    - rom: ThermalROM (or ResponseSurface), defaults to the ROM fitted from the thermal data directory.
+    - timestep_seconds: Time between rows, defaults to definitions.TIMESTEP_PERIOD_SECONDS.
+    - lag_steps: Steps between a row and the thermal step evaluating it, 0 records each row at its own time.
+
+    Returns:
+    - time_series: DataFrame indexed by time with the recorded channels.
+    - rack_temperatures: DataFrame indexed by time with the maximum CPU temperature of each rack.
+    """
+    timestep_seconds = timestep_seconds or definitions.TIMESTEP_PERIOD_SECONDS
+    if layout is None:
+        if os.path.exists(server_layout_path()):
+            layout = ServerLayout.from_csv(server_layout_path())
+        else:
+            layout = ServerLayout.uniform(num_servers=num_servers, inlet_velocity=server_inlet_velocity)
+    if rom is None:
+        rom = ThermalROM.from_files(kernel_function="multiquadric")
+        rom.build_hotspot_index(velocity_range=layout_velocity_range(layout))
+
+    trace = pd.read_csv(sensor_path)
+    columns = sensor_columns(trace.columns)
+    sensors = [CPU_LOADING_SENSOR] + list(set(ZONE_SUPPLY_SENSORS.values()))
+    missing = [sensor for sensor in sensors if sensor.lower() not in columns]
+    if missing:
+        raise KeyError(f"Sensors {missing} not found in {sensor_path}")
+    series = {sensor: trace[columns[sensor.lower()]].to_numpy(dtype=float) for sensor in sensors}
+    time = (np.arange(len(trace)) + lag_steps) * timestep_seconds
+
+    # (n_steps, 1) per-step values broadcast against (n_servers,) per-server values
+    cpu_loading = series[CPU_LOADING_SENSOR][:, np.newaxis]
+    zone_supply_temperature = np.column_stack([series[ZONE_SUPPLY_SENSORS[zone]] for zone in layout.zones])
+    supply_temperature = zone_supply_temperature[:, layout.zone_index]
+    supply_approach_temp, return_approach_temperature, inlet_server_temperature, CPU_Load_fraction, _ = \
+        energy_balance.data_center_temperature_deltas(supply_temperature=supply_temperature,
+                                                      server_inlet_velocity=layout.inlet_velocity.mean(),
+                                                      total_ite_load_percentage=cpu_loading,
+                                                      num_servers=layout.num_servers)
+    inlet_server_temperature = inlet_server_temperature + layout.inlet_temperature_offset
+    CPU_Load_fraction = CPU_Load_fraction * layout.load_share
+    velocity = np.broadcast_to(layout.inlet_velocity, CPU_Load_fraction.shape)
+    CPU_temp_max, T_out_server = rom.predict(velocity.ravel(), CPU_Load_fraction.ravel(),
+                                             inlet_server_temperature.ravel())
+    CPU_temp_max = CPU_temp_max.reshape(CPU_Load_fraction.shape)
+    T_out_server = T_out_server.reshape(CPU_Load_fraction.shape)
+
+    time_series = pd.DataFrame(dict(zip(RECORDED_CHANNELS, [
+        CPU_temp_max.max(axis=1),
+        T_out_server.max(axis=1),
+        inlet_server_temperature.max(axis=1),
+        supply_approach_temp[:, 0],
+        return_approach_temperature[:, 0],
+    ])), index=pd.Index(time, name="Time"))
+    rack_temperatures = pd.DataFrame(
+        np.column_stack([CPU_temp_max[:, layout.rack_index == i].max(axis=1) for i in range(layout.racks.size)]),
+        columns=layout.racks, index=time_series.index)
+    if output_path is not None:
+        time_series.to_csv(output_path)
+        rack_temperatures.to_csv(os.path.join(os.path.dirname(output_path) or ".", RACK_TIME_SERIES_NAME))
+        logger.info(f"Wrote {len(time_series)} thermal model steps to {output_path}")
+    return time_series, rack_temperatures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the thermal model over an EnergyPlus output series")
+    parser.add_argument("sensor_path", nargs="?", default=os.path.join(definitions.OUTPUT_DIR, "eplusout.csv"),
+                        help="eplusout.csv or a recorded sensor trace")
+    parser.add_argument("-o", "--output", default=os.path.join(definitions.OUTPUT_DIR, "time_series_data.csv"),
+                        help="Output time series CSV")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    run_offline(args.sensor_path, args.output)
@@ -4,8 +4,9 @@ import h5py
 from scipy.interpolate import interp1d
 import subprocess
 
-from sklearn.preprocessing import MinMaxScaler
-from scipy.interpolate import Rbf
+import mostcool.core.definitions as definitions
+from mostcool.thermal.response_surface import ResponseSurface
+from mostcool.thermal.rom import ThermalROM
 
 # Define the velocity range for which the coefficients are known
 lower_vel_limit = 6
@@ -24,41 +25,19 @@ solution_path = "/app/mostcool/thermal/data/PythonPOD_Solid.cgns"  # Update with
 paraview_path = "/Paraview/bin/paraview"  # Ensure this matches your ParaView installation path
 
 
-# This function "build_and_scale_rbf_models" has to be run once to run the online_prediction function multiple time inside Helics
-def build_and_scale_rbf_models(kernel_function='multiquadric'):
-    """
-    Build RBF models for each coefficient dimension with parameter and coefficient scaling.
-
-    Parameters:
-    - training_parameters: 2D array of parameters used for training.
-    - training_coefficients: 2D array of coefficients corresponding to the training parameters.
-    - kernel_function: String specifying the kernel function for the RBF models.
-
-    Returns:
-    - rbf_models: List of RBF model objects for each coefficient dimension.
-    - param_scaler: Fitted scaler for parameters.
-    - coeff_scaler: Fitted scaler for coefficients.
-    """
-    coefficients = np.loadtxt('/app/mostcool/thermal/data/coeff.csv', delimiter=',')
-    parameter_array=np.loadtxt('/app/mostcool/thermal/data/parameter_array.csv', delimiter=',')
-    # Initialize and fit scalers
-    param_scaler = MinMaxScaler().fit(parameter_array)
-    coeff_scaler = MinMaxScaler().fit(coefficients)
-    
-    # Scale training data
-    scaled_training_params = param_scaler.transform(parameter_array)
-    scaled_training_coeffs = coeff_scaler.transform(coefficients)
-
-    # Build RBF models with scaled data
-    rbf_models = [
-        Rbf(scaled_training_params[:, 0], scaled_training_params[:, 1], scaled_training_coeffs[:, i], function=kernel_function)
-        for i in range(scaled_training_coeffs.shape[1])
-    ]
+_rom = None
 
-    return rbf_models, param_scaler, coeff_scaler
 
-# calling this function once to load everything that is needed to excute the rest of the code
-rbf_models, param_scaler, coeff_scaler = build_and_scale_rbf_models(kernel_function='multiquadric')
+def get_rom():
+    """Build the thermal ROM (or its response surface) on first use and reuse it for every later prediction."""
+    global _rom
+    if _rom is None:
+        _rom = ThermalROM.from_files(kernel_function='multiquadric')
+        if definitions.THERMAL_ROM_MODE == "table":
+            _rom = ResponseSurface(_rom, velocity_range=(lower_vel_limit, upper_vel_limit), 
+                                   CPU_load_fraction_range=(lower_CPU_frac, upper_CPU_frac), 
+                                   interpolation=definitions.RESPONSE_SURFACE_INTERPOLATION)
+    return _rom
 
 
 # Main function to be passed to Helics
@@ -89,27 +68,8 @@ def predict_temperature(velocity, CPU_load_fraction=0.73, inlet_server_temperatu
                                 adjusted for the inlet temperature deviation.
     """
     
-    #----------------------------------Need to be excuted only once---------------------------
-    modes = np.loadtxt('/app/mostcool/thermal/data/modes.csv', delimiter=',')
-    #-----------------------------------------------------------------------------------------
-    # Create a 2D array from the input parameters
-    new_parameters = np.array([[velocity, CPU_load_fraction]])
-    
-    # Normalize the new parameters using the parameter scaler
-    normalized_new_params = param_scaler.transform(new_parameters)
-    
-    # Use the RBF models to predict the normalized coefficients for the new parameters
-    predicted_normalized_coeffs = np.array([
-        model(normalized_new_params[:, 0], normalized_new_params[:, 1]) for model in rbf_models
-    ]).T  # Transpose to ensure correct shape
-    
-    # Invert the normalization of the coefficients
-    predicted_coeffs = coeff_scaler.inverse_transform(predicted_normalized_coeffs)
-    
-    # Reconstruct the system state using the predicted coefficients and POD modes
-    #The predicted state is in K
-    predicted_state = np.dot(modes, predicted_coeffs.T) 
-    adjusted_predicted_state = predicted_state - (30-inlet_server_temperature)-273.15 #Adjusting and converting to °C
+    # Reconstruct the system state using the predicted coefficients and POD modes, adjusted and converted to °C
+    adjusted_predicted_state = get_rom().predict_state(velocity, CPU_load_fraction, inlet_server_temperature)
     predicted_state_flat = adjusted_predicted_state.flatten()
     # The above adjustment only works when constant fluid properites are assumed i.e., the fluid temperature change will not significanlty affect its properties.
          # Update the temperature data in the solution file.
@@ -0,0 +1,111 @@
+"""Precomputed response surface of the thermal ROM over its trained envelope"""
+
+import logging
+import numpy as np
+from scipy.interpolate import RectBivariateSpline
+from mostcool.thermal.energy_balance import server_outlet_temperature
+from mostcool.thermal.rom import CPU_LOAD_FRACTION_RANGE, KELVIN_OFFSET, TRAINING_INLET_TEMPERATURE, VELOCITY_RANGE
+
+
+logger = logging.getLogger(__name__)
+
+INTERPOLATION_DEGREES = {"bilinear": 1, "bicubic": 3}
+
+
+class ResponseSurface:
+    """
+    Maximum CPU temperature and POD coefficients tabulated once on a dense (velocity, load) grid.
+
+    Predictions interpolate the tables instead of evaluating the RBF, so each one costs O(1) in the number of
+    training samples and mesh nodes. It is a drop-in replacement for ThermalROM (same predict methods);
+    operating points outside the tabulated envelope are evaluated with the ROM. The maximum interpolation
+    error against the ROM is measured at the cell centers of the grid and kept in max_error. The tables and
+    the error are cached with the surrogate of the ROM (see ThermalROM.cached).
+    """
+
+    def __init__(self, rom, velocity_range=VELOCITY_RANGE, CPU_load_fraction_range=CPU_LOAD_FRACTION_RANGE,
+                 shape=(91, 51), interpolation="bicubic"):
+        """
+        Parameters:
+        - rom: ThermalROM to tabulate (with its POD modes loaded).
+        - velocity_range: (min, max) velocity in m/s of the table.
+        - CPU_load_fraction_range: (min, max) CPU load fraction of the table.
+        - shape: Number of grid points along velocity and CPU load fraction.
+        - interpolation: "bilinear" or "bicubic".
+        """
+        if interpolation not in INTERPOLATION_DEGREES:
+            raise ValueError(f"Unknown interpolation {interpolation}, expected one of {list(INTERPOLATION_DEGREES)}")
+        self.rom = rom
+        self.pod_modes = rom.pod_modes
+        self.velocity = np.linspace(*velocity_range, shape[0])
+        self.CPU_load_fraction = np.linspace(*CPU_load_fraction_range, shape[1])
+        degree = INTERPOLATION_DEGREES[interpolation]
+
+        velocity, CPU_load_fraction = np.meshgrid(self.velocity, self.CPU_load_fraction, indexing="ij")
+        # Tabulated at the training inlet temperature, the inlet deviation is a constant shift
+        key = f"{tuple(map(float, velocity_range))}/{tuple(map(float, CPU_load_fraction_range))}/{tuple(shape)}"
+        tables = rom.cached("response_surface", key, lambda: np.column_stack((
+            rom.max_temperature(velocity.ravel(), CPU_load_fraction.ravel()),
+            rom.predict_coefficients(velocity.ravel(), CPU_load_fraction.ravel()))))
+        max_temperature, predicted_coeffs = tables[:, 0].reshape(shape), tables[:, 1:]
+        self._max_temperature = RectBivariateSpline(self.velocity, self.CPU_load_fraction, max_temperature,
+                                                    kx=degree, ky=degree)
+        self._coefficients = [
+            RectBivariateSpline(self.velocity, self.CPU_load_fraction, predicted_coeffs[:, i].reshape(shape),
+                                kx=degree, ky=degree)
+            for i in range(predicted_coeffs.shape[1])
+        ]
+        self.max_error = float(rom.cached("response_surface_error", f"{key}/{interpolation}",
+                                          lambda: np.array(self.interpolation_error())))
+        logger.info(f"Response surface {shape} ({interpolation}) built, maximum interpolation error "
+                    f"{self.max_error:.3g} K against the ROM")
+
+    def interpolation_error(self):
+        """Maximum absolute error (K) of the tabulated maximum temperature against the ROM at the cell centers."""
+        velocity, CPU_load_fraction = np.meshgrid((self.velocity[1:] + self.velocity[:-1]) / 2,
+                                                  (self.CPU_load_fraction[1:] + self.CPU_load_fraction[:-1]) / 2)
+        velocity, CPU_load_fraction = velocity.ravel(), CPU_load_fraction.ravel()
+        error = self.max_temperature(velocity, CPU_load_fraction) - self.rom.max_temperature(velocity, CPU_load_fraction)
+        return np.max(np.abs(error))
+
+    def _inside(self, velocity, CPU_load_fraction):
+        return ((velocity >= self.velocity[0]) & (velocity <= self.velocity[-1])
+                & (CPU_load_fraction >= self.CPU_load_fraction[0]) & (CPU_load_fraction <= self.CPU_load_fraction[-1]))
+
+    def predict_coefficients(self, velocity, CPU_load_fraction):
+        """Interpolated POD coefficients (N, n_modes) for N operating points."""
+        velocity, CPU_load_fraction = np.broadcast_arrays(np.atleast_1d(velocity), np.atleast_1d(CPU_load_fraction))
+        inside = self._inside(velocity, CPU_load_fraction)
+        predicted_coeffs = np.empty((velocity.size, len(self._coefficients)))
+        predicted_coeffs[inside] = np.column_stack([
+            spline(velocity[inside], CPU_load_fraction[inside], grid=False) for spline in self._coefficients
+        ])
+        if not np.all(inside):
+            predicted_coeffs[~inside] = self.rom.predict_coefficients(velocity[~inside], CPU_load_fraction[~inside])
+        return predicted_coeffs
+
+    def predict_state(self, velocity, CPU_load_fraction, inlet_server_temperature=TRAINING_INLET_TEMPERATURE):
+        """Full temperature field in °C (n_nodes, N) reconstructed from the interpolated coefficients."""
+        predicted_coeffs = self.predict_coefficients(velocity, CPU_load_fraction)
+        offset = KELVIN_OFFSET + (TRAINING_INLET_TEMPERATURE - np.atleast_1d(inlet_server_temperature))
+        return self.rom._project(self.pod_modes, predicted_coeffs) - offset
+
+    def max_temperature(self, velocity, CPU_load_fraction, inlet_server_temperature=TRAINING_INLET_TEMPERATURE,
+                        verify=False):
+        """Interpolated maximum CPU temperature in °C for N operating points."""
+        velocity, CPU_load_fraction = np.broadcast_arrays(np.atleast_1d(velocity), np.atleast_1d(CPU_load_fraction))
+        inside = self._inside(velocity, CPU_load_fraction)
+        self.rom.log_outside(inside, ((self.velocity[0], self.velocity[-1]),
+                                      (self.CPU_load_fraction[0], self.CPU_load_fraction[-1])))
+        max_temperature = np.empty(velocity.size)
+        max_temperature[inside] = self._max_temperature(velocity[inside], CPU_load_fraction[inside], grid=False)
+        if not np.all(inside):
+            max_temperature[~inside] = self.rom.max_temperature(velocity[~inside], CPU_load_fraction[~inside],
+                                                                verify=verify)
+        return max_temperature - (TRAINING_INLET_TEMPERATURE - np.asarray(inlet_server_temperature))
+
+    def predict(self, velocity, CPU_load_fraction, inlet_server_temperature=TRAINING_INLET_TEMPERATURE, verify=False):
+        """Maximum CPU temperature and server outlet temperature in °C for N operating points."""
+        CPU_temp_max = self.max_temperature(velocity, CPU_load_fraction, inlet_server_temperature, verify=verify)
+        T_out_server = server_outlet_temperature(inlet_server_temperature, velocity, CPU_load_fraction)
+        return CPU_temp_max, np.broadcast_to(T_out_server, CPU_temp_max.shape)
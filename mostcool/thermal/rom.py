@@ -0,0 +1,346 @@
+"""Vectorized POD/RBF reduced order model of the server thermal field"""
+
+import hashlib
+import logging
+import os
+import numpy as np
+from scipy import linalg
+from scipy.spatial.distance import cdist
+from scipy.special import xlogy
+from sklearn.preprocessing import MinMaxScaler
+from mostcool.thermal.energy_balance import server_outlet_temperature
+from mostcool.thermal.mode_store import find_modes, load_modes
+
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = "/app/mostcool/thermal/data"
+
+# Trained envelope of the ROM
+VELOCITY_RANGE = (6, 15)  # in m/s
+CPU_LOAD_FRACTION_RANGE = (0.5, 1)
+
+# The ROM is trained with a server inlet temperature of 30°C, predictions are shifted by the deviation from it
+TRAINING_INLET_TEMPERATURE = 30  # in °C
+KELVIN_OFFSET = 273.15
+
+# Fitted arrays of the surrogate (RBF and scalers) persisted by ThermalROM.save_surrogate
+SURROGATE_ARRAYS = ("nodes", "weights", "epsilon", "param_min", "param_scale", "coeff_min", "coeff_scale")
+SURROGATE_FORMAT_VERSION = 1
+
+# Same radial basis functions (and names) as scipy.interpolate.Rbf
+RBF_KERNELS = {
+    "multiquadric": lambda r, epsilon: np.sqrt((r / epsilon) ** 2 + 1),
+    "inverse_multiquadric": lambda r, epsilon: 1.0 / np.sqrt((r / epsilon) ** 2 + 1),
+    "gaussian": lambda r, epsilon: np.exp(-((r / epsilon) ** 2)),
+    "linear": lambda r, epsilon: r,
+    "cubic": lambda r, epsilon: r**3,
+    "quintic": lambda r, epsilon: r**5,
+    "thin_plate": lambda r, epsilon: xlogy(r**2, r),
+}
+
+
+def default_epsilon(points):
+    """Average distance between nodes based on a bounding hypercube (the scipy.interpolate.Rbf default)."""
+    edges = np.ptp(points, axis=0)
+    edges = edges[np.nonzero(edges)]
+    return np.power(np.prod(edges) / points.shape[0], 1.0 / edges.size)
+
+
+def covering_range(trained_range, values):
+    """Smallest (min, max) range covering a trained range and the given values, e.g. the inlet velocities of a layout."""
+    values = np.asarray(values, dtype=float)
+    return (float(min(trained_range[0], values.min())), float(max(trained_range[1], values.max())))
+
+
+def modes_key(path, dtype=None):
+    """Identity of a POD modes file (name, size, modification time) and the dtype it is used with."""
+    stat = os.stat(path)
+    return f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}:{dtype}"
+
+
+def surrogate_key(training_files, kernel_function):
+    """Content hash of the training CSVs and the kernel name, identifying a fitted surrogate."""
+    digest = hashlib.sha256(f"{SURROGATE_FORMAT_VERSION}/{kernel_function}".encode())
+    for path in training_files:
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+class ThermalROM:
+    """
+    Reduced Order Model of the server temperature field.
+
+    All six POD coefficients are interpolated by a single multi-output RBF (one linear solve shared by every
+    coefficient, since they are all trained on the same parameter samples), so N operating points are
+    evaluated in one vectorized call.
+    """
+
+    def __init__(self, training_parameters, training_coefficients, pod_modes=None, kernel_function="multiquadric"):
+        """
+        Fit the RBF interpolant of the POD coefficients.
+
+        Parameters:
+        - training_parameters: 2D array (n_samples, 2) of (velocity, CPU load fraction) used for training.
+        - training_coefficients: 2D array (n_samples, n_modes) of coefficients for the training parameters.
+        - pod_modes: 2D array (n_nodes, n_modes) of POD modes obtained from the offline stage.
+        - kernel_function: Name of the radial basis function, as in scipy.interpolate.Rbf.
+        """
+        if kernel_function not in RBF_KERNELS:
+            raise ValueError(f"Unknown kernel function {kernel_function}, expected one of {list(RBF_KERNELS)}")
+        self.kernel_function = kernel_function
+        self.pod_modes = pod_modes
+        self.hotspot_nodes = None
+        self.hotspot_modes = None
+        self.hotspot_envelope = None
+        self.surrogate_path = None  # surrogate file the precomputed tables are cached in, see cached
+        self.modes_key = None
+        self.outside_logged = False
+
+        # Initialize and fit scalers, only their linear transform is kept for the online stage
+        param_scaler = MinMaxScaler().fit(training_parameters)
+        coeff_scaler = MinMaxScaler().fit(training_coefficients)
+        self.param_min, self.param_scale = param_scaler.min_, param_scaler.scale_
+        self.coeff_min, self.coeff_scale = coeff_scaler.min_, coeff_scaler.scale_
+
+        # Build a single multi-output RBF with scaled data
+        self.nodes = param_scaler.transform(training_parameters)
+        self.epsilon = default_epsilon(self.nodes)
+        kernel_matrix = self._kernel(cdist(self.nodes, self.nodes))
+        self.weights = linalg.solve(kernel_matrix, coeff_scaler.transform(training_coefficients))
+
+    @classmethod
+    def from_files(cls, data_dir=DATA_DIR, kernel_function="multiquadric", load_pod_modes=True, modes_dtype=None,
+                   cache_dir=None):
+        """
+        Build the ROM from coeff.csv, parameter_array.csv and (optionally) the POD modes in data_dir.
+
+        The fitted surrogate is cached in cache_dir (data_dir by default) under a hash of the training CSVs and
+        the kernel name; it is reused when the hash matches and refitted otherwise. cache_dir=False disables
+        the cache. Tables precomputed from the modes (hotspot index, response surface) are cached in the same
+        file, see cached. The modes are memory-mapped from modes.npy when it exists (see mostcool.thermal.mode_store),
+        otherwise parsed from modes.csv. modes_dtype selects the dtype the modes are used with.
+        """
+        coeff_path = os.path.join(data_dir, "coeff.csv")
+        parameter_path = os.path.join(data_dir, "parameter_array.csv")
+        modes_path = find_modes(data_dir)
+        modes = load_modes(modes_path, dtype=modes_dtype) if load_pod_modes else None
+
+        if cache_dir is False:
+            surrogate_path = None
+        else:
+            key = surrogate_key([parameter_path, coeff_path], kernel_function)
+            surrogate_path = os.path.join(cache_dir or data_dir, f"thermal_rom_{key[:16]}.npz")
+            if os.path.exists(surrogate_path):
+                logger.info(f"Loading fitted thermal ROM surrogate from {surrogate_path}")
+                rom = cls.load_surrogate(surrogate_path, pod_modes=modes)
+                rom.surrogate_path = surrogate_path
+                rom.modes_key = modes_key(modes_path, modes_dtype) if modes is not None else None
+                return rom
+
+        coefficients = np.loadtxt(coeff_path, delimiter=",")
+        parameter_array = np.loadtxt(parameter_path, delimiter=",")
+        rom = cls(parameter_array, coefficients, pod_modes=modes, kernel_function=kernel_function)
+        if surrogate_path is not None:
+            try:
+                rom.save_surrogate(surrogate_path)
+                rom.surrogate_path = surrogate_path
+                rom.modes_key = modes_key(modes_path, modes_dtype) if modes is not None else None
+            except OSError as e:
+                logger.warning(f"Could not cache the thermal ROM surrogate at {surrogate_path}: {e}")
+        return rom
+
+    def save_surrogate(self, path):
+        """Write the fitted RBF weights, epsilon and scaler transforms to an .npz file (atomically)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, kernel_function=np.array(self.kernel_function),
+                 **{name: getattr(self, name) for name in SURROGATE_ARRAYS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_surrogate(cls, path, pod_modes=None):
+        """Rebuild a ROM from a surrogate written by save_surrogate, without refitting."""
+        rom = cls.__new__(cls)
+        with np.load(path) as surrogate:
+            rom.kernel_function = str(surrogate["kernel_function"])
+            for name in SURROGATE_ARRAYS:
+                setattr(rom, name, surrogate[name])
+        rom.pod_modes = pod_modes
+        rom.hotspot_nodes = None
+        rom.hotspot_modes = None
+        rom.hotspot_envelope = None
+        rom.surrogate_path = None
+        rom.modes_key = None
+        rom.outside_logged = False
+        return rom
+
+    def cached(self, name, key, compute):
+        """
+        Array computed from the POD modes, cached in the surrogate file under name with the key it was computed
+        for (its parameters). compute() is called, and its result cached, when the key does not match. Without
+        a surrogate file or a modes file (e.g. a ROM fitted in memory), compute() is called every time.
+        """
+        if self.surrogate_path is None or self.modes_key is None:
+            return compute()
+        key = f"{self.modes_key}/{key}"
+        with np.load(self.surrogate_path) as surrogate:
+            arrays = dict(surrogate)
+        if f"{name}_key" in arrays and str(arrays[f"{name}_key"]) == key:
+            logger.info(f"Loading {name} from {self.surrogate_path}")
+            return arrays[name]
+        array = compute()
+        arrays.update({name: array, f"{name}_key": np.array(key)})
+        tmp_path = f"{self.surrogate_path}.{os.getpid()}.tmp.npz"
+        try:
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, self.surrogate_path)
+        except OSError as e:
+            logger.warning(f"Could not cache {name} in {self.surrogate_path}: {e}")
+        return array
+
+    def log_outside(self, inside, envelope):
+        """Log, once per ROM, that operating points fall outside the envelope of a precomputed table or index."""
+        if not self.outside_logged and not np.all(inside):
+            self.outside_logged = True
+            logger.warning(f"{np.count_nonzero(~inside)} operating points outside the (velocity, CPU load fraction) "
+                           f"envelope {envelope} are evaluated on the full field, logged once")
+
+    def _kernel(self, r):
+        return RBF_KERNELS[self.kernel_function](r, self.epsilon)
+
+    @staticmethod
+    def _project(modes, predicted_coeffs):
+        # Multiply in the dtype of the modes so memory-mapped float32 modes are never upcast to a copy
+        return modes @ predicted_coeffs.T.astype(modes.dtype)
+
+    def predict_coefficients(self, velocity, CPU_load_fraction):
+        """
+        Predict the POD coefficients for N operating points.
+
+        Parameters:
+        - velocity: Scalar or 1D array of server inlet velocities in m/s.
+        - CPU_load_fraction: Scalar or 1D array of CPU load fractions (broadcast against velocity).
+
+        Returns:
+        - predicted_coeffs: 2D array (N, n_modes) of POD coefficients.
+        """
+        velocity, CPU_load_fraction = np.broadcast_arrays(np.atleast_1d(velocity), np.atleast_1d(CPU_load_fraction))
+        new_parameters = np.column_stack((velocity, CPU_load_fraction)).astype(float)
+        normalized_new_params = new_parameters * self.param_scale + self.param_min
+        predicted_normalized_coeffs = self._kernel(cdist(normalized_new_params, self.nodes)) @ self.weights
+        return (predicted_normalized_coeffs - self.coeff_min) / self.coeff_scale
+
+    def predict_state(self, velocity, CPU_load_fraction, inlet_server_temperature=TRAINING_INLET_TEMPERATURE):
+        """
+        Reconstruct the full temperature field in °C for N operating points.
+
+        Returns:
+        - adjusted_predicted_state: 2D array (n_nodes, N) of temperatures, adjusted for the inlet temperature
+                                    deviation from the assumed 30°C.
+        """
+        predicted_coeffs = self.predict_coefficients(velocity, CPU_load_fraction)
+        # The adjustment only holds when constant fluid properties are assumed, i.e., the fluid temperature
+        # change will not significantly affect its properties.
+        offset = KELVIN_OFFSET + (TRAINING_INLET_TEMPERATURE - np.atleast_1d(inlet_server_temperature))
+        return self._project(self.pod_modes, predicted_coeffs) - offset
+
+    def build_hotspot_index(self, velocity_range=VELOCITY_RANGE, CPU_load_fraction_range=CPU_LOAD_FRACTION_RANGE,
+                            grid_size=41, margin=1.0, block_size=2**24):
+        """
+        Precompute the mesh nodes that can hold the maximum temperature anywhere in the given envelope.
+
+        The envelope is sampled on a grid_size x grid_size grid and every node within margin (K) of the field
+        maximum at any sample is kept, so a hotspot moving between neighbouring samples is still covered.
+        The maximum CPU temperature then only needs the (K, n_modes) rows of the POD modes at these nodes.
+        The index is cached with the surrogate (see cached).
+
+        Parameters:
+        - velocity_range: (min, max) velocity in m/s covered by the index.
+        - CPU_load_fraction_range: (min, max) CPU load fraction covered by the index.
+        - grid_size: Number of samples along each parameter.
+        - margin: Temperature margin in K below the sampled maximum for a node to be a candidate.
+
+        Returns:
+        - hotspot_nodes: 1D array of candidate node indices.
+        """
+        def hotspot_nodes():
+            velocity, CPU_load_fraction = np.meshgrid(np.linspace(*velocity_range, grid_size),
+                                                      np.linspace(*CPU_load_fraction_range, grid_size))
+            predicted_coeffs = self.predict_coefficients(velocity.ravel(), CPU_load_fraction.ravel())
+            candidates = np.zeros(self.pod_modes.shape[0], dtype=bool)
+            points_per_block = max(1, block_size // self.pod_modes.shape[0])
+            for start in range(0, predicted_coeffs.shape[0], points_per_block):
+                predicted_state = self._project(self.pod_modes, predicted_coeffs[start:start + points_per_block])
+                candidates |= np.any(predicted_state >= np.max(predicted_state, axis=0) - margin, axis=1)
+            return np.flatnonzero(candidates)
+
+        velocity_range, CPU_load_fraction_range = tuple(map(float, velocity_range)), tuple(map(float, CPU_load_fraction_range))
+        self.hotspot_nodes = self.cached("hotspot_nodes", f"{velocity_range}/{CPU_load_fraction_range}/{grid_size}/{margin}",
+                                         hotspot_nodes)
+        self.hotspot_modes = np.ascontiguousarray(self.pod_modes[self.hotspot_nodes])
+        self.hotspot_envelope = (velocity_range, CPU_load_fraction_range)
+        logger.info(f"Hotspot index built with {self.hotspot_nodes.size} of {self.pod_modes.shape[0]} nodes")
+        return self.hotspot_nodes
+
+    def _max_state(self, modes, predicted_coeffs, block_size):
+        points_per_block = max(1, block_size // modes.shape[0])
+        return np.concatenate([
+            np.max(self._project(modes, predicted_coeffs[start:start + points_per_block]), axis=0)
+            for start in range(0, predicted_coeffs.shape[0], points_per_block)
+        ])
+
+    def max_temperature(self, velocity, CPU_load_fraction, inlet_server_temperature=TRAINING_INLET_TEMPERATURE,
+                        verify=False, block_size=2**24):
+        """
+        Maximum CPU temperature in °C for N operating points.
+
+        When a hotspot index is built, operating points inside its envelope only evaluate the candidate nodes;
+        points outside it fall back to the full reconstruction. The field is reconstructed in blocks of
+        operating points so that at most block_size temperatures are held in memory at once.
+
+        Parameters:
+        - verify: Also reconstruct the full field and check the hotspot result against it. Mismatches are
+                  logged and the full-field value is returned.
+        """
+        velocity, CPU_load_fraction = np.broadcast_arrays(np.atleast_1d(velocity), np.atleast_1d(CPU_load_fraction))
+        predicted_coeffs = self.predict_coefficients(velocity, CPU_load_fraction)
+        if self.hotspot_modes is None:
+            max_state = self._max_state(self.pod_modes, predicted_coeffs, block_size)
+        else:
+            (velocity_min, velocity_max), (load_min, load_max) = self.hotspot_envelope
+            inside = ((velocity >= velocity_min) & (velocity <= velocity_max)
+                      & (CPU_load_fraction >= load_min) & (CPU_load_fraction <= load_max))
+            self.log_outside(inside, self.hotspot_envelope)
+            max_state = np.empty(predicted_coeffs.shape[0])
+            max_state[inside] = np.max(self._project(self.hotspot_modes, predicted_coeffs[inside]), axis=0,
+                                       initial=-np.inf)
+            if not np.all(inside):
+                max_state[~inside] = self._max_state(self.pod_modes, predicted_coeffs[~inside], block_size)
+            if verify:
+                full_max_state = self._max_state(self.pod_modes, predicted_coeffs, block_size)
+                mismatch = ~np.isclose(max_state, full_max_state)
+                if np.any(mismatch):
+                    logger.warning(f"Hotspot index missed the maximum for {np.count_nonzero(mismatch)} operating "
+                                   f"points (largest error {np.max(full_max_state - max_state):.3g} K)")
+                    max_state = full_max_state
+        return max_state - KELVIN_OFFSET - (TRAINING_INLET_TEMPERATURE - np.asarray(inlet_server_temperature))
+
+    def predict(self, velocity, CPU_load_fraction, inlet_server_temperature=TRAINING_INLET_TEMPERATURE, verify=False):
+        """
+        Predict the maximum CPU temperature and server outlet temperature for N operating points.
+
+        Parameters:
+        - velocity: Scalar or 1D array of server inlet velocities in m/s.
+        - CPU_load_fraction: Scalar or 1D array of CPU load fractions.
+        - inlet_server_temperature: Scalar or 1D array of server inlet temperatures in °C.
+        - verify: Check a hotspot index result against the full reconstruction (see max_temperature).
+
+        Returns:
+        - CPU_temp_max: 1D array of maximum CPU temperatures in °C.
+        - T_out_server: 1D array of server outlet air temperatures in °C.
+        """
+        CPU_temp_max = self.max_temperature(velocity, CPU_load_fraction, inlet_server_temperature, verify=verify)
+        T_out_server = server_outlet_temperature(inlet_server_temperature, velocity, CPU_load_fraction)
+        return CPU_temp_max, np.broadcast_to(T_out_server, CPU_temp_max.shape)
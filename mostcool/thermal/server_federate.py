@@ -1,12 +1,15 @@
 """Datacenter Thermal Model Federate"""
 
-import pandas as pd
+import os
 import mostcool.core.federate as federate
-import numpy as np
-from scipy.interpolate import Rbf
-from sklearn.preprocessing import MinMaxScaler
-import numpy as np
 import mostcool.core.definitions as definitions
+from mostcool.core.recorder import TimeSeriesRecorder
+from mostcool.core.checkpoint import Checkpointer
+from mostcool.thermal.cache import PredictionCache
+import mostcool.thermal.energy_balance as energy_balance
+from mostcool.thermal.layout import ServerLayout, ZONE_SUPPLY_SENSORS
+from mostcool.thermal.response_surface import ResponseSurface
+from mostcool.thermal.rom import VELOCITY_RANGE, ThermalROM, covering_range
 import logging
 
 
@@ -35,122 +38,89 @@ SUBS = [
     for sensor in definitions.SENSORS
 ]
 
+# Uniform layout used when no server layout file is given
 num_servers= 84
 server_inlet_velocity=5#in m/s
+TIME_SERIES_NAME = "time_series_data.csv"
+RACK_TIME_SERIES_NAME = "rack_temperatures.csv"
+RECORDED_CHANNELS = ["CPU_temp_max", "T_out_server", "inlet_server_temperature", "supply_approach_temperature", "return_approach_temperature"]
+RECORDER_CHUNK_SIZE = 144  # flush once per simulated day at 10 min timesteps
+
+
+def server_layout_path(output_dir=None):
+    """Server layout file of the run writing to output_dir, defaults to definitions.OUTPUT_DIR."""
+    return os.path.join(output_dir or definitions.OUTPUT_DIR, "run_config", "server_layout.csv")
+
+
+def layout_velocity_range(layout):
+    """
+    Velocity range of the hotspot index and response surface for a layout: the trained range of the ROM widened
+    to the inlet velocities of the layout, so the precomputed tables also apply to its servers.
+    """
+    velocity_range = covering_range(VELOCITY_RANGE, layout.inlet_velocity)
+    if velocity_range != VELOCITY_RANGE:
+        logger.warning(f"Server inlet velocities of the layout span {velocity_range} m/s, outside the trained range "
+                       f"{VELOCITY_RANGE} m/s of the thermal ROM, their predictions are extrapolated")
+    return velocity_range
 
 
 class Server_thermal_federate:
-    def __init__(self) -> None:
-        self.total_time = definitions.TOTAL_SECONDS  # get this from IDF
-        self.modes = np.loadtxt('/app/mostcool/thermal/data/modes.csv', delimiter=',')
-        self.coefficients = np.loadtxt('/app/mostcool/thermal/data/coeff.csv', delimiter=',')
-        self.parameter_array=np.loadtxt('/app/mostcool/thermal/data/parameter_array.csv', delimiter=',')
-        
-        self.rbf_models, self.param_scaler, self.coeff_scaler = self.build_and_scale_rbf_models(self.parameter_array, self.coefficients, kernel_function='multiquadric')
-        
-        self.subs = [federate.Sub(name=f'{sensor["variable_key"]}/{sensor["variable_name"]}', unit=sensor["variable_unit"]) for sensor in definitions.SENSORS]
-        self.pubs = [federate.Pub(name=f'{pub["Name"]}', unit=pub["Units"]) for pub in PUBS]
-        self.server_federate = federate.mostcool_federate(federate_name="Server_1", subscriptions=self.subs, publications=self.pubs)
-        self.server_federate.time_interval_seconds = definitions.TIMESTEP_PERIOD_SECONDS
-    
-    # This fucntion "build_and_scale_rbf_models" has to be run once to run the online_prediction function multiple time inside Helics
-    def build_and_scale_rbf_models(self, 
-                                   training_parameters, 
-                                   training_coefficients, 
-                                   kernel_function='multiquadric'):
+    def __init__(self, federate_factory=federate.mostcool_federate, output_dir=None) -> None:
         """
-        Build RBF models for each coefficient dimension with parameter and coefficient scaling.
-
         Parameters:
-        - training_parameters: 2D array of parameters used for training.
-        - training_coefficients: 2D array of coefficients corresponding to the training parameters.
-        - kernel_function: String specifying the kernel function for the RBF models.
-
-        Returns:
-        - rbf_models: List of RBF model objects for each coefficient dimension.
-        - param_scaler: Fitted scaler for parameters.
-        - coeff_scaler: Fitted scaler for coefficients.
+        - federate_factory: Creates the federate, called like federate.mostcool_federate (e.g. a direct coupling federate).
+        - output_dir: Directory of the server layout and the recorded time series, defaults to definitions.OUTPUT_DIR.
         """
-        # Initialize and fit scalers
-        param_scaler = MinMaxScaler().fit(training_parameters)
-        coeff_scaler = MinMaxScaler().fit(training_coefficients)
+        self.output_dir = output_dir or definitions.OUTPUT_DIR
+        self.total_time = definitions.TOTAL_SECONDS  # get this from IDF
+        layout_path = server_layout_path(self.output_dir)
+        if os.path.exists(layout_path):
+            self.layout = ServerLayout.from_csv(layout_path)
+        else:
+            self.layout = ServerLayout.uniform(num_servers=num_servers, inlet_velocity=server_inlet_velocity)
+        velocity_range = layout_velocity_range(self.layout)
+        # Fitting the ROM has to be done once to run the online_prediction function multiple time inside Helics
+        self.rom = ThermalROM.from_files(kernel_function='multiquadric')
+        # Only the candidate hotspot nodes are needed for the maximum CPU temperature
+        self.rom.build_hotspot_index(velocity_range=velocity_range)
+        if definitions.THERMAL_ROM_MODE == "table":
+            self.rom = ResponseSurface(self.rom, velocity_range=velocity_range, 
+                                       interpolation=definitions.RESPONSE_SURFACE_INTERPOLATION)
+        # Loading schedules sit on the same few values for hours, repeated operating points are not re-evaluated
+        if definitions.THERMAL_CACHE_SIZE:
+            self.rom = PredictionCache(self.rom, 
+                                       max_size=definitions.THERMAL_CACHE_SIZE, 
+                                       velocity_tolerance=definitions.THERMAL_CACHE_VELOCITY_TOLERANCE, 
+                                       CPU_load_fraction_tolerance=definitions.THERMAL_CACHE_LOAD_TOLERANCE)
         
-        # Scale training data
-        scaled_training_params = param_scaler.transform(training_parameters)
-        scaled_training_coeffs = coeff_scaler.transform(training_coefficients)
-
-        # Build RBF models with scaled data
-        rbf_models = [
-            Rbf(scaled_training_params[:, 0], scaled_training_params[:, 1], scaled_training_coeffs[:, i], function=kernel_function)
-            for i in range(scaled_training_coeffs.shape[1])
-        ]
-        print("RBF models built successfully")
-
-        return rbf_models, param_scaler, coeff_scaler
+        self.subs = [federate.Sub(name=f'{sensor["variable_key"]}/{sensor["variable_name"]}', unit=sensor["variable_unit"]) for sensor in definitions.SENSORS]
+        self.pubs = [federate.Pub(name=f'{pub["Name"]}', unit=pub["Units"]) for pub in PUBS]
+        # In event-driven mode the thermal model only wakes up when EnergyPlus publishes a change
+        self.server_federate = federate_factory(federate_name="Server_1", subscriptions=self.subs, publications=self.pubs, wait_for_updates=True, 
+                                                 bundle_sources=["EnergyPlus"])
+        # Inputs and outputs resolved once, each step reads and writes them through .value
+        self.cpu_loading = self.server_federate.subscription("Data Center CPU Loading Schedule/Schedule Value")
+        self.zone_supply_temperatures = {zone: self.server_federate.subscription(sensor) for zone, sensor in ZONE_SUPPLY_SENSORS.items()}
+        self.supply_approach_temperature, self.return_approach_temperature = self.pubs
+        self.checkpointer = Checkpointer("Server_1")
     
     # Main function to be passed to Helics
-    def online_prediction(self, velocity, CPU_load_fraction, inlet_server_temperature,num_servers, rbf_models, param_scaler, coeff_scaler, pod_modes):
+    def online_prediction(self, velocity, CPU_load_fraction, inlet_server_temperature):
         """
-        Predict the system state for new velocity, heat load fraction, and inlet_server_temperature using the 
-        Reduced Order Model developed in the offline stage. Adjust the predicted temperature state 
-        based on the deviation from the assumed inlet temperature of 30°C.
+        Predict the maximum CPU temperature and the server outlet temperature for new velocity, heat load
+        fraction, and inlet_server_temperature using the Reduced Order Model developed in the offline stage.
 
         Parameters:
         - velocity: New velocity value for which to predict the system state.
-        - heat_load_fraction: New heat load fraction value for which to predict the system state.
+        - CPU_load_fraction: New heat load fraction value for which to predict the system state.
         - inlet_server_temperature: inlet temperature from the assumed 30°C. This should be in °C
-        - rbf_models: List of pre-built RBF model objects for predicting each coefficient dimension.
-        - param_scaler: Scaler object used for parameter normalization, obtained from the offline stage.
-        - coeff_scaler: Scaler object used for coefficients normalization, obtained from the offline stage.
-        - pod_modes: 2D array of POD modes obtained from the offline stage.
 
         Returns:
-        - adjusted_predicted_state: 2D array of the predicted system state for the new parameters,
-                                    adjusted for the inlet temperature deviation.
+        - CPU_temp_max: Maximum CPU temperature in °C, adjusted for the inlet temperature deviation.
+        - T_out_server: Server outlet air temperature in °C.
         """
-        
-
-        
-        # Create a 2D array from the input parameters
-        new_parameters = np.array([[velocity, CPU_load_fraction]])
-        
-        # Normalize the new parameters using the parameter scaler
-        normalized_new_params = param_scaler.transform(new_parameters)
-        
-        # Use the RBF models to predict the normalized coefficients for the new parameters
-        predicted_normalized_coeffs = np.array([
-            model(normalized_new_params[:, 0], normalized_new_params[:, 1]) for model in rbf_models
-        ]).T  # Transpose to ensure correct shape
-        
-        # Invert the normalization of the coefficients
-        predicted_coeffs = coeff_scaler.inverse_transform(predicted_normalized_coeffs)
-        
-        # Reconstruct the system state using the predicted coefficients and POD modes
-        #The predicted state is in K
-        predicted_state = np.dot(pod_modes, predicted_coeffs.T) 
-        #Conveting the Tthe predicted temperatures from K to °C
-        predicted_state = predicted_state-273.15
-        
-        # Adjust the predicted state by the temperature deviation
-        # Assuming that the temperature is the quantity of interest in the predicted state
-        adjusted_predicted_state = predicted_state - (30-inlet_server_temperature)
-        #The above assumption only hold true when constant fluid properties are assumed i.e., the inherent assumption is that fluid properties
-        # will not change significantly with changing temperature. 
-        #Extrating the maximum CPU temperature from the array
-        CPU_temp_max=np.max(adjusted_predicted_state)
-
-        # Define constants
-        dens = 1.225 #kg/m^3
-        cp = 1006.43 #J/kgK
-        server_inlet_area= 0.017560001 # in m^2
-        mass_flowrate=dens*server_inlet_area*velocity
-        # Load per CPU = 300 W and 2 CPU's are present in the server making total CPU laod to be 600W at 100% capcity
-        # All other components RAM, power supply and HDD etc amount to 400W making the total server load to be 1000 W
-        if mass_flowrate == 0:
-            mass_flowrate = 0.00001
-        T_out_server = inlet_server_temperature + (CPU_load_fraction * 600+400)/ (mass_flowrate * cp)
-
-        return CPU_temp_max, T_out_server
+        CPU_temp_max, T_out_server = self.rom.predict(velocity, CPU_load_fraction, inlet_server_temperature)
+        return CPU_temp_max[0], T_out_server[0]
 
 
     
@@ -159,89 +129,104 @@ class Server_thermal_federate:
                                        server_inlet_velocity,
                                        total_ite_load_percentage,
                                        num_servers):
+        """Calculate various temperature deltas based on the total ITE load (see energy_balance)."""
+        return energy_balance.data_center_temperature_deltas(supply_temperature, 
+                                                             server_inlet_velocity, 
+                                                             total_ite_load_percentage, 
+                                                             num_servers)
+
+    def evaluate_layout(self, zone_supply_temperatures, cpu_loading):
         """
-        Calculate various temperature deltas based on the total ITE load.
+        Evaluate every server of the layout in one vectorized ROM pass.
 
         Parameters:
-        - total_ite_load_percentage: The total ITE load %
+        - zone_supply_temperatures: {zone: supply air temperature in °C}.
+        - cpu_loading: The total ITE load fraction.
 
         Returns:
-        - calculated temperature deltas and other values.
-        The average supply and return delta_T's should be used as inputs for data_center
-        The max supply delta_T can should be used as input to server model 
+        - supply_approach_temp, return_approach_temperature: Average data center deltas for EnergyPlus.
+        - inlet_server_temperature: 1D array of per-server inlet temperatures in °C.
+        - CPU_temp_max: 1D array of per-server maximum CPU temperatures in °C.
+        - T_out_server: 1D array of per-server outlet temperatures in °C.
         """
-        Total_ITE_Load=80 #in KW
-        ite_load = Total_ITE_Load * total_ite_load_percentage
-        avg_supply_delta_T = 0.1169 * ite_load**0.9505
-        avg_return_delta_T = 7.6459e-04 * ite_load**1.8956
-        max_supply_del_T = 0.0173 * ite_load**1.5363 + 6.9092
-        max_return_del_T = -4.7537 * np.exp(ite_load * -0.0099)
-
-        inlet_server_temperature=supply_temperature+max_supply_del_T #Worst case scenario for the server, i.e., hihgest inlet temperature at the server inlet
-        #print(inlet_server_temperature)
-        # Define constants
-        dens = 1.225 #kg/m^3
-        cp = 1006.43 #J/kgK
-        server_inlet_area= 0.017560001 # in m^2
-        mass_flowrate=dens*server_inlet_area*server_inlet_velocity
-        # Calculation of pressure drop across the air cooled server
-        pressure_drop = 7.4066e+03 * mass_flowrate ** 1.8384 #Pa
-        # Calculate energy consumption by fans to cool the CPU
-        energy_consumption_by_fans_per_server = pressure_drop * mass_flowrate / dens #in Watts
-        total_energy_consumption_by_fans = energy_consumption_by_fans_per_server * num_servers #in Watts
-        # Load per CPU = 300 W and 2 CPU's are present in the server making total CPU laod to be 600W at 100% capcity
-        # All other components RAM, power supply and HDD etc amount to 400W making the total server load to be 1000 W
-        Total_server_Load=ite_load*1000-total_energy_consumption_by_fans
-        heat_load_per_server=Total_server_Load/num_servers
-        CPU_Load=heat_load_per_server-400 #in Watts
-        CPU_Load_fraction=CPU_Load/600 # is a fraction of the total CPU load of 600W
-        #print(CPU_Load_fraction)
-
-        return avg_supply_delta_T,avg_return_delta_T, inlet_server_temperature,CPU_Load_fraction
+        supply_approach_temp, return_approach_temperature, inlet_server_temperature, CPU_Load_fraction, _ = self.data_center_temperature_deltas(supply_temperature=self.layout.supply_temperature(zone_supply_temperatures), 
+                                                                                                                                        server_inlet_velocity=self.layout.inlet_velocity.mean(), 
+                                                                                                                                        total_ite_load_percentage=cpu_loading, 
+                                                                                                                                        num_servers=self.layout.num_servers)
+        inlet_server_temperature = inlet_server_temperature + self.layout.inlet_temperature_offset
+        CPU_temp_max, T_out_server = self.rom.predict(self.layout.inlet_velocity, 
+                                                      CPU_Load_fraction * self.layout.load_share, 
+                                                      inlet_server_temperature)
+        return supply_approach_temp, return_approach_temperature, inlet_server_temperature, CPU_temp_max, T_out_server
+
+    def open_recorders(self):
+        n_steps = self.total_time // self.server_federate.time_interval_seconds
+        # A resumed run appends to the rows recorded up to its checkpoint
+        resumed = self.checkpointer.load() if definitions.START_SECONDS else {"rows": None, "rack_rows": None}
+        self.recorder = TimeSeriesRecorder(os.path.join(self.output_dir, TIME_SERIES_NAME), 
+                                           channels=RECORDED_CHANNELS, 
+                                           n_steps=n_steps, 
+                                           chunk_size=RECORDER_CHUNK_SIZE,
+                                           resume_rows=resumed["rows"])
+        self.rack_recorder = TimeSeriesRecorder(os.path.join(self.output_dir, RACK_TIME_SERIES_NAME), 
+                                                channels=self.layout.racks, 
+                                                n_steps=n_steps, 
+                                                chunk_size=RECORDER_CHUNK_SIZE,
+                                                resume_rows=resumed["rack_rows"])
+
+    def checkpoint_state(self):
+        return {"rows": self.recorder.checkpoint(), "rack_rows": self.rack_recorder.checkpoint()}
+
+    def step(self):
+        """Read the inputs at the granted time, evaluate the thermal model, record and publish its outputs."""
+        self.server_federate.read_all()
+        if self.server_federate.event_driven and not self.server_federate.updated.any():
+            # Nothing changed since the last evaluation, the published values still hold
+            return
+        cpu_loading = self.cpu_loading.value
+        zone_supply_temperatures = {zone: sub.value for zone, sub in self.zone_supply_temperatures.items()}
+        with self.server_federate.timer.section("thermal_model", self.server_federate.granted_time):
+            supply_approach_temp, return_approach_temperature, inlet_server_temperature, CPU_temp_max, T_out_server = self.evaluate_layout(zone_supply_temperatures, cpu_loading)
+        # The fleet maximum is recorded with the per-rack maxima
+        self.recorder.record(self.server_federate.granted_time, 
+                             CPU_temp_max.max(), 
+                             T_out_server.max(), 
+                             inlet_server_temperature.max(), 
+                             supply_approach_temp, 
+                             return_approach_temperature)
+        self.rack_recorder.record(self.server_federate.granted_time, *self.layout.rack_maximum(CPU_temp_max))
+        
+        if supply_approach_temp is not None:
+            self.supply_approach_temperature.value = supply_approach_temp
+        if return_approach_temperature is not None:
+            self.return_approach_temperature.value = return_approach_temperature
+        self.server_federate.publish_all()
+
+    def advance(self):
+        """Request the next time step and evaluate it if it is still in the simulated range."""
+        self.server_federate.request_time()
+        self.checkpointer.save_if_due(self.server_federate.granted_time, self.checkpoint_state)
+        if self.server_federate.granted_time < self.total_time:
+            self.step()
+
+    def finalize(self):
+        # Write the rows still buffered since the last periodic flush
+        self.recorder.close()
+        self.rack_recorder.close()
+        if isinstance(self.rom, PredictionCache):
+            logger.info(f"Thermal prediction cache: {self.rom.stats()}")
+        self.server_federate.destroy_federate()
 
     def run(self):
-        CPU_temp_max_log =  pd.DataFrame({
-            'Time': [],
-            'Value': []
-        }).set_index('Time')
+        self.open_recorders()
+        if self.server_federate.granted_time < self.total_time:
+            self.step()
         while self.server_federate.granted_time < self.total_time:
-            self.server_federate.update_subs()
-            Ts = 0
-            mass_flow_rate = 0
-            for sub in self.subs:
-                if sub.name == "East Zone Supply Fan/Fan Air Mass Flow Rate":
-                    mass_flow_rate = sub.value
-                elif sub.name == "East Air Loop Outlet Node/System Node Temperature":
-                    Ts = sub.value 
-                elif sub.name == "Data Center CPU Loading Schedule/Schedule Value":
-                    cpu_loading = sub.value
-            print(f"Ts: {Ts}, mass_flow_rate: {mass_flow_rate}, cpu_loading: {cpu_loading}  at time {self.server_federate.granted_time}")
-            supply_approach_temp, return_approach_temperature, inlet_server_temperature, CPU_Load_fraction = self.data_center_temperature_deltas(supply_temperature=Ts, 
-                                                                                                                                            server_inlet_velocity=server_inlet_velocity, 
-                                                                                                                                            total_ite_load_percentage=cpu_loading, 
-                                                                                                                                            num_servers=num_servers)
-            CPU_temp_max, T_out_server = self.online_prediction(server_inlet_velocity, 
-                                                           CPU_Load_fraction, 
-                                                           inlet_server_temperature,
-                                                           num_servers, 
-                                                           self.rbf_models, 
-                                                           self.param_scaler, 
-                                                           self.coeff_scaler, 
-                                                           self.modes)
-            new_data = pd.DataFrame({'Time': [self.server_federate.granted_time], 'Value': [CPU_temp_max]}).set_index('Time')
-            CPU_temp_max_log = pd.concat([CPU_temp_max_log, new_data])
-            
-            if supply_approach_temp is not None:
-                self.pubs[0].value = supply_approach_temp
-            if return_approach_temperature is not None:
-                self.pubs[1].value = return_approach_temperature
-            self.server_federate.update_pubs()
-            self.server_federate.request_time()
-        # Export the DataFrame to a CSV file
-        CPU_temp_max_log.to_csv('/app/Output/time_series_data.csv')
-        self.server_federate.destroy_federate()
-    
-    
-thermal_model_runner = Server_thermal_federate()
-thermal_model_runner.run()
+            self.advance()
+        self.finalize()
+
+
+if __name__ == "__main__":
+    thermal_model_runner = Server_thermal_federate()
+    thermal_model_runner.run()
     